@@ -1,15 +1,85 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import (
+    Flask, render_template, request, redirect, url_for, session, flash, g, make_response, jsonify, abort,
+    get_flashed_messages, stream_template,
+)
+from bisect import bisect_right
+from datetime import datetime
+from functools import wraps
+from hashlib import sha1
+import hmac
+import uuid
+import base64
+import json
 from pathlib import Path
 import sqlite3
 
+import click
+
+import metrics
+from cache import LRUCache
 from config import Config
-from db import get_connection, init_db, DB_PATH
-from utils import today_local, now_local_iso, compute_standings, round_robin_pairings
+from db import (
+    get_connection,
+    init_db,
+    DB_PATH,
+    get_data_version,
+    get_public_connection,
+    bump_data_version,
+    bulk_match_writes,
+    is_busy_error,
+    release_connection,
+    pool_stats,
+    write_transaction,
+    pending_migrations,
+    schema_version,
+)
+from events import Broadcaster, TooManyStreams
+from fragments import FragmentCacheExtension
+from importer import MAX_ERRORS as MAX_IMPORT_ERRORS, ResultImportError, apply_results, parse_rows, validate_rows
+from jobs import export_job, export_status, run_snapshot, snapshot_job
+from passwords import LoginThrottled, PasswordHashBusy, hash_password, login_throttle, needs_rehash, verify_password
+from queries import (
+    fetch_jornadas_with_matches,
+    fetch_upcoming,
+    fetch_recent,
+    fetch_matches,
+    iter_matches,
+    fetch_match,
+    fetch_team_upcoming,
+    fetch_team_pending,
+    fetch_team_recent,
+)
+from ratings import apply_match_to_ratings, fetch_ratings, rating_fields, replay_ratings, revert_match_ratings
+from scheduler import optimize_fixtures
+from simulator import season_probabilities
+from utils import (
+    TZ,
+    parse_date,
+    today_local,
+    now_local_iso,
+    compute_standings,
+    standings_after,
+    standings_timeline,
+    build_fixtures,
+    apply_match_to_standings,
+    rebuild_standings,
+)
 
 app = Flask(__name__)
 app.config.from_object(Config)
 app.secret_key = Config.SECRET_KEY
+metrics.init_app(app)
+
+page_cache = LRUCache(Config.PAGE_CACHE_SIZE)
+standings_cache = LRUCache(16)
+probabilities_cache = LRUCache(4)
+fragment_cache = LRUCache(Config.FRAGMENT_CACHE_SIZE)
+# los ETag de las páginas en streaming salen de su clave: cambian con cada despliegue
+STREAM_ETAG_SALT = uuid.uuid4().hex
+STREAM_CHUNK_BYTES = 16 * 1024
+event_broadcaster = Broadcaster(
+    Config.NO_SHOW_WIN_POINTS, Config.EVENTS_POLL_SECONDS, Config.EVENTS_MAX_CONNECTIONS
+)
 
 
 # --------- Helpers de sesión ---------
@@ -24,91 +94,535 @@ def current_team_id():
 
 # --------- Inicialización DB ---------
 
-@app.before_request
-def ensure_db():
-    if not DB_PATH.exists():
-        init_db()
+def _loaded_by_cli_command() -> bool:
+    """True si carga la app un comando `flask ...` (salvo `flask run`): él decide si migrar."""
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.info_name != "run"
+
+
+# Esquema al arrancar, no en cada petición: con gunicorn --preload se aplica una
+# vez en el proceso maestro, antes de crear los workers
+if app.config["MIGRATE_ON_STARTUP"] and not _loaded_by_cli_command():
+    for name in init_db():
+        app.logger.info("Migración aplicada: %s", name)
+    release_connection()
+
+
+@app.teardown_request
+def release_db(exc):
+    release_connection()
+
+
+@app.cli.command("upgrade-db")
+def upgrade_db_command():
+    """Aplica las migraciones pendientes (migrations/) y actualiza las estadísticas."""
+    applied = init_db()
+    for name in applied:
+        click.echo(f"Aplicada {name}")
+    with get_connection() as conn:
+        conn.execute("ANALYZE")
+        conn.commit()
+    click.echo(f"Esquema en la versión {schema_version(get_connection())}" if applied else "Esquema ya al día")
+
+
+@app.cli.command("db-status")
+def db_status_command():
+    """Muestra la versión del esquema y las migraciones pendientes (código 1 si hay alguna)."""
+    conn = get_connection()
+    pending = pending_migrations(conn)
+    click.echo(f"Base: {DB_PATH} · versión del esquema: {schema_version(conn)}")
+    for version, path in pending:
+        click.echo(f"  pendiente: {path.name}")
+    if pending:
+        click.echo(f"{len(pending)} migraciones pendientes: flask --app app upgrade-db")
+        raise SystemExit(1)
+    click.echo("Sin migraciones pendientes")
+
+
+@app.cli.command("rebuild-standings")
+@click.option("--check", is_flag=True, help="Solo informa de la deriva, sin guardar.")
+def rebuild_standings_command(check):
+    """Recalcula la tabla standings desde los partidos y muestra la deriva."""
+    init_db()
+    with get_connection() as conn:
+        drift = rebuild_standings(conn, app.config["NO_SHOW_WIN_POINTS"])
+        if check:
+            conn.rollback()
+        else:
+            mark_data_changed(conn)
+            conn.commit()
+    if drift:
+        click.echo(f"Deriva detectada en {len(drift)} equipos: {drift}")
+    else:
+        click.echo("Clasificación sin deriva")
+    if not check:
+        click.echo("Tabla standings reconstruida")
+
+
+@app.cli.command("replay-ratings")
+@click.option("--check", is_flag=True, help="Solo informa de la deriva, sin guardar.")
+def replay_ratings_command(check):
+    """Recalcula el Elo y la forma repitiendo todos los resultados en orden de registro."""
+    init_db()
+    with get_connection() as conn:
+        drift = replay_ratings(conn)
+        if check:
+            conn.rollback()
+        else:
+            mark_data_changed(conn)
+            conn.commit()
+    if drift:
+        click.echo(f"Elo distinto del recalculado en {len(drift)} equipos: {drift}")
+    else:
+        click.echo("Elo sin deriva")
+    if not check:
+        click.echo("Ratings recalculados")
+
+
+@app.cli.command("publish-snapshot")
+def publish_snapshot_command():
+    """Publica ya el snapshot de solo lectura (tras escribir desde scripts o al desplegar)."""
+    init_db()
+    if run_snapshot():
+        click.echo("Snapshot publicado")
+    else:
+        click.echo("Snapshot ya al día")
+
+
+# --------- Clasificación incremental ---------
+
+def apply_completed_match(conn, match_id: int, sign: int = 1):
+    """Aplica (o revierte con sign=-1) un partido completado en la clasificación y el Elo."""
+    m = conn.execute("SELECT * FROM matches WHERE id=?", (match_id,)).fetchone()
+    if m and m["status"] == "completed":
+        apply_match_to_standings(conn, m, app.config["NO_SHOW_WIN_POINTS"], sign)
+        if sign > 0:
+            apply_match_to_ratings(conn, m)
+        else:
+            revert_match_ratings(conn, match_id)
+
+
+# --------- Versión de datos y caché ---------
+
+def data_version(conn) -> int:
+    """Versión de datos de la liga, leída una sola vez por petición."""
+    if "data_version" not in g:
+        g.data_version = get_data_version(conn)
+    return g.data_version
+
+
+def mark_data_changed(conn):
+    """Invalida las cachés: llamar en toda ruta que escriba antes del commit."""
+    bump_data_version(conn)
+    g.pop("data_version", None)  # lo que se renderice después ya ve la nueva versión
+    g.data_changed = True
+
+
+@app.after_request
+def schedule_background_jobs(response):
+    # tras el commit de una escritura: encolar la exportación pública (agrupada)
+    if g.get("data_changed") and app.config["EXPORT_ON_WRITE"]:
+        export_job.trigger()
+    # y la publicación del snapshot de solo lectura
+    if g.get("data_changed") and app.config["SNAPSHOT_ENABLED"]:
+        snapshot_job.trigger()
+    return response
+
+
+def public_connection():
+    """
+    Conexión para las lecturas públicas de la petición: el snapshot de solo
+    lectura (db.get_public_connection) para visitantes, la principal con sesión
+    iniciada para que cada uno vea al momento lo que acaba de guardar.
+    """
+    if "public_conn" not in g:
+        conn = get_connection()
+        if app.config["SNAPSHOT_ENABLED"] and not session.get("role"):
+            conn, g.data_version = get_public_connection(app.config["SNAPSHOT_MAX_STALENESS"])
+            if conn is get_connection():
+                # sin snapshot o demasiado antiguo (p. ej. escrituras desde la CLI)
+                snapshot_job.trigger()
+        g.public_conn = conn
+    return g.public_conn
+
+
+def cached_standings(conn):
+    return standings_cache.get_or_set(
+        data_version(conn), lambda: compute_standings(conn, app.config["NO_SHOW_WIN_POINTS"])
+    )
+
+
+def cached_ratings(conn):
+    return standings_cache.get_or_set(("ratings", data_version(conn)), lambda: fetch_ratings(conn))
+
+
+def cached_timeline(conn):
+    return standings_cache.get_or_set(("timeline", data_version(conn)), lambda: standings_timeline(conn))
+
+
+@app.template_global()
+def page_url(endpoint, **values):
+    """Enlace a una página; el exportador estático lo sustituye por el fichero .html."""
+    return url_for(endpoint, **values)
+
+
+@app.template_global()
+def asset_url(filename):
+    """CSS/JS de static/; en el sitio estático, la versión minificada con hash."""
+    return url_for("static", filename=filename)
+
+
+# {% cache %} en las plantillas: fragmentos por versión de datos (fragments.py)
+app.jinja_env.add_extension(FragmentCacheExtension)
+app.jinja_env.fragment_cache = fragment_cache
+app.jinja_env.fragment_cache_version = lambda: data_version(get_connection())
+
+
+def stream_page(template_name, **context):
+    """
+    Renderiza en streaming (listados grandes): el HTML sale en trozos de
+    STREAM_CHUNK_BYTES según se recorren las filas, que pueden ser un cursor.
+    Los mensajes flash se sacan antes de la sesión, porque la cookie se envía
+    con las cabeceras, antes de renderizar.
+    """
+    get_flashed_messages()
+    return _encode_chunks(stream_template(template_name, **context))
+
+
+def _encode_chunks(chunks):
+    buffer, size = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= STREAM_CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def cache_while_streaming(chunks, key, etag):
+    """Reenvía los trozos y guarda la página en la caché si no pasa de PAGE_CACHE_MAX_BYTES."""
+    parts, size = [], 0
+    for chunk in chunks:
+        yield chunk
+        if parts is not None:
+            size += len(chunk)
+            if size > app.config["PAGE_CACHE_MAX_BYTES"]:
+                parts = None  # demasiado grande: se sirve siempre en streaming
+            else:
+                parts.append(chunk)
+    if parts is not None:
+        page_cache.set(key, (b"".join(parts), etag))
+
+
+def cached_page(view=None, *, stream=False, query_args=None):
+    """
+    Cachea el HTML de una vista pública por (vista, parámetros, rol, fecha,
+    versión de datos) y responde con ETag fuerte para que el navegador/proxy
+    reciban 304. `query_args` es {parámetro: tipo} con los de la query string que lee
+    la vista; los demás no forman parte de la clave, así que `?x=1`, `?x=2`...
+    no llenan la caché con copias de la misma página.
+    Con `stream=True` la vista devuelve stream_page(...): el ETag sale de la
+    clave (el cuerpo no se conoce hasta enviarlo), con un 304 no se renderiza
+    nada y la página solo se guarda si no pasa de PAGE_CACHE_MAX_BYTES.
+    """
+    if view is None:
+        return lambda view: cached_page(view, stream=stream, query_args=query_args)
+    query_args = query_args or {}
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get("_flashes"):
+            # los mensajes flash se consumen al renderizar: no cachear
+            return view(*args, **kwargs)
+        with public_connection() as conn:
+            version = data_version(conn)
+        params = tuple(request.args.get(name, type=type_) for name, type_ in query_args.items())
+        key = (request.endpoint, params, session.get("role"), today_local().isoformat(), version)
+        entry = page_cache.get(key)
+        if entry is not None:
+            body, etag = entry
+        elif stream:
+            etag = sha1(f"{STREAM_ETAG_SALT}{key!r}".encode("utf-8")).hexdigest()
+            body = b"" if etag in request.if_none_match else cache_while_streaming(view(*args, **kwargs), key, etag)
+        else:
+            body = view(*args, **kwargs)
+            etag = sha1(body.encode("utf-8")).hexdigest()
+            page_cache.set(key, (body, etag))
+        resp = make_response(body)
+        # sin esto make_conditional calcula Content-Length y recorre todo el stream
+        resp.implicit_sequence_conversion = False
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.vary.add("Cookie")
+        return resp.make_conditional(request)
+    return wrapper
 
 
 # --------- Rutas públicas ---------
 
 @app.get("/")
+@cached_page
 def index():
-    with get_connection() as conn:
-        standings = compute_standings(conn, app.config["NO_SHOW_WIN_POINTS"])
+    with public_connection() as conn:
+        standings = cached_standings(conn)
         today = today_local().isoformat()
         # Próximos 10 partidos
-        upcoming = conn.execute(
-            """
-            SELECT m.*, j.date, th.name as home_name, ta.name as away_name
-            FROM matches m
-            JOIN jornadas j ON j.id=m.jornada_id
-            JOIN teams th ON th.id=m.home_team_id
-            JOIN teams ta ON ta.id=m.away_team_id
-            WHERE m.status='scheduled' AND j.date >= ?
-            ORDER BY j.date ASC
-            LIMIT 10
-            """,
-            (today,),
-        ).fetchall()
+        upcoming = fetch_upcoming(conn, today)
         # Últimos resultados (10)
-        recent = conn.execute(
-            """
-            SELECT m.*, j.date, th.name as home_name, ta.name as away_name
-            FROM matches m
-            JOIN jornadas j ON j.id=m.jornada_id
-            JOIN teams th ON th.id=m.home_team_id
-            JOIN teams ta ON ta.id=m.away_team_id
-            WHERE m.status='completed'
-            ORDER BY j.date DESC, m.updated_at DESC
-            LIMIT 10
-            """,
-        ).fetchall()
-    return render_template("index.html", standings=standings, upcoming=upcoming, recent=recent)
+        recent = fetch_recent(conn)
+        events_url = live_events_url(conn)
+    return render_template(
+        "index.html", standings=standings, upcoming=upcoming, recent=recent, today=today, events_url=events_url,
+    )
 
 
 @app.get("/standings")
+@cached_page(query_args={"after": int})
 def standings():
-    with get_connection() as conn:
-        table = compute_standings(conn, app.config["NO_SHOW_WIN_POINTS"])
-    return render_template("standings.html", table=table)
+    after = request.args.get("after", type=int)
+    with public_connection() as conn:
+        timeline = cached_timeline(conn)
+        table = cached_standings(conn) if after is None else standings_after(conn, after)
+        # el Elo y la forma son los actuales: solo se muestran en la clasificación actual
+        ratings = cached_ratings(conn) if after is None else None
+        events_url = live_events_url(conn) if after is None else None
+    # evolución de cada equipo hasta la jornada mostrada
+    shown = len(timeline["jornadas"]) if after is None else bisect_right(timeline["jornadas"], after)
+    history = {t["team_id"]: t["positions"][:shown] for t in timeline["teams"]}
+    return render_template(
+        "standings.html", table=table, after=after, jornadas=timeline["jornadas"], history=history,
+        ratings=ratings, events_url=events_url,
+    )
+
+
+@app.get("/probabilities")
+@cached_page
+def probabilities():
+    with public_connection() as conn:
+        version = data_version(conn)
+        result = probabilities_cache.get_or_set(
+            version,
+            lambda: season_probabilities(
+                conn,
+                app.config["NO_SHOW_WIN_POINTS"],
+                runs=app.config["SIMULATION_RUNS"],
+                workers=app.config["SIMULATION_WORKERS"],
+                relegation_spots=app.config["RELEGATION_SPOTS"],
+                seed=version,
+            ),
+        )
+    return render_template("probabilities.html", result=result, relegation_spots=app.config["RELEGATION_SPOTS"])
 
 
 @app.get("/jornadas")
+@cached_page
 def jornadas():
-    with get_connection() as conn:
-        rows = conn.execute("SELECT id, number, date FROM jornadas ORDER BY number").fetchall()
-        data = []
-        for j in rows:
-            matches = conn.execute(
-                """
-                SELECT m.*, th.name as home_name, ta.name as away_name
-                FROM matches m
-                JOIN teams th ON th.id=m.home_team_id
-                JOIN teams ta ON ta.id=m.away_team_id
-                WHERE m.jornada_id=?
-                ORDER BY m.id
-                """,
-                (j["id"],),
-            ).fetchall()
-            data.append({"jornada": j, "matches": matches})
+    with public_connection() as conn:
+        data = fetch_jornadas_with_matches(conn)
     return render_template("jornadas.html", data=data)
 
 
 @app.get("/matches")
+@cached_page(stream=True)
 def matches():
-    with get_connection() as conn:
-        rows = conn.execute(
-            """
-            SELECT m.*, j.date, th.name as home_name, ta.name as away_name
-            FROM matches m
-            JOIN jornadas j ON j.id=m.jornada_id
-            JOIN teams th ON th.id=m.home_team_id
-            JOIN teams ta ON ta.id=m.away_team_id
-            ORDER BY j.number, m.id
-            """
-        ).fetchall()
-    return render_template("matches.html", matches=rows)
+    # el cursor se recorre mientras se envía la página: memoria constante con el historial
+    return stream_page("matches.html", matches=iter_matches(public_connection()))
+
+
+# --------- Eventos en vivo (SSE) ---------
+
+def live_events_url(conn):
+    """URL de /events para una página pública (con la versión que muestra) o None."""
+    if not app.config["EVENTS_ENABLED"]:
+        return None
+    return url_for("events", since=data_version(conn))
+
+
+@app.get("/events")
+def events():
+    if not app.config["EVENTS_ENABLED"]:
+        abort(404)
+    # al reconectar, EventSource envía el id del último evento recibido (la versión)
+    since = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        since = int(since)
+    except (TypeError, ValueError):
+        since = None
+    try:
+        sub = event_broadcaster.subscribe()
+    except TooManyStreams:
+        # EventSource no reintenta tras un error HTTP: site.js lo hace con espera aleatoria
+        return "Demasiadas conexiones en vivo", 503, {"Retry-After": "30"}
+    response = app.response_class(
+        event_broadcaster.stream(sub, since, app.config["EVENTS_MAX_STREAM_SECONDS"]),
+        mimetype="text/event-stream",
+    )
+    response.call_on_close(lambda: event_broadcaster.unsubscribe(sub))
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # sin búfer en proxies tipo nginx
+    return response
+
+
+# --------- API pública (JSON) ---------
+
+API_MATCH_FIELDS = (
+    "id", "jornada_id", "jn", "date", "scheduled_at", "home_team_id", "away_team_id",
+    "home_name", "away_name", "status", "home_score", "away_score",
+    "winner_one_player", "no_show_team_id", "updated_at",
+)
+API_JORNADA_FIELDS = ("id", "number", "date", "matches")
+API_STANDINGS_FIELDS = (
+    "pos", "team_id", "team_name", "played", "wins", "losses", "no_shows",
+    "gf", "ga", "gd", "points", "rating", "form", "streak",
+)
+API_DEFAULT_LIMIT = 50
+API_MAX_LIMIT = 500
+
+
+class ApiError(ValueError):
+    pass
+
+
+@app.errorhandler(ApiError)
+def api_error(exc):
+    return jsonify(error=str(exc)), 400
+
+
+def encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(value):
+    if not value:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+        number, row_id = (int(k) for k in key)
+    except (ValueError, TypeError):
+        raise ApiError("cursor no válido")
+    return number, row_id
+
+
+def api_int(name, default=None):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f"{name} debe ser un entero")
+
+
+def api_date(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return parse_date(value).isoformat()
+    except ValueError:
+        raise ApiError(f"{name} debe tener formato YYYY-MM-DD")
+
+
+def api_limit():
+    limit = api_int("limit", API_DEFAULT_LIMIT)
+    if not 1 <= limit <= API_MAX_LIMIT:
+        raise ApiError(f"limit debe estar entre 1 y {API_MAX_LIMIT}")
+    return limit
+
+
+def api_fields(allowed):
+    value = request.args.get("fields")
+    if not value:
+        return allowed
+    fields = tuple(f.strip() for f in value.split(",") if f.strip())
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ApiError(f"campos desconocidos: {', '.join(unknown)}")
+    return fields
+
+
+def api_etag(conn) -> str:
+    """ETag derivado de la versión de datos y la URL: el 304 no ejecuta consultas."""
+    return sha1(f"{data_version(conn)}:{request.full_path}".encode()).hexdigest()
+
+
+def api_response(etag, payload=None):
+    if payload is None:
+        resp = make_response("", 304)
+    else:
+        resp = jsonify(payload)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@app.get("/api/v1/matches")
+def api_matches():
+    """Partidos paginados por cursor sobre (jornada, id). Filtros: team, jornada, status, from, to."""
+    status = request.args.get("status") or None
+    if status not in (None, "scheduled", "completed"):
+        raise ApiError("status debe ser scheduled o completed")
+    limit = api_limit()
+    fields = api_fields(API_MATCH_FIELDS)
+    filters = dict(
+        after=decode_cursor(request.args.get("cursor")),
+        team_id=api_int("team"),
+        jornada=api_int("jornada"),
+        status=status,
+        date_from=api_date("from"),
+        date_to=api_date("to"),
+    )
+    with public_connection() as conn:
+        etag = api_etag(conn)
+        if etag in request.if_none_match:
+            return api_response(etag)
+        rows = fetch_matches(conn, limit=limit + 1, **filters)
+        page = rows[:limit]
+        next_cursor = encode_cursor((page[-1]["jn"], page[-1]["id"])) if len(rows) > limit else None
+        return api_response(etag, {
+            "data": [{f: row[f] for f in fields} for row in page],
+            "next_cursor": next_cursor,
+        })
+
+
+@app.get("/api/v1/jornadas")
+def api_jornadas():
+    """Jornadas con sus partidos, paginadas por cursor sobre (número, id)."""
+    limit = api_limit()
+    fields = api_fields(API_JORNADA_FIELDS)
+    after = decode_cursor(request.args.get("cursor"))
+    with public_connection() as conn:
+        etag = api_etag(conn)
+        if etag in request.if_none_match:
+            return api_response(etag)
+        items = fetch_jornadas_with_matches(conn, after=after, limit=limit + 1)
+        page = items[:limit]
+        next_cursor = None
+        if len(items) > limit:
+            last = page[-1]["jornada"]
+            next_cursor = encode_cursor((last["number"], last["id"]))
+        data = []
+        for item in page:
+            row = {**item["jornada"], "matches": [
+                {f: m[f] for f in API_MATCH_FIELDS if f in m} for m in item["matches"]
+            ]}
+            data.append({f: row[f] for f in fields})
+        return api_response(etag, {"data": data, "next_cursor": next_cursor})
+
+
+@app.get("/api/v1/standings")
+def api_standings():
+    fields = api_fields(API_STANDINGS_FIELDS)
+    with public_connection() as conn:
+        etag = api_etag(conn)
+        if etag in request.if_none_match:
+            return api_response(etag)
+        table = cached_standings(conn)
+        ratings = cached_ratings(conn)
+        data = [{**row, **rating_fields(ratings.get(row["team_id"]))} for row in table]
+        return api_response(etag, {"data": [{f: row[f] for f in fields} for row in data]})
 
 
 # --------- Autenticación equipos ---------
@@ -118,9 +632,15 @@ def login():
     if request.method == "POST":
         username = request.form.get("username", "").strip()
         password = request.form.get("password", "")
+        try:
+            login_throttle.attempt(username, request.remote_addr)
+        except LoginThrottled as exc:
+            flash(f"Demasiados intentos; inténtelo de nuevo en {exc.retry_after} segundos", "danger")
+            return render_template("login.html"), 429, {"Retry-After": str(exc.retry_after)}
 
         if username == app.config["ADMIN_USERNAME"]:
-            if password == app.config["ADMIN_PASSWORD"]:
+            if hmac.compare_digest(password.encode(), app.config["ADMIN_PASSWORD"].encode()):
+                login_throttle.reset(username, request.remote_addr)
                 session.clear()
                 session["role"] = "admin"
                 flash("Acceso de administrador concedido", "success")
@@ -138,10 +658,24 @@ def login():
             flash("Usuario no encontrado o inactivo", "danger")
             return render_template("login.html")
 
-        if not check_password_hash(row["password_hash"], password):
-            flash("Contraseña incorrecta", "danger")
-            return render_template("login.html")
+        try:
+            if not verify_password(row["password_hash"], password):
+                flash("Contraseña incorrecta", "danger")
+                return render_template("login.html")
+            # método o coste cambiados en la configuración: se rehace el hash ahora que se conoce la contraseña
+            new_hash = hash_password(password) if needs_rehash(row["password_hash"]) else None
+        except PasswordHashBusy:
+            flash("Servidor ocupado, inténtelo de nuevo en unos segundos", "warning")
+            return render_template("login.html"), 503, {"Retry-After": "5"}
+        if new_hash:
+            with get_connection() as conn:
+                conn.execute(
+                    "UPDATE teams SET password_hash=? WHERE id=? AND password_hash=?",
+                    (new_hash, row["id"], row["password_hash"]),
+                )
+                conn.commit()
 
+        login_throttle.reset(username, request.remote_addr)
         session.clear()
         session["role"] = "team"
         session["team_id"] = row["id"]
@@ -165,66 +699,45 @@ def team_dashboard():
     tid = current_team_id()
     with get_connection() as conn:
         team = conn.execute("SELECT * FROM teams WHERE id=?", (tid,)).fetchone()
-        upcoming = conn.execute(
-            """
-            SELECT m.*, j.date, th.name as home_name, ta.name as away_name
-            FROM matches m
-            JOIN jornadas j ON j.id=m.jornada_id
-            JOIN teams th ON th.id=m.home_team_id
-            JOIN teams ta ON ta.id=m.away_team_id
-            WHERE (m.home_team_id=? OR m.away_team_id=?) AND m.status='scheduled'
-            ORDER BY j.date ASC
-            LIMIT 10
-            """,
-            (tid, tid),
-        ).fetchall()
-        pending_to_fill = conn.execute(
-            """
-            SELECT m.*, j.date, th.name as home_name, ta.name as away_name
-            FROM matches m
-            JOIN jornadas j ON j.id=m.jornada_id
-            JOIN teams th ON th.id=m.home_team_id
-            JOIN teams ta ON ta.id=m.away_team_id
-            WHERE (m.home_team_id=? OR m.away_team_id=?) AND m.status='scheduled' AND j.date <= date('now')
-            ORDER BY j.date ASC
-            """,
-            (tid, tid),
-        ).fetchall()
-        recent = conn.execute(
-            """
-            SELECT m.*, j.date, th.name as home_name, ta.name as away_name
-            FROM matches m
-            JOIN jornadas j ON j.id=m.jornada_id
-            JOIN teams th ON th.id=m.home_team_id
-            JOIN teams ta ON ta.id=m.away_team_id
-            WHERE (m.home_team_id=? OR m.away_team_id=?) AND m.status='completed'
-            ORDER BY j.date DESC, m.updated_at DESC
-            LIMIT 10
-            """,
-            (tid, tid),
-        ).fetchall()
+        upcoming = fetch_team_upcoming(conn, tid)
+        pending_to_fill = fetch_team_pending(conn, tid)
+        recent = fetch_team_recent(conn, tid)
+        rating = cached_ratings(conn).get(tid)
     return render_template(
-        "team_dashboard.html", team=team, upcoming=upcoming, pending=pending_to_fill, recent=recent
+        "team_dashboard.html", team=team, upcoming=upcoming, pending=pending_to_fill, recent=recent,
+        rating=rating,
     )
 
 
+def save_team_result(conn, match_id, team_id, home_score, away_score, winner_one_player, no_show_team_id) -> bool:
+    """
+    Guarda el resultado solo si el partido sigue pendiente (compare-and-set en
+    el UPDATE). Devuelve False si el otro equipo se adelantó. Se llama dentro
+    de db.write_transaction.
+    """
+    cur = conn.execute(
+        """
+        UPDATE matches
+        SET status='completed', home_score=?, away_score=?, winner_one_player=?,
+            no_show_team_id=?, submitted_by_team_id=?, updated_at=?
+        WHERE id=? AND status='scheduled'
+        """,
+        (home_score, away_score, winner_one_player, no_show_team_id, team_id, now_local_iso(), match_id),
+    )
+    if cur.rowcount != 1:
+        return False
+    apply_completed_match(conn, match_id)
+    mark_data_changed(conn)
+    return True
+
+
 @app.route("/team/match/<int:match_id>/enter", methods=["GET", "POST"])
 def enter_result(match_id: int):
     if current_team_id() is None:
         return redirect(url_for("login"))
     tid = current_team_id()
     with get_connection() as conn:
-        m = conn.execute(
-            """
-            SELECT m.*, j.date, th.name as home_name, ta.name as away_name
-            FROM matches m
-            JOIN jornadas j ON j.id=m.jornada_id
-            JOIN teams th ON th.id=m.home_team_id
-            JOIN teams ta ON ta.id=m.away_team_id
-            WHERE m.id=?
-            """,
-            (match_id,),
-        ).fetchone()
+        m = fetch_match(conn, match_id)
         if not m:
             flash("Partido no encontrado", "danger")
             return redirect(url_for("team_dashboard"))
@@ -236,22 +749,13 @@ def enter_result(match_id: int):
             return redirect(url_for("team_dashboard"))
 
         if request.method == "POST":
+            # se valida todo antes de tomar el bloqueo de escritura
             no_show = request.form.get("no_show")
-            winner_one_player = 1 if request.form.get("winner_one_player") == "on" else 0
             if no_show == "opponent":
                 # El rival no se presentó -> victoria administrativa
                 no_show_team_id = m["away_team_id"] if tid == m["home_team_id"] else m["home_team_id"]
-                conn.execute(
-                    """
-                    UPDATE matches SET status='completed', home_score=NULL, away_score=NULL,
-                           no_show_team_id=?, winner_one_player=0, submitted_by_team_id=?, updated_at=?
-                    WHERE id=?
-                    """,
-                    (no_show_team_id, tid, now_local_iso(), match_id),
-                )
-                conn.commit()
-                flash("Resultado registrado: incomparecencia del rival", "success")
-                return redirect(url_for("team_dashboard"))
+                result = (None, None, 0, no_show_team_id)
+                message = "Resultado registrado: incomparecencia del rival"
             else:
                 # Resultado normal
                 try:
@@ -263,18 +767,15 @@ def enter_result(match_id: int):
                 if home_score == away_score:
                     flash("No se permite empate. Ajuste los marcadores.", "danger")
                     return render_template("enter_result.html", m=m)
-                conn.execute(
-                    """
-                    UPDATE matches
-                    SET status='completed', home_score=?, away_score=?, winner_one_player=?,
-                        no_show_team_id=NULL, submitted_by_team_id=?, updated_at=?
-                    WHERE id=?
-                    """,
-                    (home_score, away_score, winner_one_player, tid, now_local_iso(), match_id),
-                )
-                conn.commit()
-                flash("Resultado registrado correctamente", "success")
-                return redirect(url_for("team_dashboard"))
+                winner_one_player = 1 if request.form.get("winner_one_player") == "on" else 0
+                result = (home_score, away_score, winner_one_player, None)
+                message = "Resultado registrado correctamente"
+            if write_transaction(conn, save_team_result, match_id, tid, *result):
+                flash(message, "success")
+            else:
+                # el otro equipo lo registró entre la lectura y la escritura
+                flash("Este partido ya tiene resultado", "info")
+            return redirect(url_for("team_dashboard"))
 
     return render_template("enter_result.html", m=m)
 
@@ -294,14 +795,54 @@ def admin_dashboard():
         team_count = conn.execute("SELECT COUNT(*) AS c FROM teams").fetchone()["c"]
         jornada_count = conn.execute("SELECT COUNT(*) AS c FROM jornadas").fetchone()["c"]
         match_count = conn.execute("SELECT COUNT(*) AS c FROM matches").fetchone()["c"]
+        export = export_status(conn)
+    if export.get("last_export_at"):
+        export["last_export_at"] = datetime.fromtimestamp(export["last_export_at"], TZ).strftime("%Y-%m-%d %H:%M:%S")
     return render_template(
         "admin_dashboard.html",
         team_count=team_count,
         jornada_count=jornada_count,
         match_count=match_count,
+        db_stats=pool_stats(),
+        export=export,
+        export_enabled=app.config["EXPORT_ON_WRITE"],
     )
 
 
+@app.get("/admin/metrics")
+def admin_metrics():
+    if not metrics.enabled():
+        abort(404)
+    token = app.config["METRICS_TOKEN"]
+    bearer = request.headers.get("Authorization", "")
+    if not is_admin() and not (token and hmac.compare_digest(bearer, f"Bearer {token}")):
+        abort(401)
+    pool = pool_stats()
+    gauges = {
+        "liga_db_connections_open": ("Conexiones SQLite abiertas en el proceso", pool["open"]),
+        "liga_sse_connections": ("Streams /events abiertos en el proceso", event_broadcaster.connections()),
+        "liga_cache_entries": ("Entradas en las cachés en memoria", {}),
+    }
+    counters = {
+        "liga_db_connections_total": (
+            "Conexiones SQLite por evento (acumulado)",
+            {(("event", event),): pool[event] for event in ("opened", "reused", "closed", "discarded_after_fork")},
+        ),
+        "liga_db_write_retries_total": ("Escrituras reintentadas por base ocupada (acumulado)", pool["write_retries"]),
+        "liga_cache_lookups_total": ("Consultas a las cachés en memoria por resultado (acumulado)", {}),
+    }
+    for name, cache in (("page", page_cache), ("standings", standings_cache), ("fragment", fragment_cache)):
+        stats = cache.stats()
+        gauges["liga_cache_entries"][1][(("cache", name),)] = stats["size"]
+        for result in ("hits", "misses"):
+            counters["liga_cache_lookups_total"][1][(("cache", name), ("result", result))] = stats[result]
+    response = make_response(metrics.render(gauges, counters))
+    response.mimetype = "text/plain"
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 @app.route("/admin/teams", methods=["GET", "POST"])
 def admin_teams():
     if not is_admin():
@@ -311,20 +852,55 @@ def admin_teams():
             name = request.form.get("name", "").strip()
             username = request.form.get("username", "").strip()
             password = request.form.get("password", "")
+            venue = request.form.get("venue", "").strip() or None
             if not name or not username or not password:
                 flash("Nombre, usuario y contraseña son obligatorios", "danger")
             else:
                 try:
                     conn.execute(
-                        "INSERT INTO teams(name, username, password_hash) VALUES(?,?,?)",
-                        (name, username, generate_password_hash(password)),
+                        "INSERT INTO teams(name, username, password_hash, venue) VALUES(?,?,?,?)",
+                        (name, username, hash_password(password), venue),
                     )
+                    mark_data_changed(conn)
                     conn.commit()
                     flash("Equipo creado", "success")
                 except sqlite3.IntegrityError:
                     flash("Nombre o usuario ya existe", "danger")
+                except PasswordHashBusy:
+                    flash("Servidor ocupado, inténtelo de nuevo en unos segundos", "warning")
         teams = conn.execute("SELECT * FROM teams ORDER BY name").fetchall()
-    return render_template("admin_teams.html", teams=teams)
+        blackouts = {}
+        for row in conn.execute("SELECT team_id, date FROM team_blackouts ORDER BY team_id, date"):
+            blackouts.setdefault(row["team_id"], []).append(row["date"])
+    return render_template("admin_teams.html", teams=teams, blackouts=blackouts)
+
+
+@app.post("/admin/teams/<int:team_id>/constraints")
+def admin_team_constraints(team_id: int):
+    """Sede y fechas no disponibles del equipo, para el calendario optimizado."""
+    if not is_admin():
+        return redirect(url_for("login"))
+    venue = request.form.get("venue", "").strip() or None
+    dates = set()
+    for raw in request.form.get("blackouts", "").replace(";", ",").split(","):
+        if raw.strip():
+            try:
+                dates.add(parse_date(raw.strip()).isoformat())
+            except ValueError:
+                flash(f"Fecha no válida: {raw.strip()} (use YYYY-MM-DD)", "danger")
+                return redirect(url_for("admin_teams"))
+    with get_connection() as conn:
+        if conn.execute("SELECT 1 FROM teams WHERE id=?", (team_id,)).fetchone() is None:
+            abort(404)
+        # no cambia datos públicos: no hace falta mark_data_changed
+        conn.execute("UPDATE teams SET venue=? WHERE id=?", (venue, team_id))
+        conn.execute("DELETE FROM team_blackouts WHERE team_id=?", (team_id,))
+        conn.executemany(
+            "INSERT INTO team_blackouts(team_id, date) VALUES(?,?)", [(team_id, d) for d in sorted(dates)]
+        )
+        conn.commit()
+    flash("Restricciones de calendario actualizadas", "success")
+    return redirect(url_for("admin_teams"))
 
 
 @app.post("/admin/teams/<int:team_id>/toggle")
@@ -336,6 +912,7 @@ def admin_team_toggle(team_id: int):
         if row:
             new_val = 0 if row["is_active"] else 1
             conn.execute("UPDATE teams SET is_active=? WHERE id=?", (new_val, team_id))
+            mark_data_changed(conn)
             conn.commit()
             flash("Estado actualizado", "success")
     return redirect(url_for("admin_teams"))
@@ -349,16 +926,83 @@ def admin_team_reset_pwd(team_id: int):
     if not pwd:
         flash("Contraseña no puede estar vacía", "danger")
         return redirect(url_for("admin_teams"))
+    try:
+        pwd_hash = hash_password(pwd)
+    except PasswordHashBusy:
+        flash("Servidor ocupado, inténtelo de nuevo en unos segundos", "warning")
+        return redirect(url_for("admin_teams"))
     with get_connection() as conn:
         conn.execute(
             "UPDATE teams SET password_hash=? WHERE id=?",
-            (generate_password_hash(pwd), team_id),
+            (pwd_hash, team_id),
         )
         conn.commit()
     flash("Contraseña actualizada", "success")
     return redirect(url_for("admin_teams"))
 
 
+def save_jornadas(conn, dates) -> dict:
+    """
+    Aplica el formulario de jornadas como diferencias dentro de
+    db.write_transaction: inserta las nuevas, cambia la fecha de las que la
+    cambian y borra las que sobran. `dates` es {número: fecha, o None si se
+    dejó vacía}. Si algún borrado arrastraría partidos jugados no cambia nada y
+    devuelve sus números en "blocked": así la clasificación y el Elo, que solo
+    dependen de partidos jugados, no hay que recalcularlos.
+    """
+    stored, surplus = {}, []
+    for row in conn.execute("SELECT id, number, date FROM jornadas ORDER BY number, id"):
+        if row["number"] in dates and row["number"] not in stored:
+            stored[row["number"]] = row
+        else:
+            surplus.append(row["id"])  # números que ya no están o repetidos
+    summary = {"inserted": 0, "updated": 0, "deleted": 0, "dropped_matches": 0, "blocked": [], "missing": []}
+    if surplus:
+        marks = ",".join("?" * len(surplus))
+        summary["blocked"] = [
+            row["number"]
+            for row in conn.execute(
+                f"""
+                SELECT DISTINCT j.number FROM jornadas j
+                JOIN matches m ON m.jornada_id=j.id
+                WHERE j.id IN ({marks}) AND m.status='completed'
+                ORDER BY j.number
+                """,
+                surplus,
+            )
+        ]
+        if summary["blocked"]:
+            return summary
+        summary["dropped_matches"] = conn.execute(
+            f"SELECT COUNT(*) AS c FROM matches WHERE jornada_id IN ({marks})", surplus
+        ).fetchone()["c"]
+        # el borrado en cascada se lleva sus partidos pendientes
+        conn.execute(f"DELETE FROM jornadas WHERE id IN ({marks})", surplus)
+        summary["deleted"] = len(surplus)
+    for number, date_str in sorted(dates.items()):
+        row = stored.get(number)
+        if row is None:
+            if date_str is None:
+                summary["missing"].append(number)
+                date_str = today_local().isoformat()
+            conn.execute("INSERT INTO jornadas(number, date) VALUES(?, ?)", (number, date_str))
+            summary["inserted"] += 1
+        elif date_str is not None and date_str != row["date"]:
+            conn.execute("UPDATE jornadas SET date=? WHERE id=?", (date_str, row["id"]))
+            # los partidos pendientes se mueven de día y conservan la hora
+            conn.execute(
+                """
+                UPDATE matches SET scheduled_at = ? || substr(scheduled_at, 11)
+                WHERE jornada_id=? AND status='scheduled' AND scheduled_at IS NOT NULL
+                """,
+                (date_str, row["id"]),
+            )
+            summary["updated"] += 1
+    if summary["inserted"] or summary["updated"] or summary["deleted"]:
+        mark_data_changed(conn)
+    return summary
+
+
 @app.route("/admin/jornadas", methods=["GET", "POST"])
 def admin_jornadas():
     if not is_admin():
@@ -371,21 +1015,36 @@ def admin_jornadas():
                 n = 0
             if n <= 0:
                 flash("Introduzca un número de jornadas válido", "danger")
+                return redirect(url_for("admin_jornadas"))
+            # se valida todo antes de tomar el bloqueo de escritura
+            dates = {}
+            for i in range(1, n + 1):
+                date_str = request.form.get(f"date_{i}", "").strip()
+                try:
+                    dates[i] = parse_date(date_str).isoformat() if date_str else None
+                except ValueError:
+                    flash(f"Fecha no válida en la jornada {i}: {date_str} (use YYYY-MM-DD)", "danger")
+                    return redirect(url_for("admin_jornadas"))
+            summary = write_transaction(conn, save_jornadas, dates)
+            if summary["blocked"]:
+                numbers = ", ".join(str(number) for number in summary["blocked"])
+                flash(f"No se guardó nada: las jornadas {numbers} tienen partidos jugados y no se pueden borrar", "danger")
+            elif not (summary["inserted"] or summary["updated"] or summary["deleted"]):
+                flash("Sin cambios en las jornadas", "info")
             else:
-                # borrar y recrear con fechas
-                conn.execute("DELETE FROM jornadas")
-                for i in range(1, n + 1):
-                    date_str = request.form.get(f"date_{i}", "").strip()
-                    if not date_str:
-                        flash(f"Falta fecha para jornada {i}", "warning")
-                        date_str = today_local().isoformat()
-                    conn.execute(
-                        "INSERT INTO jornadas(number, date) VALUES(?, ?)", (i, date_str)
-                    )
-                conn.commit()
-                flash("Jornadas guardadas", "success")
+                for number in summary["missing"]:
+                    flash(f"Falta fecha para jornada {number}: se usó la de hoy", "warning")
+                if summary["dropped_matches"]:
+                    flash(f"Se eliminaron {summary['dropped_matches']} partidos pendientes de las jornadas borradas", "warning")
+                flash(
+                    f"Jornadas guardadas: {summary['inserted']} nuevas, {summary['updated']} con fecha cambiada, "
+                    f"{summary['deleted']} eliminadas",
+                    "success",
+                )
+            return redirect(url_for("admin_jornadas"))
         jornadas = conn.execute("SELECT * FROM jornadas ORDER BY number").fetchall()
-    return render_template("admin_jornadas.html", jornadas=jornadas)
+    dates = {j["number"]: j["date"] for j in jornadas}
+    return render_template("admin_jornadas.html", jornadas=jornadas, dates=dates)
 
 
 @app.post("/admin/generate_fixtures")
@@ -393,55 +1052,150 @@ def admin_generate_fixtures():
     if not is_admin():
         return redirect(url_for("login"))
     reset = request.form.get("reset") == "on"
+    optimize = request.form.get("optimize") == "on"
+    legs_raw = request.form.get("legs", "").strip()
+    try:
+        legs = int(legs_raw) if legs_raw else None
+    except ValueError:
+        flash("Introduzca un número de vueltas válido", "danger")
+        return redirect(url_for("admin_dashboard"))
     with get_connection() as conn:
         team_ids = [row["id"] for row in conn.execute("SELECT id FROM teams WHERE is_active=1 ORDER BY id").fetchall()]
         jornadas = conn.execute("SELECT * FROM jornadas ORDER BY number").fetchall()
         if not team_ids or not jornadas:
             flash("Necesita equipos activos y jornadas definidas", "danger")
             return redirect(url_for("admin_dashboard"))
-        if reset:
-            conn.execute("DELETE FROM matches")
-        rounds = round_robin_pairings(team_ids)  # (n-1) rondas
-
-        # repetir rondas si hay más jornadas que rondas
-        pairs_by_round = rounds.copy()
-        idx = 0
-        for j in jornadas:
-            if idx >= len(pairs_by_round):
-                # segunda vuelta: invertimos localía
-                rev = [[(b, a) for (a, b) in rnd] for rnd in rounds]
-                pairs_by_round.extend(rev)
-            pairs = pairs_by_round[idx]
-            for (home, away) in pairs:
-                conn.execute(
-                    """
-                    INSERT INTO matches(jornada_id, home_team_id, away_team_id, scheduled_at, status)
-                    VALUES(?,?,?,?, 'scheduled')
-                    """,
-                    (j["id"], home, away, j["date"] + " 22:30:00"),  # hora por defecto
+        # todo el calendario se construye y valida en memoria antes de escribir
+        quality = None
+        try:
+            if optimize:
+                venues = {
+                    row["id"]: row["venue"]
+                    for row in conn.execute("SELECT id, venue FROM teams WHERE is_active=1 AND venue IS NOT NULL")
+                }
+                blackouts = {}
+                for row in conn.execute("SELECT team_id, date FROM team_blackouts"):
+                    blackouts.setdefault(row["team_id"], []).append(row["date"])
+                fixtures, quality = optimize_fixtures(
+                    team_ids, jornadas, legs, venues, blackouts,
+                    time_limit=app.config["SCHEDULER_TIME_LIMIT"],
                 )
-            idx += 1
+            else:
+                fixtures = build_fixtures(team_ids, jornadas, legs)
+        except ValueError as exc:
+            flash(str(exc), "danger")
+            return redirect(url_for("admin_dashboard"))
+        with bulk_match_writes(conn):
+            if reset:
+                conn.execute("DELETE FROM matches")
+                rebuild_standings(conn, app.config["NO_SHOW_WIN_POINTS"])
+                replay_ratings(conn)
+            conn.executemany(
+                """
+                INSERT INTO matches(jornada_id, home_team_id, away_team_id, scheduled_at, status)
+                VALUES(?,?,?,?, 'scheduled')
+                """,
+                fixtures,
+            )
+        mark_data_changed(conn)
         conn.commit()
-        flash("Calendario generado", "success")
+        flash(f"Calendario generado ({len(fixtures)} partidos)", "success")
+    if quality:
+        base = quality["baseline"]
+        flash(
+            f"Calendario optimizado en {quality['seconds']} s: puntuación {quality['score']}/100 "
+            f"frente al calendario sin optimizar. Roturas de localía: {base['breaks']} → {quality['breaks']}; "
+            f"choques de sede: {base['venue_clashes']} → {quality['venue_clashes']} "
+            f"(inevitables: {quality['venue_unavoidable']}); "
+            f"partidos en fechas no disponibles: {base['blackout_conflicts']} → {quality['blackout_conflicts']} "
+            f"(inevitables: {quality['blackout_unavoidable']}); "
+            f"descansos cortos desiguales: {base['short_rest_spread']} → {quality['short_rest_spread']}",
+            "info",
+        )
     return redirect(url_for("admin_matches"))
 
 
+def import_results(conn, results) -> int:
+    """Aplica los resultados ya validados. Se llama dentro de db.write_transaction."""
+    with bulk_match_writes(conn):
+        count = apply_results(conn, results, app.config["NO_SHOW_WIN_POINTS"])
+    mark_data_changed(conn)
+    return count
+
+
+@app.route("/admin/import", methods=["GET", "POST"])
+def admin_import():
+    if not is_admin():
+        return redirect(url_for("login"))
+    errors = []
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            flash("Seleccione un fichero CSV o JSON", "danger")
+            return redirect(url_for("admin_import"))
+        dry_run = request.form.get("dry_run") == "on"
+        with get_connection() as conn:
+            try:
+                results = validate_rows(conn, parse_rows(upload.filename, upload.read()))
+                if dry_run:
+                    flash(f"Fichero válido: {len(results)} resultados listos para importar", "info")
+                else:
+                    count = write_transaction(conn, import_results, results)
+                    flash(f"Importados {count} resultados", "success")
+                    return redirect(url_for("admin_matches"))
+            except ResultImportError as exc:
+                errors = exc.errors
+            except sqlite3.OperationalError as exc:
+                # write_transaction ya agotó los reintentos: no se importó nada
+                if not is_busy_error(exc):
+                    raise
+                flash("La base de datos está ocupada; no se importó nada, vuelva a intentarlo", "danger")
+                return redirect(url_for("admin_import"))
+    return render_template("admin_import.html", errors=errors[:MAX_IMPORT_ERRORS], error_count=len(errors))
+
+
 @app.get("/admin/matches")
 def admin_matches():
     if not is_admin():
         return redirect(url_for("login"))
-    with get_connection() as conn:
-        rows = conn.execute(
-            """
-            SELECT m.*, j.number as jn, j.date, th.name as home_name, ta.name as away_name
-            FROM matches m
-            JOIN jornadas j ON j.id=m.jornada_id
-            JOIN teams th ON th.id=m.home_team_id
-            JOIN teams ta ON ta.id=m.away_team_id
-            ORDER BY j.number, m.id
-            """
-        ).fetchall()
-    return render_template("admin_matches.html", matches=rows)
+    return stream_page("admin_matches.html", matches=iter_matches(get_connection()))
+
+
+def reopen_match(conn, match_id: int) -> bool:
+    """
+    Vuelve a dejar pendiente un partido completado y revierte su clasificación y
+    su Elo. El UPDATE es un compare-and-set sobre status='completed': si otra
+    petición ya lo reabrió no se resta dos veces y devuelve False. Se llama
+    dentro de db.write_transaction.
+    """
+    m = conn.execute("SELECT * FROM matches WHERE id=?", (match_id,)).fetchone()
+    cur = conn.execute(
+        """
+        UPDATE matches
+        SET status='scheduled', home_score=NULL, away_score=NULL, winner_one_player=0, no_show_team_id=NULL
+        WHERE id=? AND status='completed'
+        """,
+        (match_id,),
+    )
+    if cur.rowcount != 1:
+        return False
+    apply_match_to_standings(conn, m, app.config["NO_SHOW_WIN_POINTS"], sign=-1)
+    revert_match_ratings(conn, match_id)
+    mark_data_changed(conn)
+    return True
+
+
+def delete_match(conn, match_id: int) -> bool:
+    """
+    Borra un partido; si estaba completado lo reabre antes (reopen_match) para
+    revertir su resultado una sola vez. Devuelve False si ya no existía. Se
+    llama dentro de db.write_transaction.
+    """
+    reopen_match(conn, match_id)
+    if conn.execute("DELETE FROM matches WHERE id=?", (match_id,)).rowcount != 1:
+        return False
+    mark_data_changed(conn)
+    return True
 
 
 @app.post("/admin/matches/<int:match_id>/reset")
@@ -449,12 +1203,11 @@ def admin_match_reset(match_id: int):
     if not is_admin():
         return redirect(url_for("login"))
     with get_connection() as conn:
-        conn.execute(
-            "UPDATE matches SET status='scheduled', home_score=NULL, away_score=NULL, winner_one_player=0, no_show_team_id=NULL WHERE id=?",
-            (match_id,),
-        )
-        conn.commit()
-    flash("Partido reabierto", "success")
+        reopened = write_transaction(conn, reopen_match, match_id)
+    if reopened:
+        flash("Partido reabierto", "success")
+    else:
+        flash("El partido no tenía resultado (o ya se reabrió)", "info")
     return redirect(url_for("admin_matches"))
 
 
@@ -463,9 +1216,11 @@ def admin_match_delete(match_id: int):
     if not is_admin():
         return redirect(url_for("login"))
     with get_connection() as conn:
-        conn.execute("DELETE FROM matches WHERE id=?", (match_id,))
-        conn.commit()
-    flash("Partido eliminado", "success")
+        deleted = write_transaction(conn, delete_match, match_id)
+    if deleted:
+        flash("Partido eliminado", "success")
+    else:
+        flash("Partido no encontrado", "info")
     return redirect(url_for("admin_matches"))
 
 
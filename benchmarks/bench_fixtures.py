@@ -0,0 +1,107 @@
+"""Mide cuánto tarda generar y guardar el calendario completo (ida y vuelta).
+
+Para cada tamaño de liga crea una base de datos temporal con los equipos y las
+jornadas necesarias, construye el calendario con utils.build_fixtures y lo
+inserta con un único executemany en una transacción. Con --optimize lo
+construye scheduler.optimize_fixtures, con un tercio de los equipos compartiendo
+sede por parejas y dos fechas no disponibles, e informa de la calidad.
+
+Uso:
+    python benchmarks/bench_fixtures.py [--teams 10 100 500] [--legs 2] [--optimize]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+from scheduler import optimize_fixtures  # noqa: E402
+from utils import build_fixtures  # noqa: E402
+
+
+def run(teams: int, legs: int, optimize: bool = False, time_limit: float = 3.0) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        db.init_db()
+        conn = db.get_connection()
+        conn.executemany(
+            "INSERT INTO teams(name, username, password_hash) VALUES(?, ?, 'x')",
+            [(f"Equipo {i}", f"equipo{i}") for i in range(teams)],
+        )
+        rounds = (teams - 1 if teams % 2 == 0 else teams) * legs
+        start = date(2025, 1, 1)
+        conn.executemany(
+            "INSERT INTO jornadas(number, date) VALUES(?, ?)",
+            [(n, (start + timedelta(days=7 * n)).isoformat()) for n in range(1, rounds + 1)],
+        )
+        conn.commit()
+        team_ids = [r["id"] for r in conn.execute("SELECT id FROM teams ORDER BY id")]
+        jornadas = conn.execute("SELECT * FROM jornadas ORDER BY number").fetchall()
+
+        quality = None
+        t0 = time.perf_counter()
+        if optimize:
+            venues = {t: f"Sede {i // 2}" for i, t in enumerate(team_ids[: 2 * (teams // 6)])}
+            blackouts = {team_ids[-1]: [jornadas[1]["date"]], team_ids[-2]: [jornadas[-2]["date"]]}
+            fixtures, quality = optimize_fixtures(team_ids, jornadas, legs, venues, blackouts, time_limit=time_limit)
+        else:
+            fixtures = build_fixtures(team_ids, jornadas, legs)
+        t1 = time.perf_counter()
+        with db.bulk_match_writes(conn):  # como admin_generate_fixtures
+            conn.executemany(
+                """
+                INSERT INTO matches(jornada_id, home_team_id, away_team_id, scheduled_at, status)
+                VALUES(?,?,?,?, 'scheduled')
+                """,
+                fixtures,
+            )
+        conn.commit()
+        t2 = time.perf_counter()
+        db.close_connection()
+    return {
+        "teams": teams,
+        "jornadas": rounds,
+        "matches": len(fixtures),
+        "build_s": t1 - t0,
+        "persist_s": t2 - t1,
+        "total_s": t2 - t0,
+        "quality": quality,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--teams", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--legs", type=int, default=2)
+    parser.add_argument("--optimize", action="store_true", help="usar el optimizador de calendario")
+    parser.add_argument("--time-limit", type=float, default=3.0, help="segundos del optimizador")
+    args = parser.parse_args()
+
+    print(f"{'equipos':>8} {'jornadas':>9} {'partidos':>9} {'generar':>9} {'guardar':>9} {'total':>9}")
+    for teams in args.teams:
+        r = run(teams, args.legs, args.optimize, args.time_limit)
+        print(
+            f"{r['teams']:>8} {r['jornadas']:>9} {r['matches']:>9} "
+            f"{r['build_s']:>8.3f}s {r['persist_s']:>8.3f}s {r['total_s']:>8.3f}s"
+        )
+        if r["quality"]:
+            q, base = r["quality"], r["quality"]["baseline"]
+            print(
+                f"{'':>8} puntuación {base['score']} -> {q['score']}, roturas {base['breaks']} -> {q['breaks']}, "
+                f"choques de sede {base['venue_clashes']} -> {q['venue_clashes']}, "
+                f"fechas {base['blackout_conflicts']} -> {q['blackout_conflicts']} "
+                f"(inevitables: {q['blackout_unavoidable']}), "
+                f"descansos cortos desiguales {base['short_rest_spread']} -> {q['short_rest_spread']}, "
+                f"{q['iterations']} iteraciones"
+            )
+
+
+if __name__ == "__main__":
+    main()
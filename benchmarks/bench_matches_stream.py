@@ -0,0 +1,108 @@
+"""Mide el primer byte (TTFB) y la memoria pico de /matches y /admin/matches.
+
+Para cada tamaño genera una liga sintética con unos --matches partidos y, en un
+proceso nuevo por caso (para que el pico de memoria sea solo de esa petición),
+pide la página con el cliente de pruebas de Flask sin acumular la respuesta:
+
+* streaming: la ruta actual (cursor + stream_template, trozos de 16 KB);
+* completo: como antes, fetchall() y render_template antes de enviar nada.
+
+Informa del tiempo hasta el primer trozo, el total, los bytes y el aumento del
+RSS máximo del proceso (ru_maxrss) respecto a antes de la petición.
+
+Uso:
+    python benchmarks/bench_matches_stream.py [--matches 1000 10000 100000] [--teams 32]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+MODES = ("streaming", "completo")
+PAGES = {"/matches": "matches.html", "/admin/matches": "admin_matches.html"}
+
+
+def peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(db_path: str, mode: str, path: str) -> dict:
+    """Una petición en este proceso; devuelve las medidas."""
+    import db
+
+    db.DB_PATH = Path(db_path)
+    from app import app
+    from flask import render_template
+    from queries import fetch_all_matches
+
+    app.config.update(TESTING=True, SNAPSHOT_ENABLED=False, PAGE_CACHE_MAX_BYTES=0)
+    client = app.test_client()
+    if path.startswith("/admin"):
+        with client.session_transaction() as sess:
+            sess["role"] = "admin"
+    with app.test_request_context(path):
+        render_template(PAGES[path], matches=[])  # compila las plantillas antes de medir
+    baseline = peak_rss_kb()
+    started = time.perf_counter()
+    if mode == "streaming":
+        resp = client.get(path, buffered=False)
+        chunks = iter(resp.response)
+        size = len(next(chunks))
+        first = time.perf_counter() - started
+        for chunk in chunks:
+            size += len(chunk)
+        resp.close()
+    else:
+        with app.test_request_context(path):
+            body = render_template(PAGES[path], matches=fetch_all_matches(db.get_connection())).encode("utf-8")
+        size = len(body)
+        first = time.perf_counter() - started
+    total = time.perf_counter() - started
+    return {"ttfb_ms": first * 1000, "total_ms": total * 1000, "bytes": size, "rss_kb": peak_rss_kb() - baseline}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--teams", type=int, default=32)
+    parser.add_argument("--child", nargs=3, metavar=("DB", "MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(*args.child)))
+        return
+
+    from generate_league import generate_league
+
+    per_season = args.teams * (args.teams - 1)
+    print(f"{'partidos':>9} {'página':<15} {'modo':<10} {'1er byte':>10} {'total':>10} {'MB':>7} {'RSS +MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for target in args.matches:
+            db_path = Path(tmp) / f"league_{target}.db"
+            seasons = max(1, round(target / per_season))
+            generate_league(db_path, teams=args.teams, seasons=seasons, completed_ratio=0.5, seed=1)
+            for path in PAGES:
+                for mode in MODES:
+                    out = subprocess.run(
+                        [sys.executable, __file__, "--child", str(db_path), mode, path],
+                        check=True, capture_output=True, text=True, cwd=tmp,
+                    ).stdout
+                    r = json.loads(out.strip().splitlines()[-1])
+                    print(
+                        f"{seasons * per_season:>9} {path:<15} {mode:<10} {r['ttfb_ms']:>8.1f}ms "
+                        f"{r['total_ms']:>8.1f}ms {r['bytes'] / 1e6:>7.2f} {r['rss_kb'] / 1024:>8.1f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
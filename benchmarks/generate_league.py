@@ -0,0 +1,157 @@
+"""Genera una base de datos sintética de la liga para pruebas de rendimiento.
+
+Crea equipos, una o varias temporadas de jornadas (ida y vuelta por defecto) con
+su calendario round-robin y marca como jugada una proporción de los partidos,
+incluyendo incomparecencias y victorias con un solo jugador. Al final
+reconstruye la clasificación precalculada y el Elo.
+
+Uso:
+    python benchmarks/generate_league.py --out darts.db --teams 20 --seasons 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+from config import Config  # noqa: E402
+from ratings import replay_ratings  # noqa: E402
+from utils import build_fixtures, rebuild_standings  # noqa: E402
+
+
+def random_result(rng: random.Random, home: int, away: int, no_show_ratio: float, one_player_ratio: float):
+    """(home_score, away_score, winner_one_player, no_show_team_id) de un partido jugado."""
+    if rng.random() < no_show_ratio:
+        return None, None, 0, rng.choice((home, away))
+    winner_legs = 6
+    loser_legs = rng.randint(0, winner_legs - 1)
+    one_player = 1 if rng.random() < one_player_ratio else 0
+    if rng.random() < 0.5:
+        return winner_legs, loser_legs, one_player, None
+    return loser_legs, winner_legs, one_player, None
+
+
+def generate_league(
+    path,
+    teams: int = 20,
+    seasons: int = 1,
+    jornadas: int | None = None,
+    completed_ratio: float = 0.5,
+    no_show_ratio: float = 0.03,
+    one_player_ratio: float = 0.1,
+    seed: int = 1,
+    start: date = date(2020, 9, 1),
+) -> dict:
+    """
+    Crea (o sobrescribe) la base de datos `path`. `jornadas` es por temporada;
+    por defecto ida y vuelta, 2 * (equipos - 1). En la última temporada solo se
+    juega la fracción `completed_ratio` de las jornadas; las anteriores están
+    completas.
+    """
+    from werkzeug.security import generate_password_hash
+
+    path = Path(path)
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(path) + suffix).unlink(missing_ok=True)
+    db.close_connection()
+    db.DB_PATH = path
+    db.init_db()
+    conn = db.get_connection()
+    rng = random.Random(seed)
+
+    password_hash = generate_password_hash("liga")  # una vez: el hash es caro a propósito
+    conn.executemany(
+        "INSERT INTO teams(name, username, password_hash) VALUES(?, ?, ?)",
+        [(f"Equipo {i:03d}", f"equipo{i:03d}", password_hash) for i in range(1, teams + 1)],
+    )
+    team_ids = [row["id"] for row in conn.execute("SELECT id FROM teams ORDER BY id")]
+    per_season = jornadas or 2 * (teams - 1 if teams % 2 == 0 else teams)
+
+    number = 0
+    day = start
+    total_matches = completed = 0
+    for season in range(seasons):
+        rows = []
+        for _ in range(per_season):
+            number += 1
+            rows.append((number, day.isoformat()))
+            day += timedelta(days=7)
+        first_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM jornadas").fetchone()[0] + 1
+        conn.executemany("INSERT INTO jornadas(number, date) VALUES(?, ?)", rows)
+        season_jornadas = conn.execute(
+            "SELECT * FROM jornadas WHERE id >= ? ORDER BY number", (first_id,)
+        ).fetchall()
+        fixtures = build_fixtures(team_ids, season_jornadas)
+        last_season = season == seasons - 1
+        played_jornadas = int(per_season * completed_ratio) if last_season else per_season
+        played_ids = {j["id"] for j in season_jornadas[:played_jornadas]}
+
+        matches = []
+        for jornada_id, home, away, scheduled_at in fixtures:
+            if jornada_id in played_ids:
+                hs, as_, one, no_show = random_result(rng, home, away, no_show_ratio, one_player_ratio)
+                matches.append((jornada_id, home, away, scheduled_at, "completed", hs, as_, one, no_show, home, scheduled_at))
+                completed += 1
+            else:
+                matches.append((jornada_id, home, away, scheduled_at, "scheduled", None, None, 0, None, None, None))
+        with db.bulk_match_writes(conn):
+            conn.executemany(
+                """
+                INSERT INTO matches(jornada_id, home_team_id, away_team_id, scheduled_at, status,
+                                    home_score, away_score, winner_one_player, no_show_team_id,
+                                    submitted_by_team_id, updated_at)
+                VALUES(?,?,?,?,?,?,?,?,?,?,?)
+                """,
+                matches,
+            )
+        total_matches += len(matches)
+
+    rebuild_standings(conn, Config.NO_SHOW_WIN_POINTS)
+    replay_ratings(conn)
+    db.bump_data_version(conn)
+    conn.commit()
+    return {
+        "teams": teams,
+        "seasons": seasons,
+        "jornadas": number,
+        "matches": total_matches,
+        "completed": completed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default="darts.db", help="fichero de salida (se sobrescribe)")
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--seasons", type=int, default=1)
+    parser.add_argument("--jornadas", type=int, default=None, help="jornadas por temporada")
+    parser.add_argument("--completed-ratio", type=float, default=0.5)
+    parser.add_argument("--no-show-ratio", type=float, default=0.03)
+    parser.add_argument("--one-player-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    info = generate_league(
+        args.out,
+        teams=args.teams,
+        seasons=args.seasons,
+        jornadas=args.jornadas,
+        completed_ratio=args.completed_ratio,
+        no_show_ratio=args.no_show_ratio,
+        one_player_ratio=args.one_player_ratio,
+        seed=args.seed,
+    )
+    print(
+        f"{args.out}: {info['teams']} equipos, {info['jornadas']} jornadas, "
+        f"{info['matches']} partidos ({info['completed']} jugados)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Micro-benchmarks de las funciones principales y de las rutas de la app.
+
+Genera una liga sintética (benchmarks/generate_league.py) en un directorio
+temporal y mide compute_standings, round_robin_pairings, cada función de
+export_public_data.py y cada ruta GET mediante el cliente de pruebas de Flask
+(con las cachés vaciadas antes de cada llamada, y además con caché caliente
+para las páginas públicas), más el ciclo de escritura enter_result + reabrir.
+
+Los resultados se guardan en JSON; con --compare se contrastan con una
+ejecución anterior y el proceso termina con código 1 si algún caso empeora más
+del umbral indicado.
+
+Uso:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json --threshold 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import db  # noqa: E402
+from generate_league import generate_league  # noqa: E402
+
+
+def fetch(client, url):
+    """GET leyendo el cuerpo: las páginas en streaming se renderizan al leerlo (no /events, que no acaba)."""
+    resp = client.get(url)
+    if resp.mimetype != "text/event-stream":
+        resp.get_data()
+    resp.close()
+    return resp
+
+
+def measure(func, repeat: int) -> dict:
+    func()  # calentamiento
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {
+        "min_ms": min(times),
+        "median_ms": statistics.median(times),
+        "mean_ms": statistics.fmean(times),
+        "repeat": repeat,
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_cases(app, conn):
+    """Devuelve [(nombre, función)] para todos los casos medidos."""
+    import export_public_data
+    import app as app_module
+    from config import Config
+    from utils import compute_standings, compute_standings_from_matches, round_robin_pairings
+
+    def cold(func):
+        def run():
+            app_module.page_cache.clear()
+            app_module.standings_cache.clear()
+            app_module.probabilities_cache.clear()
+            app_module.fragment_cache.clear()
+            return func()
+        return run
+
+    team_ids = [row["id"] for row in conn.execute("SELECT id FROM teams ORDER BY id")]
+    match = conn.execute(
+        "SELECT id, home_team_id FROM matches WHERE status='scheduled' ORDER BY id LIMIT 1"
+    ).fetchone()
+    any_match = conn.execute("SELECT id FROM matches ORDER BY id LIMIT 1").fetchone()
+
+    cases = [
+        ("compute_standings", lambda: compute_standings(conn, Config.NO_SHOW_WIN_POINTS)),
+        ("compute_standings_from_matches", lambda: compute_standings_from_matches(conn, Config.NO_SHOW_WIN_POINTS)),
+        ("round_robin_pairings", lambda: round_robin_pairings(team_ids)),
+    ]
+    for filename, build in export_public_data.EXPORTS:
+        cases.append((f"export:{filename}", lambda build=build: build(conn)))
+
+    public = app.test_client()
+    team = app.test_client()
+    admin = app.test_client()
+    with team.session_transaction() as sess:
+        sess["role"] = "team"
+        sess["team_id"] = match["home_team_id"] if match else team_ids[0]
+    with admin.session_transaction() as sess:
+        sess["role"] = "admin"
+
+    routes = []
+    for rule in app.url_map.iter_rules():
+        if "GET" not in rule.methods or rule.endpoint == "static":
+            continue
+        values = {}
+        if "match_id" in rule.arguments:
+            values["match_id"] = (match or any_match)["id"]
+        if set(rule.arguments) - set(values):
+            continue
+        with app.test_request_context():
+            from flask import url_for
+            routes.append((rule.endpoint, url_for(rule.endpoint, **values)))
+
+    for endpoint, url in sorted(routes):
+        if url.startswith("/admin"):
+            client = admin
+        elif url.startswith("/team"):
+            client = team
+        else:
+            client = public
+        cases.append((f"route:{url}", cold(lambda client=client, url=url: fetch(client, url))))
+    for url in ("/", "/standings", "/jornadas", "/matches"):
+        cases.append((f"route_cached:{url}", lambda url=url: fetch(public, url)))
+
+    if match:
+        def write_cycle():
+            team.post(f"/team/match/{match['id']}/enter", data={"home_score": "6", "away_score": "2"})
+            admin.post(f"/admin/matches/{match['id']}/reset")
+        cases.append(("write:enter_result+reset", write_cycle))
+    return cases
+
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        league = generate_league(
+            Path(tmp) / "bench.db",
+            teams=args.teams,
+            seasons=args.seasons,
+            completed_ratio=args.completed_ratio,
+            seed=args.seed,
+        )
+        from app import app
+
+        app.config["TESTING"] = True
+        conn = db.get_connection()
+        results = {}
+        for name, func in benchmark_cases(app, conn):
+            results[name] = measure(func, args.repeat)
+            print(f"{name:<45} {results[name]['median_ms']:>10.3f} ms")
+        db.close_connection()
+    return {
+        "meta": {
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": __import__("sqlite3").sqlite_version,
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+            "league": league,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """Imprime la comparación de medianas; devuelve el número de regresiones."""
+    regressions = 0
+    print(f"\n{'caso':<45} {'antes':>10} {'ahora':>10} {'cambio':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            print(f"{name:<45} {'—':>10} {result['median_ms']:>9.3f}ms {'nuevo':>8}")
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  ✗"
+        print(f"{name:<45} {before['median_ms']:>9.3f}ms {result['median_ms']:>9.3f}ms {change:>+7.1f}%{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument("--completed-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="guarda los resultados en este JSON")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--threshold", type=float, default=20.0, help="%% de empeoramiento tolerado")
+    args = parser.parse_args()
+
+    current = run(args)
+    current["meta"]["args"] = {
+        k: getattr(args, k) for k in ("teams", "seasons", "completed_ratio", "seed", "repeat")
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+        print(f"Resultados guardados en {args.output}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(current, baseline, args.threshold)
+        print(f"{regressions} regresiones por encima del {args.threshold:.0f}%")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
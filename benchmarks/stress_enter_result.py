@@ -0,0 +1,170 @@
+"""Prueba de concurrencia de enter_result: muchos envíos a la vez sobre un partido.
+
+Genera una liga sintética en un directorio temporal y, en cada ronda, elige un
+partido pendiente y lanza --processes procesos con --threads hilos cada uno
+(los dos equipos del partido, alternados) que envían su resultado a la vez
+mediante el cliente de pruebas de Flask. Comprueba que:
+
+* exactamente un envío registra el resultado y el resto recibe "Este partido ya
+  tiene resultado", sin errores (ni `database is locked`);
+* el partido queda con el resultado y el equipo de ese envío;
+* la clasificación incremental coincide con la recalculada desde los partidos y
+  la versión de datos subió una sola vez.
+
+Termina con código 1 si alguna comprobación falla.
+
+Uso:
+    python benchmarks/stress_enter_result.py --processes 4 --threads 8 --rounds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import db  # noqa: E402
+from generate_league import generate_league  # noqa: E402
+
+SUCCESS_MESSAGES = ("Resultado registrado correctamente", "Resultado registrado: incomparecencia del rival")
+ALREADY_MESSAGE = "Este partido ya tiene resultado"
+
+
+def submit(app, match, worker: int, barrier, results) -> None:
+    """Un envío: alterna local/visitante y, de vez en cuando, incomparecencia."""
+    team_id = match["home_team_id"] if worker % 2 == 0 else match["away_team_id"]
+    if worker % 5 == 4:
+        form = {"no_show": "opponent"}
+    else:
+        form = {"home_score": str(6 + worker % 3), "away_score": str(worker % 5)}
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["role"] = "team"
+        sess["team_id"] = team_id
+    try:
+        barrier.wait()
+        started = time.perf_counter()
+        resp = client.post(f"/team/match/{match['id']}/enter", data=form)
+        elapsed = time.perf_counter() - started
+        with client.session_transaction() as sess:
+            flashes = [message for _, message in sess.get("_flashes", [])]
+        results.put((resp.status_code, flashes, team_id, form, elapsed, None))
+    except Exception:
+        results.put((None, [], team_id, form, 0.0, traceback.format_exc()))
+    finally:
+        db.close_connection()
+
+
+def run_process(app, match, first_worker: int, threads: int, barrier, results) -> None:
+    workers = [
+        threading.Thread(target=submit, args=(app, match, first_worker + i, barrier, results))
+        for i in range(threads)
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+
+def standings_rows(rows) -> list:
+    keys = ("team_id", "played", "wins", "losses", "no_shows", "gf", "ga", "points")
+    return sorted(tuple(row[k] for k in keys) for row in rows)
+
+
+def check_round(conn, match, outcomes, version_before) -> list:
+    """Lista de fallos de una ronda (vacía si todo cuadra)."""
+    from config import Config
+    from utils import compute_standings, compute_standings_from_matches
+
+    failures = []
+    errors = [o for o in outcomes if o[5] is not None or o[0] not in (200, 302)]
+    for status, _, _, _, _, error in errors:
+        failures.append(f"envío con error (HTTP {status}): {error.strip().splitlines()[-1] if error else ''}")
+    winners = [o for o in outcomes if any(f in SUCCESS_MESSAGES for f in o[1])]
+    others = [o for o in outcomes if o not in winners and o not in errors]
+    if len(winners) != 1:
+        failures.append(f"{len(winners)} envíos registraron el resultado (se esperaba 1)")
+    unexpected = [o for o in others if ALREADY_MESSAGE not in o[1]]
+    if unexpected:
+        failures.append(f"{len(unexpected)} envíos sin el aviso de resultado ya registrado: {unexpected[0][1]}")
+    row = conn.execute("SELECT * FROM matches WHERE id=?", (match["id"],)).fetchone()
+    if row["status"] != "completed":
+        failures.append("el partido no quedó completado")
+    elif len(winners) == 1:
+        _, _, team_id, form, _, _ = winners[0]
+        if row["submitted_by_team_id"] != team_id:
+            failures.append("el partido guarda otro equipo que el del envío ganador")
+        if "no_show" in form:
+            if row["no_show_team_id"] is None:
+                failures.append("falta la incomparecencia del envío ganador")
+        elif (row["home_score"], row["away_score"]) != (int(form["home_score"]), int(form["away_score"])):
+            failures.append("el marcador guardado no es el del envío ganador")
+    if db.get_data_version(conn) != version_before + 1:
+        failures.append(f"data_version pasó de {version_before} a {db.get_data_version(conn)}")
+    incremental = standings_rows(compute_standings(conn, Config.NO_SHOW_WIN_POINTS))
+    rebuilt = standings_rows(compute_standings_from_matches(conn, Config.NO_SHOW_WIN_POINTS))
+    if incremental != rebuilt:
+        failures.append("la clasificación incremental no coincide con la recalculada")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="hilos por proceso")
+    parser.add_argument("--rounds", type=int, default=5, help="partidos distintos a disputar")
+    parser.add_argument("--teams", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("fork")
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_league(Path(tmp) / "stress.db", teams=args.teams, seasons=1, completed_ratio=0.5, seed=args.seed)
+        from app import app
+
+        app.config["TESTING"] = True
+        conn = db.get_connection()
+        matches = conn.execute(
+            "SELECT id, home_team_id, away_team_id FROM matches WHERE status='scheduled' ORDER BY id LIMIT ?",
+            (args.rounds,),
+        ).fetchall()
+        for number, match in enumerate(matches, 1):
+            match = dict(match)
+            version_before = db.get_data_version(conn)
+            total = args.processes * args.threads
+            barrier = ctx.Barrier(total)
+            results = ctx.Queue()
+            procs = [
+                ctx.Process(target=run_process, args=(app, match, p * args.threads, args.threads, barrier, results))
+                for p in range(args.processes)
+            ]
+            for proc in procs:
+                proc.start()
+            outcomes = [results.get(timeout=120) for _ in range(total)]
+            for proc in procs:
+                proc.join()
+            failures = check_round(conn, match, outcomes, version_before)
+            slowest = max(o[4] for o in outcomes) * 1000
+            verdict = "OK" if not failures else "FALLO"
+            print(f"ronda {number}: partido {match['id']}, {total} envíos, más lento {slowest:.0f} ms: {verdict}")
+            for failure in failures:
+                print(f"  - {failure}")
+            failed += bool(failures)
+        print(f"reintentos de escritura en este proceso: {db.pool_stats()['write_retries']}")
+        db.close_connection()
+    print(f"{failed} rondas con fallos de {len(matches)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Comprueba con EXPLAIN QUERY PLAN que las consultas calientes usan índices.
+
+Crea una base de datos temporal con una liga de ejemplo, recorre las rutas GET
+de la app con el cliente de pruebas de Flask y las funciones de
+export_public_data.py, captura cada SELECT con un trace callback de sqlite3 y
+termina con código 1 si alguna hace un SCAN completo de una tabla que no está
+en ALLOWED_FULL_SCANS. Con --strict también falla si se ordena en un B-tree
+temporal todo el resultado (no solo la parte derecha del ORDER BY).
+
+Además comprueba, con ligas de 10 y 38 jornadas, que `/jornadas` y
+export_jornadas leen jornadas y partidos con una sola SELECT, sin una consulta
+más por jornada.
+
+Uso:
+    python check_query_plans.py [--strict] [--verbose]
+
+Sale con código distinto de 0 si algo falla; lo ejecuta la CI
+(.github/workflows/checks.yml) y también tests/test_query_plans.py.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+import db
+
+# Tablas que se leen completas por diseño (pocas filas, una o unas pocas por equipo)
+ALLOWED_FULL_SCANS = {"teams", "standings", "ratings", "league_meta", "team_blackouts"}
+
+TABLE_ALIAS_RE = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|ORDER\b|LEFT\b|JOIN\b|CROSS\b|GROUP\b|LIMIT\b)(\w+))?", re.I)
+FULL_SCAN_RE = re.compile(r"^SCAN (\w+)$")
+JORNADA_TABLES_RE = re.compile(r"\b(?:jornadas|matches)\b", re.I)
+
+# Equipos de las ligas con las que se cuentan las consultas (10 y 38 jornadas)
+QUERY_COUNT_TEAMS = (6, 20)
+
+
+def seed(conn, teams: int = 20) -> None:
+    from utils import round_robin_pairings, today_local
+
+    conn.executemany(
+        "INSERT INTO teams(name, username, password_hash) VALUES(?, ?, 'x')",
+        [(f"Equipo {i}", f"equipo{i}") for i in range(1, teams + 1)],
+    )
+    rounds = round_robin_pairings(list(range(1, teams + 1)))
+    rounds += [[(b, a) for (a, b) in rnd] for rnd in rounds]
+    start = today_local() - timedelta(weeks=len(rounds) // 2)
+    for number, pairs in enumerate(rounds, start=1):
+        day = (start + timedelta(weeks=number - 1)).isoformat()
+        jornada_id = conn.execute(
+            "INSERT INTO jornadas(number, date) VALUES(?, ?)", (number, day)
+        ).lastrowid
+        completed = number <= len(rounds) // 2
+        conn.executemany(
+            """
+            INSERT INTO matches(jornada_id, home_team_id, away_team_id, status, home_score, away_score)
+            VALUES(?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (jornada_id, h, a, "completed" if completed else "scheduled",
+                 6 if completed else None, 3 if completed else None)
+                for (h, a) in pairs
+            ],
+        )
+    conn.commit()
+
+
+def collect_statements() -> list[str]:
+    import export_public_data
+    from app import app, fragment_cache, page_cache
+    from utils import rebuild_standings
+
+    conn = db.get_connection()
+    rebuild_standings(conn, app.config["NO_SHOW_WIN_POINTS"])
+    conn.commit()
+
+    page_cache.clear()
+    fragment_cache.clear()
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    snapshot = app.config["SNAPSHOT_ENABLED"]
+    app.config["SNAPSHOT_ENABLED"] = False  # que las páginas públicas lean de la conexión trazada
+    try:
+        client = app.test_client()
+        for path in (
+            "/", "/standings", "/standings?after=3", "/jornadas", "/matches",
+            "/api/v1/matches?limit=20", "/api/v1/matches?team=1&status=completed",
+            "/api/v1/matches?jornada=3", "/api/v1/jornadas?limit=5", "/api/v1/standings",
+        ):
+            client.get(path)
+        with client.session_transaction() as sess:
+            sess["role"] = "team"
+            sess["team_id"] = 1
+        client.get("/team")
+        client.get("/team/match/1/enter")
+        with client.session_transaction() as sess:
+            sess.clear()
+            sess["role"] = "admin"
+        for path in ("/admin", "/admin/teams", "/admin/jornadas", "/admin/matches"):
+            client.get(path)
+        for export in (
+            export_public_data.export_standings,
+            export_public_data.export_upcoming,
+            export_public_data.export_recent,
+            export_public_data.export_jornadas,
+            export_public_data.export_matches,
+            export_public_data.export_timeline,
+        ):
+            export(conn)
+    finally:
+        app.config["SNAPSHOT_ENABLED"] = snapshot
+        conn.set_trace_callback(None)
+
+    unique: list[str] = []
+    for sql in statements:
+        if sql.lstrip().upper().startswith("SELECT") and sql not in unique:
+            unique.append(sql)
+    return unique
+
+
+def count_jornada_selects(conn) -> dict:
+    """SELECT sobre jornadas o partidos de /jornadas y de export_jornadas, con las cachés vacías."""
+    import export_public_data
+    from app import app, fragment_cache, page_cache
+
+    def selects(func) -> int:
+        statements: list[str] = []
+        conn.set_trace_callback(statements.append)
+        try:
+            func()
+        finally:
+            conn.set_trace_callback(None)
+        return sum(
+            1 for sql in statements if sql.lstrip().upper().startswith("SELECT") and JORNADA_TABLES_RE.search(sql)
+        )
+
+    page_cache.clear()
+    fragment_cache.clear()
+    snapshot = app.config["SNAPSHOT_ENABLED"]
+    app.config["SNAPSHOT_ENABLED"] = False  # que la página lea de la conexión trazada
+    try:
+        client = app.test_client()
+        return {
+            "/jornadas": selects(lambda: client.get("/jornadas").get_data()),
+            "export_jornadas": selects(lambda: export_public_data.export_jornadas(conn)),
+        }
+    finally:
+        app.config["SNAPSHOT_ENABLED"] = snapshot
+
+
+def check_query_counts(tmp: Path) -> int:
+    """Fallos: casos que no hacen exactamente una SELECT con cada tamaño de liga."""
+    failures = 0
+    for teams in QUERY_COUNT_TEAMS:
+        db.DB_PATH = tmp / f"counts_{teams}.db"
+        db.init_db()
+        conn = db.get_connection()
+        seed(conn, teams)
+        jornadas = conn.execute("SELECT COUNT(*) AS c FROM jornadas").fetchone()["c"]
+        for name, count in count_jornada_selects(conn).items():
+            ok = count == 1
+            failures += not ok
+            print(f"{'✓' if ok else '✗'} {name} con {jornadas} jornadas: {count} SELECT (se espera 1)")
+        db.close_connection()
+    return failures
+
+
+def check_plan(conn, sql: str, strict: bool) -> tuple[list[str], list[str]]:
+    aliases = {}
+    for table, alias in TABLE_ALIAS_RE.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    # las subconsultas (CO-ROUTINE/MATERIALIZE) se recorren ya filtradas
+    subqueries = {line.split()[-1] for line in plan if line.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+    problems = []
+    for line in plan:
+        match = FULL_SCAN_RE.match(line)
+        if match and match.group(1) in subqueries:
+            continue
+        if match and aliases.get(match.group(1), match.group(1)) not in ALLOWED_FULL_SCANS:
+            problems.append(line)
+        if strict and line == "USE TEMP B-TREE FOR ORDER BY":
+            problems.append(line)
+    return plan, problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--strict", action="store_true", help="falla también con ordenaciones temporales completas")
+    parser.add_argument("--verbose", action="store_true", help="muestra el plan de cada consulta")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "plans.db"
+        db.init_db()
+        seed(db.get_connection())
+        statements = collect_statements()
+
+        conn = db.get_connection()
+        failures = 0
+        for sql in statements:
+            plan, problems = check_plan(conn, sql, args.strict)
+            if problems or args.verbose:
+                print("----", " ".join(sql.split()))
+                for line in plan:
+                    print("   ", line)
+            if problems:
+                failures += 1
+                print("    ✗", "; ".join(problems))
+        db.close_connection()
+        print(f"{len(statements)} consultas revisadas, {failures} con problemas")
+        count_failures = check_query_counts(Path(tmp))
+
+    return 1 if failures or count_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,3 +10,59 @@ class Config:
     TIMEZONE = os.getenv("TIMEZONE", "Europe/Madrid")
     NO_SHOW_WIN_POINTS = int(os.getenv("NO_SHOW_WIN_POINTS", "3"))
     PORT = int(os.getenv("PORT", "5000"))
+    # Número máximo de páginas renderizadas en la caché en memoria (por proceso)
+    PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "256"))
+    # Páginas en streaming (/matches): solo se guardan en esa caché si no pasan de estos bytes
+    PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(1024 * 1024)))
+    # Fragmentos de plantilla ({% cache %}) guardados por proceso
+    FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "64"))
+    # Ajustes de SQLite aplicados a cada conexión (una por hilo)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+    SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+    # Aplicar las migraciones pendientes (migrations/) al arrancar la app
+    MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1") == "1"
+    # Escrituras con bloqueo ocupado tras busy_timeout: reintentos y espera base (ms, crece x2)
+    WRITE_RETRY_ATTEMPTS = int(os.getenv("WRITE_RETRY_ATTEMPTS", "5"))
+    WRITE_RETRY_BASE_MS = float(os.getenv("WRITE_RETRY_BASE_MS", "50"))
+    # Snapshot de solo lectura para las páginas públicas: retraso máximo admitido
+    # respecto a la base principal (segundos), espera tras la última escritura y mmap
+    SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "1") == "1"
+    SNAPSHOT_MAX_STALENESS = float(os.getenv("SNAPSHOT_MAX_STALENESS", "30"))
+    SNAPSHOT_DEBOUNCE_SECONDS = float(os.getenv("SNAPSHOT_DEBOUNCE_SECONDS", "2"))
+    SNAPSHOT_MMAP_SIZE = int(os.getenv("SNAPSHOT_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # Exportación automática de data/*.json tras cada escritura (agrupada en ráfagas)
+    EXPORT_ON_WRITE = os.getenv("EXPORT_ON_WRITE", "0") == "1"
+    EXPORT_DEBOUNCE_SECONDS = float(os.getenv("EXPORT_DEBOUNCE_SECONDS", "10"))
+    EXPORT_MAX_DELAY_SECONDS = float(os.getenv("EXPORT_MAX_DELAY_SECONDS", "60"))
+    EXPORT_COMPACT = os.getenv("EXPORT_COMPACT", "0") == "1"
+    # Regenerar también las páginas HTML estáticas (export_public_data.py --html)
+    EXPORT_HTML = os.getenv("EXPORT_HTML", "0") == "1"
+    # Métricas por petición en /admin/metrics (formato de texto de Prometheus)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+    # Token opcional para que un scraper lea /admin/metrics sin sesión de admin
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    # Simulación Monte Carlo de /probabilities (0 trabajadores = todos los núcleos)
+    SIMULATION_RUNS = int(os.getenv("SIMULATION_RUNS", "20000"))
+    SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", "0"))
+    RELEGATION_SPOTS = int(os.getenv("RELEGATION_SPOTS", "2"))
+    # Segundos de búsqueda del optimizador de calendario (generar calendario optimizado)
+    SCHEDULER_TIME_LIMIT = float(os.getenv("SCHEDULER_TIME_LIMIT", "3"))
+    # Hash de contraseñas (método de Werkzeug), hashes simultáneos por proceso,
+    # peticiones que pueden esperar hueco (con la cola llena se responde "ocupado"
+    # al momento) y segundos máximos de esa espera
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "2"))
+    PASSWORD_HASH_WAITING = int(os.getenv("PASSWORD_HASH_WAITING", "1"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "2"))
+    # Intentos de inicio de sesión permitidos por usuario y dirección IP en cada ventana (segundos)
+    LOGIN_MAX_ATTEMPTS = int(os.getenv("LOGIN_MAX_ATTEMPTS", "5"))
+    LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+    # Eventos en vivo (/events): streams simultáneos por proceso, segundos entre
+    # comprobaciones de la versión de datos y duración máxima de cada stream
+    EVENTS_ENABLED = os.getenv("EVENTS_ENABLED", "1") == "1"
+    EVENTS_MAX_CONNECTIONS = int(os.getenv("EVENTS_MAX_CONNECTIONS", "2"))
+    EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "1"))
+    EVENTS_MAX_STREAM_SECONDS = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", "300"))
@@ -1,8 +1,28 @@
+import importlib.util
+import os
+import random
 import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
 
+from config import Config
+
 DB_PATH = Path("darts.db")
 
+# Una conexión por hilo y proceso: gunicorn (--threads) reutiliza los hilos entre
+# peticiones, así que cada hilo abre su conexión una vez y la conserva.
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"opened": 0, "reused": 0, "closed": 0, "discarded_after_fork": 0, "write_retries": 0}
+# Conexiones heredadas de un fork (p. ej. gunicorn --preload): SQLite no permite
+# usarlas ni cerrarlas en el hijo, así que solo se guardan para que no se liberen.
+_inherited = []
+# Funciones llamadas con cada conexión nueva (p. ej. la instrumentación de metrics.py)
+connection_hooks = []
+
 
 def dict_factory(cursor, row):
     d = {}
@@ -11,16 +31,503 @@ def dict_factory(cursor, row):
         return d
 
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+def _count(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += n
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor que suma el tiempo de su sentencia: el execute y cada fetch o paso
+    de la iteración (en un SELECT, leer las filas suele ser la mayor parte).
+    Lo entrega a `connection.timer(sql, segundos)` una vez, al agotarse las
+    filas, al cerrarse, al reutilizarse para otra sentencia o al liberarse.
+    """
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._sql = None
+        self._elapsed = 0.0
+
+    def _report(self) -> None:
+        if self._sql is None:
+            return
+        sql, seconds = self._sql, self._elapsed
+        self._sql, self._elapsed = None, 0.0
+        timer = self.connection.timer
+        if timer is not None:
+            timer(sql, seconds)
+
+    def _start(self, sql) -> None:
+        self._report()
+        self._sql = sql
+
+    def execute(self, sql, parameters=()):
+        self._start(sql)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._elapsed += time.perf_counter() - start
+            self._report()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - start
+        if row is None:
+            self._report()
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._elapsed += time.perf_counter() - start
+        if not rows:
+            self._report()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - start
+        self._report()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._elapsed += time.perf_counter() - start
+            self._report()
+            raise
+        self._elapsed += time.perf_counter() - start
+        return row
+
+    def close(self):
+        self._report()
+        super().close()
+
+    def __del__(self):
+        self._report()
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexión reutilizable; la subclase permite weakref para contar cierres y,
+    si se asigna `timer(sql, segundos)`, mide cada sentencia con TimedCursor
+    (execute y lectura de las filas).
+    """
+
+    timer = None
+
+    def execute(self, sql, parameters=()):
+        if self.timer is None:
+            return super().execute(sql, parameters)
+        return self.cursor(TimedCursor).execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if self.timer is None:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor(TimedCursor).executemany(sql, seq_of_parameters)
+
+
+def _open_connection(path):
+    conn = sqlite3.connect(
+        path,
+        factory=PooledConnection,
+        timeout=Config.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=Config.SQLITE_STATEMENT_CACHE,
+    )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute(f"PRAGMA busy_timeout = {int(Config.SQLITE_BUSY_TIMEOUT_MS)};")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute(f"PRAGMA cache_size = -{int(Config.SQLITE_CACHE_SIZE_KB)};")
+    conn.execute(f"PRAGMA mmap_size = {int(Config.SQLITE_MMAP_SIZE)};")
+    _count("opened")
+    # las conexiones de hilos que terminan se cierran al recolectarse
+    weakref.finalize(conn, _count, "closed")
+    for hook in connection_hooks:
+        hook(conn)
+    return conn
+
+
+def _open_snapshot_connection(path):
+    """Conexión de solo lectura al snapshot: el fichero nunca cambia (se sustituye)."""
+    conn = sqlite3.connect(
+        f"{path.resolve().as_uri()}?mode=ro&immutable=1",
+        uri=True,
+        factory=PooledConnection,
+        cached_statements=Config.SQLITE_STATEMENT_CACHE,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON;")
+    conn.execute(f"PRAGMA cache_size = -{int(Config.SQLITE_CACHE_SIZE_KB)};")
+    conn.execute(f"PRAGMA mmap_size = {int(Config.SNAPSHOT_MMAP_SIZE)};")
+    _count("opened")
+    weakref.finalize(conn, _count, "closed")
+    for hook in connection_hooks:
+        hook(conn)
+    return conn
+
+
+def _reset_after_fork():
+    global _local, _stats_lock
+    conns = [getattr(_local, name, None) for name in ("conn", "snapshot_conn")]
+    _local = threading.local()
+    _stats_lock = threading.Lock()
+    # las estadísticas son por proceso
+    for key in _stats:
+        _stats[key] = 0
+    for conn in conns:
+        if conn is not None:
+            _inherited.append(conn)
+            _count("discarded_after_fork")
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_connection():
+    """
+    Devuelve la conexión del hilo actual, abriéndola la primera vez.
+    Se usa igual que antes (`with get_connection() as conn:` hace commit o
+    rollback), pero la conexión no se cierra al salir del bloque.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        if _local.pid == os.getpid() and _local.path == DB_PATH:
+            _count("reused")
+            return conn
+        if _local.pid != os.getpid():
+            _inherited.append(conn)
+            _count("discarded_after_fork")
+        else:
+            close_connection()
+    conn = _open_connection(DB_PATH)
+    _local.conn = conn
+    _local.pid = os.getpid()
+    _local.path = DB_PATH
+    return conn
+
+
+# --------- Snapshot de solo lectura ---------
+# Copia de la base (VACUUM INTO) que se publica tras cada ráfaga de escrituras
+# sustituyendo el fichero con un rename atómico. Las lecturas públicas la abren
+# con immutable=1: SQLite no toma bloqueos ni comprueba cambios, y los escritores
+# nunca compiten con ellas. Cada hilo detecta un snapshot nuevo por su inodo.
+
+def snapshot_path() -> Path:
+    return DB_PATH.with_name(f"{DB_PATH.stem}.snapshot{DB_PATH.suffix}")
+
+
+def get_snapshot_connection():
+    """Conexión del hilo al snapshot más reciente, o None si aún no existe."""
+    path = snapshot_path()
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (os.getpid(), path, st.st_ino, st.st_mtime_ns)
+    conn = getattr(_local, "snapshot_conn", None)
+    if conn is not None:
+        if _local.snapshot_key == key:
+            _count("reused")
+            return conn
+        if _local.snapshot_key[0] == os.getpid():
+            conn.close()
+        else:
+            _inherited.append(conn)
+            _count("discarded_after_fork")
+    conn = _open_snapshot_connection(path)
+    _local.snapshot_conn = conn
+    _local.snapshot_key = key
     return conn
 
 
-def init_db():
-    from pathlib import Path
-    schema = Path("schema.sql").read_text(encoding="utf-8")
-    with get_connection() as conn:
-        conn.executescript(schema)
+def get_public_connection(max_staleness: float):
+    """
+    (conexión, versión de datos) para lecturas públicas: el snapshot si está al
+    día o su retraso no supera `max_staleness` segundos; si no, la principal.
+    El retraso se mide desde `dirty_since`, la primera escritura aún no
+    incluida en un snapshot (ver bump_data_version).
+    """
+    primary = get_connection()
+    meta = {
+        row["key"]: row["value"]
+        for row in primary.execute("SELECT key, value FROM league_meta WHERE key IN ('data_version', 'dirty_since')")
+    }
+    version = meta.get("data_version", 0)
+    snapshot = get_snapshot_connection()
+    if snapshot is not None:
+        snapshot_version = get_data_version(snapshot)
+        if snapshot_version == version:
+            return snapshot, version
+        dirty_since = meta.get("dirty_since")
+        if dirty_since is not None and time.time() - dirty_since <= max_staleness:
+            return snapshot, snapshot_version
+    return primary, version
+
+
+def publish_snapshot() -> bool:
+    """
+    Copia la base principal a un temporal con VACUUM INTO y lo publica con un
+    rename atómico. Devuelve False si el snapshot ya estaba al día.
+    """
+    conn = get_connection()
+    path = snapshot_path()
+    current = get_snapshot_connection()
+    if current is not None and get_data_version(current) == get_data_version(conn):
+        return False
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        conn.execute("VACUUM INTO ?", (str(tmp),))
+        copy = sqlite3.connect(f"{tmp.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            version = copy.execute("SELECT value FROM league_meta WHERE key='data_version'").fetchone()[0]
+        finally:
+            copy.close()
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    with conn:
+        # al día salvo que haya entrado otra escritura durante la copia
+        conn.execute(
+            """
+            DELETE FROM league_meta WHERE key='dirty_since'
+              AND (SELECT value FROM league_meta WHERE key='data_version') = ?
+            """,
+            (version,),
+        )
+    return True
+
+
+# --------- Escrituras con reintento ---------
+
+def is_busy_error(exc: sqlite3.OperationalError) -> bool:
+    """SQLITE_BUSY/SQLITE_LOCKED: otra conexión tiene el bloqueo de escritura."""
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(exc)
+
+
+def write_transaction(conn, func, *args):
+    """
+    Ejecuta `func(conn, *args)` dentro de BEGIN IMMEDIATE y hace commit.
+
+    El bloqueo de escritura se toma al empezar, no al primer UPDATE: así dos
+    escritores nunca leen la misma versión para después chocar al escribir, y
+    lo que `func` lea ya es definitivo. Si tras busy_timeout sigue ocupado
+    (SQLITE_BUSY), se deshace y se reintenta hasta WRITE_RETRY_ATTEMPTS veces
+    con esperas aleatorias crecientes (jitter) para que los reintentos no
+    coincidan. `func` debe ser corta: todo lo que no necesite el bloqueo
+    (validar el formulario, calcular) se hace antes.
+    """
+    if conn.in_transaction:
+        raise RuntimeError("write_transaction con una transacción ya abierta")
+    attempts = max(1, Config.WRITE_RETRY_ATTEMPTS)
+    for attempt in range(attempts):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(conn, *args)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            return result
+        except sqlite3.OperationalError as exc:
+            if not is_busy_error(exc) or attempt == attempts - 1:
+                raise
+            _count("write_retries")
+            time.sleep(random.uniform(0, Config.WRITE_RETRY_BASE_MS / 1000 * 2 ** attempt))
+
+
+def release_connection() -> None:
+    """Fin de petición: deshace cualquier transacción que haya quedado abierta."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid() and conn.in_transaction:
+        conn.rollback()
+
+
+def close_connection() -> None:
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = None
+
+
+def pool_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["pid"] = os.getpid()
+    stats["open"] = stats["opened"] - stats["closed"]
+    return stats
+
+
+# --------- Esquema y migraciones ---------
+# migrations/NNNN_nombre.sql|.py, en orden de número; PRAGMA user_version guarda
+# la última aplicada. Cada migración entra en su propia transacción junto con el
+# nuevo user_version: se aplica entera o no se aplica. Las .py definen
+# `upgrade(conn)` y no hacen commit.
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+
+def list_migrations() -> list:
+    """[(versión, ruta)] de todas las migraciones, ordenadas."""
+    migrations = []
+    for path in MIGRATIONS_DIR.iterdir():
+        number = path.stem.split("_", 1)[0]
+        if path.suffix in (".sql", ".py") and number.isdigit():
+            migrations.append((int(number), path))
+    migrations.sort()
+    versions = [version for version, _ in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Números de migración repetidos en {MIGRATIONS_DIR}")
+    return migrations
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending_migrations(conn) -> list:
+    current = schema_version(conn)
+    return [(version, path) for version, path in list_migrations() if version > current]
+
+
+def _sql_statements(script: str):
+    """Sentencias de un .sql, para ejecutarlas dentro de la transacción (executescript hace commit)."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement
+            statement = ""
+    if any(line.strip() and not line.strip().startswith("--") for line in statement.splitlines()):
+        raise ValueError("Sentencia SQL incompleta al final de la migración")
+
+
+def _apply_migration(conn, version: int, path: Path) -> bool:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if schema_version(conn) >= version:
+            # otro proceso la aplicó mientras esperábamos el bloqueo
+            conn.rollback()
+            return False
+        if path.suffix == ".sql":
+            for statement in _sql_statements(path.read_text(encoding="utf-8")):
+                conn.execute(statement)
+        else:
+            spec = importlib.util.spec_from_file_location(f"migration_{path.stem}", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.upgrade(conn)
+        conn.execute(f"PRAGMA user_version = {int(version)}")
         conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return True
+
+
+def init_db() -> list:
+    """
+    Crea o actualiza el esquema aplicando las migraciones pendientes. Devuelve
+    los nombres de las aplicadas (vacía si ya estaba al día: una sola lectura
+    de user_version).
+    """
+    conn = get_connection()
+    applied = []
+    for version, path in pending_migrations(conn):
+        if _apply_migration(conn, version, path):
+            applied.append(path.name)
+    if applied:
+        # el snapshot de solo lectura conserva el esquema anterior: se vuelve a publicar
+        snapshot_path().unlink(missing_ok=True)
+    return applied
+
+
+def get_data_version(conn) -> int:
+    row = conn.execute("SELECT value FROM league_meta WHERE key='data_version'").fetchone()
+    return row["value"] if row else 0
+
+
+def bump_data_version(conn) -> None:
+    """Incrementa la versión de datos; llamar dentro de la transacción de escritura."""
+    conn.execute(
+        """
+        INSERT INTO league_meta(key, value) VALUES('data_version', 1)
+        ON CONFLICT(key) DO UPDATE SET value=value+1
+        """
+    )
+    # primera escritura posterior al último snapshot: mide cuánto se retrasa
+    conn.execute(
+        """
+        INSERT INTO league_meta(key, value) VALUES('dirty_since', CAST(strftime('%s', 'now') AS INTEGER))
+        ON CONFLICT(key) DO NOTHING
+        """
+    )
+
+
+# --------- Registro de partidos cambiados (match_changes) ---------
+# Lo rellenan triggers (migraciones 0004 y 0005) y lo lee events.Broadcaster.
+
+@contextmanager
+def bulk_match_writes(conn):
+    """
+    Escritura masiva de partidos (calendario, reinicio, importación) sin anotar
+    cada fila en match_changes. Un trigger, aunque no haga nada, casi duplica el
+    coste de cada fila de un executemany, así que dentro de la transacción de
+    escritura (se abre con BEGIN IMMEDIATE si no lo estaba) se quitan los
+    triggers matches_log_* y se vuelven a crear al salir: el resto de conexiones
+    nunca los ven ausentes. Se incrementa `match_resync`, que los eventos en
+    vivo convierten en un resync completo.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    triggers = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND tbl_name='matches' AND name LIKE 'matches_log_%'"
+    ).fetchall()
+    for trigger in triggers:
+        conn.execute(f'DROP TRIGGER "{trigger["name"]}"')
+    conn.execute(
+        """
+        INSERT INTO league_meta(key, value) VALUES('match_resync', 1)
+        ON CONFLICT(key) DO UPDATE SET value=value+1
+        """
+    )
+    try:
+        yield
+    finally:
+        # tras un error que ya deshizo la transacción, el rollback los restauró
+        if conn.in_transaction:
+            for trigger in triggers:
+                conn.execute(trigger["sql"])
+
+
+def get_match_resync(conn) -> int:
+    row = conn.execute("SELECT value FROM league_meta WHERE key='match_resync'").fetchone()
+    return row["value"] if row else 0
+
+
+def trim_match_changes(conn, keep: int) -> int:
+    """Deja las últimas `keep` filas de match_changes (sin commit); devuelve las borradas."""
+    return conn.execute(
+        "DELETE FROM match_changes WHERE seq <= (SELECT MAX(seq) FROM match_changes) - ?", (keep,)
+    ).rowcount
@@ -0,0 +1,249 @@
+"""Eventos en vivo (Server-Sent Events) con los cambios de resultados y clasificación.
+
+Un hilo por proceso consulta `league_meta.data_version` cada EVENTS_POLL_SECONDS
+mientras haya clientes conectados (una lectura por clave primaria, compartida por
+todos). Así funciona igual en los dos workers de gunicorn sin comunicación
+entre procesos: cada uno ve las escrituras del otro en SQLite. Cuando la versión
+cambia se leen solo los partidos anotados en `match_changes` (lo rellenan
+triggers en la misma transacción que la escritura) desde el último `seq` visto;
+las escrituras masivas no se anotan e incrementan `match_resync`. Se compara la nueva clasificación con la anterior y se reparten los cambios a
+la cola de cada cliente:
+
+* `match`: partidos que cambiaron (resultado registrado, reabierto o eliminado).
+* `standings`: filas de la clasificación que cambiaron.
+* `resync`: la clasificación completa y las listas de la portada, para clientes
+  que vienen de una versión anterior (al reconectar) o cambios demasiado grandes
+  para un delta (escrituras masivas o cambios ya recortados de `match_changes`,
+  que el mismo hilo recorta cada TRIM_SECONDS).
+
+El `id` de cada evento es la versión de datos; al reconectar, el navegador lo
+envía en `Last-Event-ID`. Cada proceso acepta como mucho EVENTS_MAX_CONNECTIONS
+streams (el resto recibe 503) y cada stream se cierra tras
+EVENTS_MAX_STREAM_SECONDS, para que no ocupen los hilos de gunicorn.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from db import get_connection, get_data_version, get_match_resync, trim_match_changes, write_transaction
+from queries import fetch_matches_by_ids, fetch_recent, fetch_upcoming
+from ratings import fetch_ratings, rating_fields
+from utils import compute_standings, today_local
+
+log = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15  # comentario periódico para que proxies no corten el stream
+RETRY_MS = 5000
+QUEUE_SIZE = 64  # mensajes pendientes por cliente; si se llena, se cierra su stream
+MAX_MATCH_DELTA = 50  # más partidos cambiados que esto: se envía un resync
+MATCH_CHANGES_KEEP = 5000  # filas de match_changes que se conservan al recortar
+TRIM_SECONDS = 60  # cada cuánto recorta match_changes el hilo de eventos
+
+MATCH_FIELDS = (
+    "id", "jornada_id", "jn", "date", "home_name", "away_name", "status",
+    "home_score", "away_score", "winner_one_player", "no_show_team_id",
+)
+STANDINGS_FIELDS = (
+    "pos", "team_id", "team_name", "played", "wins", "losses", "no_shows", "gf", "ga", "gd", "points",
+)
+
+
+class TooManyStreams(RuntimeError):
+    """Se alcanzó EVENTS_MAX_CONNECTIONS en este proceso."""
+
+
+def format_event(event: str, data, event_id=None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    def __init__(self):
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.overflow = False
+
+
+class Broadcaster:
+    def __init__(self, no_show_win_points: int, poll_interval: float, max_connections: int):
+        self.no_show_win_points = no_show_win_points
+        self.poll_interval = poll_interval
+        self.max_connections = max_connections
+        self._cond = threading.Condition()
+        self._poll_lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._pid = None
+        self.version = None
+        self.snapshot = None
+        self.change_seq = 0  # último seq de match_changes repartido
+        self.match_resync = 0  # contador de escrituras masivas visto
+        self._trimmed_at = 0.0
+
+    # --------- Foto de los datos y diferencias ---------
+
+    def _load_snapshot(self, conn) -> dict:
+        ratings = fetch_ratings(conn)
+        return {
+            "standings": {
+                row["team_id"]: {
+                    **{f: row[f] for f in STANDINGS_FIELDS},
+                    **rating_fields(ratings.get(row["team_id"])),
+                }
+                for row in compute_standings(conn, self.no_show_win_points)
+            },
+            "recent": [{f: m[f] for f in MATCH_FIELDS} for m in fetch_recent(conn)],
+            "upcoming": [{f: m[f] for f in MATCH_FIELDS} for m in fetch_upcoming(conn, today_local().isoformat())],
+        }
+
+    def resync_payload(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "standings": sorted(snapshot["standings"].values(), key=lambda r: r["pos"]),
+            "recent": snapshot["recent"],
+            "upcoming": snapshot["upcoming"],
+        }
+
+    def _load_match_changes(self, conn, seen: int):
+        """
+        (partidos cambiados desde el seq `seen`, último seq). Los eliminados van
+        como {"id", "deleted"}; la lista es None si son más de MAX_MATCH_DELTA o
+        el registro ya se recortó por encima de `seen`: entonces toca un resync.
+        """
+        first, last = conn.execute("SELECT MIN(seq), MAX(seq) FROM match_changes").fetchone()
+        if last is None or last <= seen:
+            return [], seen
+        if first > seen + 1:
+            return None, last
+        ids = [
+            row[0] for row in conn.execute(
+                "SELECT DISTINCT match_id FROM match_changes WHERE seq > ? AND seq <= ? LIMIT ?",
+                (seen, last, MAX_MATCH_DELTA + 1),
+            )
+        ]
+        if len(ids) > MAX_MATCH_DELTA:
+            return None, last
+        found = {m["id"]: {f: m[f] for f in MATCH_FIELDS} for m in fetch_matches_by_ids(conn, ids)}
+        return [found.get(match_id, {"id": match_id, "deleted": True}) for match_id in ids], last
+
+    def _diff(self, old: dict, new: dict, matches) -> list:
+        """Mensajes SSE con los partidos cambiados y las diferencias de clasificación entre dos fotos."""
+        standings = [row for team_id, row in new["standings"].items() if old["standings"].get(team_id) != row]
+        removed = old["standings"].keys() - new["standings"].keys()
+        if matches is None or removed:
+            return [format_event("resync", self.resync_payload(), self.version)]
+        messages = []
+        if matches:
+            messages.append(format_event("match", matches, self.version))
+        if standings:
+            messages.append(format_event("standings", standings, self.version))
+        return messages
+
+    def refresh(self) -> None:
+        """Comprueba la versión de datos y, si cambió, reparte los cambios."""
+        with self._poll_lock:
+            conn = get_connection()
+            version = get_data_version(conn)
+            if version == self.version and self.snapshot is not None:
+                return
+            old = self.snapshot
+            # una sola transacción de lectura: versión, registro y clasificación de la misma foto
+            own_transaction = not conn.in_transaction
+            if own_transaction:
+                conn.execute("BEGIN")
+            try:
+                version = get_data_version(conn)
+                match_resync = get_match_resync(conn)
+                if old is None:
+                    matches = []
+                    change_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM match_changes").fetchone()[0]
+                else:
+                    matches, change_seq = self._load_match_changes(conn, self.change_seq)
+                    if match_resync != self.match_resync:
+                        matches = None  # escritura masiva sin anotar: resync
+                snapshot = self._load_snapshot(conn)
+            finally:
+                if own_transaction:
+                    conn.commit()
+            self.snapshot, self.version, self.change_seq = snapshot, version, change_seq
+            self.match_resync = match_resync
+            messages = self._diff(old, self.snapshot, matches) if old is not None else []
+            with self._cond:
+                subscribers = list(self._subscribers)
+            for sub in subscribers:
+                for message in messages:
+                    try:
+                        sub.queue.put_nowait(message)
+                    except queue.Full:
+                        sub.overflow = True  # cliente lento: se cierra y reconecta con resync
+
+    # --------- Clientes ---------
+
+    def subscribe(self) -> Subscription:
+        """Registra un cliente o lanza TooManyStreams (antes de empezar a responder)."""
+        with self._cond:
+            if len(self._subscribers) >= self.max_connections:
+                raise TooManyStreams()
+            sub = Subscription()
+            self._subscribers.add(sub)
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="sse-events", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._cond:
+            self._subscribers.discard(sub)
+
+    def connections(self) -> int:
+        with self._cond:
+            return len(self._subscribers)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._subscribers:
+                    self._cond.wait()
+            try:
+                self.refresh()
+                self._trim()
+            except Exception:
+                log.exception("Error al comprobar cambios para /events")
+            time.sleep(self.poll_interval)
+
+    def _trim(self) -> None:
+        """Recorta match_changes cada TRIM_SECONDS (quien se quede atrás hará un resync)."""
+        now = time.monotonic()
+        if now - self._trimmed_at < TRIM_SECONDS:
+            return
+        self._trimmed_at = now
+        write_transaction(get_connection(), trim_match_changes, MATCH_CHANGES_KEEP)
+
+    def stream(self, sub: Subscription, since, max_seconds: float):
+        """
+        Generador con el texto del stream de un cliente ya suscrito. `since` es
+        la versión que ya tiene el cliente (Last-Event-ID o la de la página); si
+        no coincide con la actual empieza con un resync.
+        """
+        try:
+            self.refresh()
+            yield f"retry: {RETRY_MS}\n\n"
+            if since != self.version:
+                yield format_event("resync", self.resync_payload(), self.version)
+            deadline = time.monotonic() + max_seconds
+            while not sub.overflow and (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    yield sub.queue.get(timeout=min(HEARTBEAT_SECONDS, remaining))
+                except queue.Empty:
+                    yield ": ping\n\n"
+        finally:
+            self.unsubscribe(sub)
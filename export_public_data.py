@@ -2,27 +2,65 @@
 
 Ejecuta este script después de actualizar resultados en la app Flask para
 mantener sincronizada la versión estática publicada en GitHub Pages.
+
+Solo se reescriben los ficheros cuyo contenido cambia (comparando su SHA-256),
+siempre mediante fichero temporal + rename. Junto a cada JSON se generan las
+variantes precomprimidas `.gz` y `.br` y un `manifest.json` con los hashes, que
+el sitio estático usa para invalidar caché. Si falta `brotli` (está en
+requirements.txt) se avisa y solo se generan los `.gz`; el manifest lo refleja
+en `compression`.
+
+Con `--html` se generan además las páginas del sitio (index, standings, jornadas
+y matches) ya rellenas, renderizando las plantillas Jinja de la app Flask, con
+CSS/JS minificados y con hash en el nombre. Cada página se vuelve a renderizar
+solo si cambian sus entradas: los JSON de los que sale, las plantillas o los
+assets. Los JSON se siguen publicando: `static/site.js` repinta una página con
+ellos si son más recientes que su HTML.
+
+Uso:
+    python export_public_data.py [--compact] [--force] [--html] [--out DIR]
 """
 
 from __future__ import annotations
 
+import argparse
+import gzip
+import hashlib
 import json
+import logging
+import os
+import re
+import tempfile
 from pathlib import Path
 
+try:
+    import brotli
+except ImportError:  # sin brotli solo se generan los .gz (se avisa al exportar)
+    brotli = None
+
 from config import Config
-from db import DB_PATH, get_connection, init_db
-from utils import compute_standings, today_local
+from db import get_connection, init_db
+from queries import fetch_all_matches, fetch_jornadas_with_matches, fetch_recent, fetch_upcoming
+from ratings import fetch_ratings, rating_fields
+from utils import compute_standings, standings_timeline, today_local
 
-DATA_DIR = Path(__file__).resolve().parent / "data"
+log = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent
+TEMPLATES_DIR = ROOT_DIR / "templates"
+SOURCE_STATIC_DIR = ROOT_DIR / "static"
+PUBLISH_DIR = ROOT_DIR  # GitHub Pages sirve la raíz del repositorio
+DATA_DIR = PUBLISH_DIR / "data"
 
 
 def ensure_database() -> None:
-    if not DB_PATH.exists():
-        init_db()
+    # crea la base o aplica las migraciones pendientes antes de leerla
+    init_db()
 
 
 def export_standings(conn) -> list[dict]:
     table = compute_standings(conn, Config.NO_SHOW_WIN_POINTS)
+    ratings = fetch_ratings(conn)
     return [
         {
             "pos": row["pos"],
@@ -34,112 +72,335 @@ def export_standings(conn) -> list[dict]:
             "ga": row["ga"],
             "gd": row["gd"],
             "points": row["points"],
+            **rating_fields(ratings.get(row["team_id"])),
         }
         for row in table
     ]
 
 
 def export_upcoming(conn) -> list[dict]:
-    today = today_local().isoformat()
-    rows = conn.execute(
-        """
-        SELECT m.jornada_id, j.date, th.name AS home_name, ta.name AS away_name
-        FROM matches m
-        JOIN jornadas j ON j.id = m.jornada_id
-        JOIN teams th ON th.id = m.home_team_id
-        JOIN teams ta ON ta.id = m.away_team_id
-        WHERE m.status = 'scheduled' AND j.date >= ?
-        ORDER BY j.date ASC
-        LIMIT 10
-        """,
-        (today,),
-    ).fetchall()
-    return [dict(row) for row in rows]
+    fields = ("jornada_id", "date", "home_name", "away_name")
+    rows = fetch_upcoming(conn, today_local().isoformat())
+    return [{f: row[f] for f in fields} for row in rows]
 
 
 def export_recent(conn) -> list[dict]:
-    rows = conn.execute(
-        """
-        SELECT m.jornada_id, j.date, th.name AS home_name, ta.name AS away_name,
-               m.status, m.home_score, m.away_score, m.winner_one_player,
-               m.no_show_team_id
-        FROM matches m
-        JOIN jornadas j ON j.id = m.jornada_id
-        JOIN teams th ON th.id = m.home_team_id
-        JOIN teams ta ON ta.id = m.away_team_id
-        WHERE m.status = 'completed'
-        ORDER BY j.date DESC, m.updated_at DESC
-        LIMIT 10
-        """
-    ).fetchall()
-    return [dict(row) for row in rows]
+    fields = (
+        "jornada_id", "date", "home_name", "away_name", "status", "home_score",
+        "away_score", "winner_one_player", "no_show_team_id",
+    )
+    return [{f: row[f] for f in fields} for row in fetch_recent(conn)]
 
 
 def export_jornadas(conn) -> list[dict]:
-    jornadas = conn.execute(
-        "SELECT id, number, date FROM jornadas ORDER BY number"
-    ).fetchall()
-    result: list[dict] = []
-    for jornada in jornadas:
-        matches = conn.execute(
-            """
-            SELECT m.id, m.status, m.home_score, m.away_score, m.no_show_team_id,
-                   th.name AS home_name, ta.name AS away_name
-            FROM matches m
-            JOIN teams th ON th.id = m.home_team_id
-            JOIN teams ta ON ta.id = m.away_team_id
-            WHERE m.jornada_id = ?
-            ORDER BY m.id
-            """,
-            (jornada["id"],),
-        ).fetchall()
-        result.append(
-            {
-                "jornada": {
-                    "id": jornada["id"],
-                    "number": jornada["number"],
-                    "date": jornada["date"],
-                },
-                "matches": [dict(match) for match in matches],
-            }
-        )
-    return result
+    fields = (
+        "id", "status", "home_score", "away_score", "winner_one_player", "no_show_team_id",
+        "home_name", "away_name",
+    )
+    return [
+        {
+            "jornada": item["jornada"],
+            "matches": [{f: match[f] for f in fields} for match in item["matches"]],
+        }
+        for item in fetch_jornadas_with_matches(conn)
+    ]
 
 
 def export_matches(conn) -> list[dict]:
-    rows = conn.execute(
-        """
-        SELECT j.number AS jornada_number, j.date,
-               th.name AS home_name, ta.name AS away_name,
-               m.status, m.home_score, m.away_score,
-               m.winner_one_player, m.no_show_team_id
-        FROM matches m
-        JOIN jornadas j ON j.id = m.jornada_id
-        JOIN teams th ON th.id = m.home_team_id
-        JOIN teams ta ON ta.id = m.away_team_id
-        ORDER BY j.number, m.id
-        """
-    ).fetchall()
-    return [dict(row) for row in rows]
-
-
-def write_json(filename: str, payload) -> None:
-    DATA_DIR.mkdir(exist_ok=True)
-    path = DATA_DIR / filename
-    with path.open("w", encoding="utf-8") as fh:
-        json.dump(payload, fh, ensure_ascii=False, indent=2)
-        fh.write("\n")
-    print(f"Exportado {filename} ({len(payload)} registros)")
+    fields = (
+        "date", "home_name", "away_name", "status", "home_score", "away_score",
+        "winner_one_player", "no_show_team_id",
+    )
+    return [
+        {"jornada_number": row["jn"], **{f: row[f] for f in fields}}
+        for row in fetch_all_matches(conn)
+    ]
+
+
+def export_timeline(conn) -> list[dict]:
+    timeline = standings_timeline(conn)
+    return [
+        {
+            "team_name": team["team_name"],
+            "history": [
+                {"jornada": number, "pos": pos, "points": points}
+                for number, pos, points in zip(timeline["jornadas"], team["positions"], team["points"])
+            ],
+        }
+        for team in timeline["teams"]
+    ]
+
+
+EXPORTS = (
+    ("standings.json", export_standings),
+    ("upcoming.json", export_upcoming),
+    ("recent.json", export_recent),
+    ("jornadas.json", export_jornadas),
+    ("matches.json", export_matches),
+    ("timeline.json", export_timeline),
+)
+MANIFEST = "manifest.json"
+
+# Variantes precomprimidas que se generan junto a cada fichero
+COMPRESSION = ["gz", "br"] if brotli is not None else ["gz"]
+
+
+def serialize(payload, compact: bool = False) -> bytes:
+    if compact:
+        text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(payload, ensure_ascii=False, indent=2)
+    return (text + "\n").encode("utf-8")
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Escribe en un temporal del mismo directorio y lo renombra sobre el destino."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def compressed_variants(data: bytes) -> dict[str, bytes]:
+    # mtime=0 para que el .gz sea idéntico si el contenido no cambia
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return variants
+
+
+def write_file(filename: str, data: bytes, force: bool = False, directory: Path | None = None,
+               compress: bool = True, previous: dict | None = None) -> tuple[dict, bool]:
+    """
+    Escribe `data` (en DATA_DIR salvo otro `directory`) y sus variantes
+    comprimidas solo si cambió el contenido. Si no cambió, `previous` (su entrada
+    del manifest anterior) ya trae los tamaños comprimidos y no se vuelve a
+    comprimir. Devuelve (entrada del manifest, si se reescribió).
+    """
+    directory = directory or DATA_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / filename
+    digest = hashlib.sha256(data).hexdigest()
+    unchanged = (
+        not force
+        and path.exists()
+        and hashlib.sha256(path.read_bytes()).hexdigest() == digest
+    )
+    if not unchanged:
+        atomic_write(path, data)
+    entry = {"sha256": digest, "bytes": len(data)}
+    if not compress:
+        return entry, not unchanged
+    siblings = {f".{kind}": path.with_name(f"{path.name}.{kind}") for kind in COMPRESSION}
+    if (
+        unchanged
+        and previous
+        and previous.get("sha256") == digest
+        and all(kind in previous for kind in COMPRESSION)
+        and all(sibling.exists() for sibling in siblings.values())
+    ):
+        entry.update({kind: previous[kind] for kind in COMPRESSION})
+        return entry, False
+    for suffix, compressed in compressed_variants(data).items():
+        if not unchanged or not siblings[suffix].exists():
+            atomic_write(siblings[suffix], compressed)
+        entry[suffix.lstrip(".")] = len(compressed)
+    return entry, not unchanged
+
+
+def write_json(filename: str, payload, compact: bool = False, force: bool = False,
+               previous: dict | None = None) -> dict:
+    entry, changed = write_file(filename, serialize(payload, compact), force, previous=previous)
+    if changed:
+        print(f"Exportado {filename} ({len(payload)} registros)")
+    else:
+        print(f"Sin cambios {filename}")
+    return entry
+
+
+# --------- Páginas HTML pre-renderizadas ---------
+
+def minify_css(text: str) -> str:
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    return text.replace(";}", "}").strip() + "\n"
+
+
+def minify_js(text: str) -> str:
+    """Conservadora (sin parser de JS): quita sangría, líneas vacías y comentarios de línea."""
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//")) + "\n"
+
+
+ASSETS = (
+    ("styles.css", minify_css),
+    ("site.js", minify_js),
+)
+
+
+def export_assets(force: bool = False) -> dict:
+    """
+    Escribe static/<nombre>.<hash>.min.<ext> y borra las versiones anteriores.
+    Devuelve {fichero original: ruta publicada}.
+    """
+    static_dir = PUBLISH_DIR / "static"
+    published = {}
+    for filename, minify in ASSETS:
+        data = minify(
+            (SOURCE_STATIC_DIR / filename).read_text(encoding="utf-8")
+        ).encode("utf-8")
+        stem, suffix = os.path.splitext(filename)
+        name = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}.min{suffix}"
+        _, changed = write_file(name, data, force, directory=static_dir, compress=False)
+        for old in static_dir.glob(f"{stem}.*.min{suffix}"):
+            if old.name != name:
+                old.unlink()
+        print(f"{'Exportado' if changed else 'Sin cambios'} static/{name}")
+        published[filename] = f"static/{name}"
+    return published
+
+
+def index_context(conn) -> dict:
+    today = today_local().isoformat()
+    return {
+        "standings": compute_standings(conn, Config.NO_SHOW_WIN_POINTS),
+        "upcoming": fetch_upcoming(conn, today),
+        "recent": fetch_recent(conn),
+        "today": today,
+    }
+
+
+def standings_context(conn) -> dict:
+    # tabla actual con Elo y forma, sin selector de jornada ni evolución (como standings.json)
+    return {
+        "table": compute_standings(conn, Config.NO_SHOW_WIN_POINTS),
+        "ratings": fetch_ratings(conn),
+        "after": None,
+        "jornadas": [],
+        "history": None,
+    }
+
+
+def jornadas_context(conn) -> dict:
+    return {"data": fetch_jornadas_with_matches(conn)}
+
+
+def matches_context(conn) -> dict:
+    return {"matches": fetch_all_matches(conn)}
+
+
+# (página y plantilla, nombre para site.js, JSON con los mismos datos, contexto)
+PAGES = (
+    ("index.html", "landing", ("standings.json", "upcoming.json", "recent.json"), index_context),
+    ("standings.html", "standings", ("standings.json",), standings_context),
+    ("jornadas.html", "jornadas", ("jornadas.json",), jornadas_context),
+    ("matches.html", "matches", ("matches.json",), matches_context),
+)
+PAGE_URLS = {"index": "index.html", "standings": "standings.html", "jornadas": "jornadas.html", "matches": "matches.html"}
+
+
+def templates_digest() -> str:
+    digest = hashlib.sha256()
+    for path in sorted(TEMPLATES_DIR.glob("*.html")):
+        digest.update(path.name.encode("utf-8") + b"\0" + path.read_bytes())
+    return digest.hexdigest()
+
+
+def export_pages(conn, files: dict, previous: dict, force: bool = False) -> tuple[dict, dict]:
+    """
+    Renderiza las páginas cuyas entradas cambiaron desde la exportación anterior
+    (`previous` es el manifest anterior). Devuelve (páginas, assets) para el manifest.
+    """
+    from flask import render_template
+
+    from app import app
+
+    assets = export_assets(force)
+    templates = templates_digest()
+    pages = {}
+    for filename, name, sources, build in PAGES:
+        source_hashes = {source: files[source]["sha256"] for source in sources}
+        inputs = hashlib.sha256(
+            json.dumps([source_hashes, templates, assets], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        old = previous.get(filename)
+        path = PUBLISH_DIR / filename
+        if (
+            not force
+            and old
+            and old.get("inputs") == inputs
+            and path.exists()
+            and hashlib.sha256(path.read_bytes()).hexdigest() == old.get("sha256")
+        ):
+            pages[filename] = old
+            print(f"Sin cambios {filename}")
+            continue
+        with app.test_request_context("/"):
+            html = render_template(
+                filename,
+                static_export=True,
+                static_page=name,
+                static_sources=json.dumps(source_hashes),
+                page_url=lambda endpoint, **values: PAGE_URLS[endpoint],
+                asset_url=lambda asset: assets[asset],
+                **build(conn),
+            )
+        entry, changed = write_file(filename, html.encode("utf-8"), force, directory=PUBLISH_DIR, compress=False)
+        pages[filename] = {"inputs": inputs, **entry}
+        print(f"{'Renderizado' if changed else 'Sin cambios'} {filename}")
+    return pages, assets
+
+
+def read_manifest() -> dict:
+    try:
+        return json.loads((DATA_DIR / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def export_all(conn, compact: bool = False, force: bool = False, html: bool = False) -> dict:
+    """Exporta todos los ficheros (y las páginas con `html`) y el manifest; devuelve el manifest."""
+    previous = read_manifest()
+    if brotli is None:
+        log.warning("brotli no está instalado: no se generan los .br (pip install -r requirements.txt)")
+    files = {
+        filename: write_json(filename, build(conn), compact, force, previous.get("files", {}).get(filename))
+        for filename, build in EXPORTS
+    }
+    manifest = {"compression": COMPRESSION, "files": files}
+    if html:
+        manifest["pages"], manifest["assets"] = export_pages(conn, files, previous.get("pages", {}), force)
+    else:
+        # las páginas ya publicadas se conservan; site.js las repinta si los JSON son más nuevos
+        manifest.update({key: previous[key] for key in ("pages", "assets") if key in previous})
+    write_file(MANIFEST, serialize(manifest, compact), force)
+    return manifest
 
 
 def main() -> None:
+    global PUBLISH_DIR, DATA_DIR
+
+    parser = argparse.ArgumentParser(description="Exporta los datos públicos a data/*.json")
+    parser.add_argument("--compact", action="store_true", help="JSON minificado, sin sangría")
+    parser.add_argument("--force", action="store_true", help="reescribe aunque no haya cambios")
+    parser.add_argument("--html", action="store_true", help="genera también las páginas HTML pre-renderizadas")
+    parser.add_argument("--out", type=Path, default=None, help="directorio de publicación (por defecto, la raíz del repositorio)")
+    args = parser.parse_args()
+    if args.out is not None:
+        PUBLISH_DIR = args.out.resolve()
+        DATA_DIR = PUBLISH_DIR / "data"
+
     ensure_database()
     with get_connection() as conn:
-        write_json("standings.json", export_standings(conn))
-        write_json("upcoming.json", export_upcoming(conn))
-        write_json("recent.json", export_recent(conn))
-        write_json("jornadas.json", export_jornadas(conn))
-        write_json("matches.json", export_matches(conn))
+        export_all(conn, compact=args.compact, force=args.force, html=args.html)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+"""Caché de fragmentos de plantilla: `{% cache "nombre", clave... %}...{% endcache %}`.
+
+El HTML del bloque se guarda en un LRUCache por (nombre, claves, versión de
+datos), de modo que un fragmento compartido por varias páginas (la tabla de
+clasificación, las listas de partidos) se renderiza una vez por cambio de datos
+y no una vez por petición y página. Las claves deben ser hashables y reunir todo
+lo que cambie el resultado además de la versión (rol, fecha, jornada...).
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = LRUCache(64)
+    app.jinja_env.fragment_cache_version = lambda: ...
+"""
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        # sin caché configurada el bloque se renderiza siempre (p. ej. en scripts)
+        environment.extend(fragment_cache=None, fragment_cache_version=lambda: None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render_cached", [nodes.List(args)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render_cached(self, key, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        full_key = (*key, self.environment.fragment_cache_version())
+        value = cache.get(full_key)
+        if value is None:
+            value = caller()
+            cache.set(full_key, value)
+        return value
@@ -0,0 +1,192 @@
+"""Importación masiva de resultados desde CSV o JSON (panel de administración).
+
+Cada fila indica `jornada` (número), `home` y `away` (nombre o usuario del
+equipo), `home_score`, `away_score`, `no_show` (vacío, `home`/`local`,
+`away`/`visitante` o el nombre del equipo que no se presentó) y
+`winner_one_player` (1/sí/true). Los equipos se resuelven con una sola
+consulta y los partidos con otra; todas las filas se validan juntas y, si hay
+errores, se informa de todos sin escribir nada. Los resultados válidos se
+guardan con un executemany y sus deltas de clasificación y Elo por lotes, en
+la misma transacción.
+"""
+
+import csv
+import io
+import json
+
+from ratings import apply_matches_to_ratings
+from utils import apply_matches_to_standings, now_local_iso
+
+TRUE_VALUES = {"1", "true", "si", "sí", "yes", "x", "on"}
+HOME_VALUES = {"home", "local"}
+AWAY_VALUES = {"away", "visitante"}
+MAX_ERRORS = 200  # errores mostrados como máximo
+
+
+class ResultImportError(ValueError):
+    """Errores de formato o validación; `errors` es la lista completa de mensajes."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} errores")
+        self.errors = errors
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def parse_rows(filename: str, data: bytes) -> list:
+    """Lee el fichero (CSV o JSON según extensión o contenido) como lista de dicts."""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ResultImportError(["El fichero no está en UTF-8"])
+    stripped = text.lstrip()
+    if filename.lower().endswith(".json") or stripped.startswith(("[", "{")):
+        try:
+            payload = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise ResultImportError([f"JSON no válido: {exc}"])
+        if isinstance(payload, dict):
+            payload = payload.get("results")
+        if not isinstance(payload, list) or not all(isinstance(row, dict) for row in payload):
+            raise ResultImportError(['El JSON debe ser una lista de objetos (o {"results": [...]})'])
+        return payload
+
+    try:
+        dialect = csv.Sniffer().sniff(text[:2048], ",;\t")  # Excel en español exporta con ';'
+    except csv.Error:
+        dialect = "excel"
+    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+    missing = {"jornada", "home", "away"} - {(f or "").strip() for f in reader.fieldnames or ()}
+    if missing:
+        raise ResultImportError([f"Faltan columnas en el CSV: {', '.join(sorted(missing))}"])
+    return [{(k or "").strip(): v for k, v in row.items()} for row in reader]
+
+
+def validate_rows(conn, rows) -> list:
+    """
+    Valida todas las filas contra la base de datos y devuelve los partidos a
+    actualizar (dicts con las columnas de `matches`), o lanza
+    ResultImportError con todos los errores encontrados.
+    """
+    errors = []
+    if not rows:
+        raise ResultImportError(["El fichero no contiene filas"])
+
+    teams = {}
+    for t in conn.execute("SELECT id, name, username FROM teams"):
+        teams[t["name"].casefold()] = t["id"]
+        teams.setdefault(t["username"].casefold(), t["id"])
+
+    numbers = set()
+    for row in rows:
+        try:
+            numbers.add(int(_text(row.get("jornada"))))
+        except ValueError:
+            pass
+    matches = {}
+    for m in conn.execute(
+        """
+        SELECT m.*, j.number AS jn
+        FROM jornadas j
+        CROSS JOIN matches m ON m.jornada_id=j.id
+        WHERE j.number IN (SELECT value FROM json_each(?))
+        """,
+        (json.dumps(sorted(numbers)),),
+    ):
+        matches[(m["jn"], m["home_team_id"], m["away_team_id"])] = m
+
+    results = []
+    seen = {}
+    for line, row in enumerate(rows, start=1):
+        row_errors = []
+        try:
+            number = int(_text(row.get("jornada")))
+        except ValueError:
+            row_errors.append(f"jornada no válida «{_text(row.get('jornada'))}»")
+            number = None
+        home = teams.get(_text(row.get("home")).casefold())
+        away = teams.get(_text(row.get("away")).casefold())
+        for side, team_id in (("home", home), ("away", away)):
+            if team_id is None:
+                row_errors.append(f"equipo desconocido «{_text(row.get(side))}»")
+
+        no_show_raw = _text(row.get("no_show")).casefold()
+        no_show_team_id = None
+        if no_show_raw in HOME_VALUES:
+            no_show_team_id = home
+        elif no_show_raw in AWAY_VALUES:
+            no_show_team_id = away
+        elif no_show_raw:
+            no_show_team_id = teams.get(no_show_raw)
+            if no_show_team_id is None or no_show_team_id not in (home, away):
+                row_errors.append(f"no_show «{_text(row.get('no_show'))}» no es ninguno de los dos equipos")
+
+        home_score = away_score = None
+        if not no_show_raw:
+            try:
+                home_score = int(_text(row.get("home_score")))
+                away_score = int(_text(row.get("away_score")))
+            except ValueError:
+                row_errors.append("marcadores no válidos (enteros)")
+            else:
+                if home_score < 0 or away_score < 0:
+                    row_errors.append("marcadores negativos")
+                elif home_score == away_score:
+                    row_errors.append("no se permite empate")
+        winner_one_player = 1 if _text(row.get("winner_one_player")).casefold() in TRUE_VALUES else 0
+
+        match = None
+        if not row_errors:
+            match = matches.get((number, home, away))
+            if match is None:
+                row_errors.append(f"no existe el partido {row.get('home')} - {row.get('away')} en la jornada {number}")
+            elif match["status"] != "scheduled":
+                row_errors.append("el partido ya tiene resultado")
+            elif match["id"] in seen:
+                row_errors.append(f"partido repetido (ya aparece en la fila {seen[match['id']]})")
+        if row_errors:
+            errors.extend(f"Fila {line}: {e}" for e in row_errors)
+            continue
+        seen[match["id"]] = line
+        results.append({
+            **{k: match[k] for k in match.keys() if k != "jn"},
+            "status": "completed",
+            "home_score": home_score,
+            "away_score": away_score,
+            "winner_one_player": 0 if no_show_team_id else winner_one_player,
+            "no_show_team_id": no_show_team_id,
+        })
+
+    if errors:
+        raise ResultImportError(errors)
+    return results
+
+
+def apply_results(conn, results, no_show_win_points: int) -> int:
+    """
+    Guarda los resultados validados y aplica sus deltas de clasificación y Elo.
+    No hace commit. Devuelve el número de partidos actualizados.
+    """
+    now = now_local_iso()
+    # mismo orden que usa replay-ratings para partidos con la misma hora (id)
+    results = sorted(results, key=lambda r: r["id"])
+    cursor = conn.executemany(
+        """
+        UPDATE matches
+        SET status='completed', home_score=?, away_score=?, winner_one_player=?,
+            no_show_team_id=?, submitted_by_team_id=NULL, updated_at=?
+        WHERE id=? AND status='scheduled'
+        """,
+        [
+            (r["home_score"], r["away_score"], r["winner_one_player"], r["no_show_team_id"], now, r["id"])
+            for r in results
+        ],
+    )
+    if cursor.rowcount != len(results):
+        # otro usuario registró alguno de estos partidos mientras tanto: el llamador deshace
+        raise ResultImportError(["Algunos partidos han recibido resultado durante la importación; vuelva a intentarlo"])
+    apply_matches_to_standings(conn, results, no_show_win_points)
+    apply_matches_to_ratings(conn, results)
+    return len(results)
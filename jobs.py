@@ -0,0 +1,152 @@
+"""Trabajos en segundo plano disparados por escrituras (exportación pública)."""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (desarrollo, un solo proceso)
+    fcntl = None
+
+from config import Config
+from db import get_connection, get_data_version, publish_snapshot, snapshot_path
+
+log = logging.getLogger(__name__)
+
+
+class DebouncedJob:
+    """
+    Ejecuta `func` en un hilo de fondo `delay` segundos después del último
+    `trigger()`, agrupando ráfagas de avisos en una sola ejecución. Si siguen
+    llegando avisos, se ejecuta como muy tarde `max_wait` segundos después del
+    primero. El hilo se crea al primer aviso, también tras un fork.
+    """
+
+    def __init__(self, name: str, func, delay: float, max_wait: float):
+        self.name = name
+        self.func = func
+        self.delay = delay
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._first = None
+        self._last = None
+        self._thread = None
+        self._pid = None
+
+    def trigger(self) -> None:
+        with self._cond:
+            now = time.monotonic()
+            if self._first is None:
+                self._first = now
+            self._last = now
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _due(self):
+        return min(self._last + self.delay, self._first + self.max_wait)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._first is None:
+                    self._cond.wait()
+                while (remaining := self._due() - time.monotonic()) > 0:
+                    self._cond.wait(remaining)
+                self._first = self._last = None
+            try:
+                self.func()
+            except Exception:
+                log.exception("Error en el trabajo %s", self.name)
+
+
+@contextmanager
+def file_lock(path):
+    """Bloqueo exclusivo entre procesos (workers de gunicorn) sobre un fichero."""
+    with open(path, "a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _set_meta(conn, key: str, value: int) -> None:
+    conn.execute(
+        """
+        INSERT INTO league_meta(key, value) VALUES(?, ?)
+        ON CONFLICT(key) DO UPDATE SET value=excluded.value
+        """,
+        (key, value),
+    )
+
+
+def export_status(conn) -> dict:
+    rows = conn.execute(
+        """
+        SELECT key, value FROM league_meta
+        WHERE key IN ('exported_version', 'last_export_at', 'last_export_ms')
+        """
+    ).fetchall()
+    status = {row["key"]: row["value"] for row in rows}
+    status["data_version"] = get_data_version(conn)
+    return status
+
+
+def run_export() -> bool:
+    """
+    Exporta los datos públicos si la versión de datos cambió desde la última
+    exportación. El bloqueo de fichero garantiza que un solo worker exporta a la
+    vez; los demás, al entrar, ven la versión ya exportada y no repiten el trabajo.
+    """
+    import export_public_data
+
+    export_public_data.DATA_DIR.mkdir(exist_ok=True)
+    with file_lock(export_public_data.DATA_DIR / ".export.lock"):
+        conn = get_connection()
+        version = get_data_version(conn)
+        if export_status(conn).get("exported_version") == version:
+            return False
+        started = time.perf_counter()
+        export_public_data.export_all(conn, compact=Config.EXPORT_COMPACT, html=Config.EXPORT_HTML)
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        with conn:
+            _set_meta(conn, "exported_version", version)
+            _set_meta(conn, "last_export_at", int(time.time()))
+            _set_meta(conn, "last_export_ms", elapsed_ms)
+    log.info("Exportación pública completada (versión %s, %s ms)", version, elapsed_ms)
+    return True
+
+
+export_job = DebouncedJob(
+    "export-public-data",
+    run_export,
+    delay=Config.EXPORT_DEBOUNCE_SECONDS,
+    max_wait=Config.EXPORT_MAX_DELAY_SECONDS,
+)
+
+
+def run_snapshot() -> bool:
+    """Publica el snapshot de solo lectura; un worker a la vez (el otro lo verá al día)."""
+    with file_lock(snapshot_path().with_name(f".{snapshot_path().name}.lock")):
+        started = time.perf_counter()
+        published = publish_snapshot()
+    if published:
+        log.info("Snapshot publicado en %s ms", int((time.perf_counter() - started) * 1000))
+    return published
+
+
+# como mucho a mitad del retraso admitido, para que el snapshot no llegue a caducar
+snapshot_job = DebouncedJob(
+    "read-snapshot",
+    run_snapshot,
+    delay=Config.SNAPSHOT_DEBOUNCE_SECONDS,
+    max_wait=Config.SNAPSHOT_MAX_STALENESS / 2,
+)
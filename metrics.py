@@ -0,0 +1,204 @@
+"""Métricas de peticiones y SQL en formato de texto de Prometheus.
+
+Por petición se cuentan las sentencias SQL (trace callback de sqlite3) y se mide
+su duración (PooledConnection.timer, con la lectura de las filas), en las respuestas en streaming hasta que
+termina el envío; por endpoint se guardan la latencia, las
+consultas y el tiempo SQL como resúmenes con p50/p95/p99 calculados sobre una
+muestra acotada de las últimas observaciones. Todo vive en memoria del proceso:
+con varios workers de gunicorn cada uno publica sus propias series (etiqueta pid).
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+RESERVOIR_SIZE = 1024
+
+_lock = threading.Lock()
+_summaries = {}  # (nombre, etiquetas) -> Summary
+_counters = {}  # (nombre, etiquetas) -> valor
+_help = {}
+_local = threading.local()
+_settings = {"enabled": False, "slow_query_s": 0.1}
+
+
+class Summary:
+    """Cuenta, suma y cuantiles aproximados sobre las últimas RESERVOIR_SIZE muestras."""
+
+    __slots__ = ("count", "total", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: math.nan for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items()))
+
+
+def describe(name: str, kind: str, text: str) -> None:
+    _help[name] = (kind, text)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    if not _settings["enabled"]:
+        return
+    with _lock:
+        summary = _summaries.get(_key(name, labels))
+        if summary is None:
+            summary = _summaries[_key(name, labels)] = Summary()
+        summary.observe(value)
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    if not _settings["enabled"]:
+        return
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+describe("liga_http_requests_total", "counter", "Peticiones atendidas por endpoint, método y estado")
+describe("liga_http_request_duration_seconds", "summary", "Latencia de las peticiones por endpoint")
+describe("liga_sql_queries_per_request", "summary", "Sentencias SQL ejecutadas por petición")
+describe("liga_sql_seconds_per_request", "summary", "Tiempo total en SQL por petición")
+describe("liga_sql_slow_queries_total", "counter", "Sentencias por encima del umbral de consulta lenta")
+
+
+# --------- Instrumentación de conexiones ---------
+
+def _on_statement(sql: str) -> None:
+    stats = getattr(_local, "request", None)
+    if stats is not None:
+        stats["queries"] += 1
+
+
+def _on_timed(sql: str, seconds: float) -> None:
+    stats = getattr(_local, "request", None)
+    if stats is not None:
+        stats["sql_s"] += seconds
+    if seconds >= _settings["slow_query_s"]:
+        inc("liga_sql_slow_queries_total")
+        log.warning("SQL lenta (%.1f ms): %s", seconds * 1000, " ".join(sql.split())[:500])
+
+
+def instrument_connection(conn) -> None:
+    conn.set_trace_callback(_on_statement)
+    conn.timer = _on_timed
+
+
+# --------- Integración con Flask ---------
+
+def init_app(app) -> None:
+    """Registra los hooks si METRICS_ENABLED; si no, la instrumentación no existe."""
+    import db
+
+    _settings["enabled"] = app.config["METRICS_ENABLED"]
+    _settings["slow_query_s"] = app.config["SLOW_QUERY_MS"] / 1000
+    if not _settings["enabled"]:
+        return
+    db.connection_hooks.append(instrument_connection)
+
+    @app.before_request
+    def _start_request_metrics():
+        _local.request = {"start": time.perf_counter(), "queries": 0, "sql_s": 0.0}
+
+    @app.after_request
+    def _end_request_metrics(response):
+        stats = getattr(_local, "request", None)
+        if stats is None:
+            return response
+        from flask import request
+
+        labels = (request.endpoint or "404", request.method, str(response.status_code))
+        if response.is_streamed:
+            # el cuerpo se genera después, en este mismo hilo: se sigue contando
+            # el SQL y se cierra al terminar el envío
+            response.call_on_close(lambda: _finish_request(stats, *labels))
+        else:
+            _finish_request(stats, *labels)
+        return response
+
+
+def _finish_request(stats: dict, endpoint: str, method: str, status: str) -> None:
+    if getattr(_local, "request", None) is stats:
+        _local.request = None
+    observe("liga_http_request_duration_seconds", time.perf_counter() - stats["start"], endpoint=endpoint)
+    observe("liga_sql_queries_per_request", stats["queries"], endpoint=endpoint)
+    observe("liga_sql_seconds_per_request", stats["sql_s"], endpoint=endpoint)
+    inc("liga_http_requests_total", endpoint=endpoint, method=method, status=status)
+
+
+def enabled() -> bool:
+    return _settings["enabled"]
+
+
+# --------- Exposición ---------
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra) -> str:
+    items = list(labels) + list(extra.items())
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render(extra_gauges=None, extra_counters=None) -> str:
+    """
+    Texto de exposición de Prometheus. `extra_gauges` y `extra_counters` son
+    {nombre: (ayuda, valor o {etiquetas: valor})} con valores calculados en el
+    momento: los primeros suben y bajan (p. ej. conexiones abiertas) y los
+    segundos son acumulados que solo crecen (series `_total`).
+    """
+    pid = os.getpid()
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        summaries = {key: (s.count, s.total, s.quantiles()) for key, s in _summaries.items()}
+
+    names = sorted({name for name, _ in counters} | {name for name, _ in summaries})
+    for name in names:
+        kind, text = _help.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_labels(labels, pid=pid)} {value}")
+        for (n, labels), (count, total, quantiles) in sorted(summaries.items()):
+            if n != name:
+                continue
+            for q, value in quantiles.items():
+                lines.append(f"{name}{_labels(labels, pid=pid, quantile=q)} {value:.6g}")
+            lines.append(f"{name}_sum{_labels(labels, pid=pid)} {total:.6g}")
+            lines.append(f"{name}_count{_labels(labels, pid=pid)} {count}")
+
+    extra = [(name, "gauge", series) for name, series in (extra_gauges or {}).items()]
+    extra += [(name, "counter", series) for name, series in (extra_counters or {}).items()]
+    for name, kind, (text, value) in sorted(extra):
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if isinstance(value, dict):
+            for labels, v in sorted(value.items()):
+                lines.append(f"{name}{_labels(labels, pid=pid)} {v}")
+        else:
+            lines.append(f"{name}{_labels((), pid=pid)} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,106 @@
+-- Esquema base. Las bases anteriores al sistema de migraciones (user_version 0)
+-- ya tienen parte de estas tablas: todo es IF NOT EXISTS para poder aplicarlo encima.
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS teams (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT UNIQUE NOT NULL,
+  username TEXT UNIQUE NOT NULL,
+  password_hash TEXT NOT NULL,
+  is_active INTEGER NOT NULL DEFAULT 1,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS jornadas (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  number INTEGER NOT NULL,
+  date TEXT NOT NULL -- YYYY-MM-DD
+);
+
+CREATE TABLE IF NOT EXISTS matches (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  jornada_id INTEGER NOT NULL,
+  home_team_id INTEGER NOT NULL,
+  away_team_id INTEGER NOT NULL,
+  scheduled_at TEXT, -- ISO datetime opcional
+  status TEXT NOT NULL DEFAULT 'scheduled', -- scheduled|completed
+  home_score INTEGER,
+  away_score INTEGER,
+  winner_one_player INTEGER NOT NULL DEFAULT 0, -- 1 si el equipo ganador jugó con un solo jugador
+  no_show_team_id INTEGER, -- equipo que no se presentó (NULL si no aplica)
+  submitted_by_team_id INTEGER, -- quién registró el resultado
+  updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (jornada_id) REFERENCES jornadas(id) ON DELETE CASCADE,
+  FOREIGN KEY (home_team_id) REFERENCES teams(id) ON DELETE CASCADE,
+  FOREIGN KEY (away_team_id) REFERENCES teams(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_matches_jornada ON matches(jornada_id);
+-- idx_matches_status (solo 2 valores) confundía al planificador; se sustituye por índices compuestos
+DROP INDEX IF EXISTS idx_matches_status;
+-- Accesos frecuentes: panel de equipo (local/visitante + estado), portada y listados
+CREATE INDEX IF NOT EXISTS idx_matches_home_status ON matches(home_team_id, status);
+CREATE INDEX IF NOT EXISTS idx_matches_away_status ON matches(away_team_id, status);
+CREATE INDEX IF NOT EXISTS idx_matches_jornada_status ON matches(jornada_id, status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_jornadas_number ON jornadas(number);
+CREATE INDEX IF NOT EXISTS idx_jornadas_date ON jornadas(date);
+
+-- Clasificación precalculada: se actualiza con deltas al guardar/reabrir/borrar resultados
+CREATE TABLE IF NOT EXISTS standings (
+  team_id INTEGER PRIMARY KEY,
+  played INTEGER NOT NULL DEFAULT 0,
+  wins INTEGER NOT NULL DEFAULT 0,
+  losses INTEGER NOT NULL DEFAULT 0,
+  no_shows INTEGER NOT NULL DEFAULT 0,
+  points INTEGER NOT NULL DEFAULT 0,
+  gf INTEGER NOT NULL DEFAULT 0,
+  ga INTEGER NOT NULL DEFAULT 0,
+  FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE
+);
+
+-- Aportación de cada jornada a la clasificación de cada equipo (mismos campos que
+-- standings): la clasificación tras la jornada k es la suma de las jornadas <= k
+CREATE TABLE IF NOT EXISTS standings_by_jornada (
+  jornada_id INTEGER NOT NULL,
+  team_id INTEGER NOT NULL,
+  played INTEGER NOT NULL DEFAULT 0,
+  wins INTEGER NOT NULL DEFAULT 0,
+  losses INTEGER NOT NULL DEFAULT 0,
+  no_shows INTEGER NOT NULL DEFAULT 0,
+  points INTEGER NOT NULL DEFAULT 0,
+  gf INTEGER NOT NULL DEFAULT 0,
+  ga INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (jornada_id, team_id),
+  FOREIGN KEY (jornada_id) REFERENCES jornadas(id) ON DELETE CASCADE,
+  FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- Elo y forma de cada equipo (ratings.py), actualizados con cada resultado
+CREATE TABLE IF NOT EXISTS ratings (
+  team_id INTEGER PRIMARY KEY,
+  rating REAL NOT NULL DEFAULT 1500,
+  games INTEGER NOT NULL DEFAULT 0,
+  form TEXT NOT NULL DEFAULT '', -- últimos resultados (G/P), el más reciente al final
+  streak INTEGER NOT NULL DEFAULT 0, -- racha: +n victorias, -n derrotas
+  FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE
+);
+
+-- Cambio de Elo que aplicó cada partido a cada equipo, para revertirlo al reabrirlo
+CREATE TABLE IF NOT EXISTS rating_events (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  match_id INTEGER NOT NULL,
+  team_id INTEGER NOT NULL,
+  delta REAL NOT NULL,
+  result TEXT NOT NULL, -- G|P
+  UNIQUE (match_id, team_id),
+  FOREIGN KEY (match_id) REFERENCES matches(id) ON DELETE CASCADE,
+  FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_rating_events_team ON rating_events(team_id, seq);
+
+-- Metadatos de la liga (p. ej. data_version, que se incrementa en cada escritura)
+CREATE TABLE IF NOT EXISTS league_meta (
+  key TEXT PRIMARY KEY,
+  value INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO league_meta(key, value) VALUES('data_version', 0);
@@ -0,0 +1,25 @@
+"""Rellena las tablas derivadas en bases anteriores a ellas.
+
+Las bases creadas antes de la clasificación precalculada o del Elo reciben esas
+tablas vacías de 0001 aunque ya tengan resultados. Solo se recalculan si están
+vacías: en una base nueva o ya al día no cambia nada.
+"""
+
+from config import Config
+from db import bump_data_version
+from ratings import replay_ratings
+from utils import rebuild_standings
+
+
+def upgrade(conn):
+    if not conn.execute("SELECT 1 FROM matches WHERE status='completed' LIMIT 1").fetchone():
+        return
+    changed = False
+    if not conn.execute("SELECT 1 FROM standings LIMIT 1").fetchone():
+        rebuild_standings(conn, Config.NO_SHOW_WIN_POINTS)
+        changed = True
+    if not conn.execute("SELECT 1 FROM rating_events LIMIT 1").fetchone():
+        replay_ratings(conn)
+        changed = True
+    if changed:
+        bump_data_version(conn)
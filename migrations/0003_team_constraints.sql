@@ -0,0 +1,11 @@
+-- Restricciones de calendario por equipo para el optimizador (scheduler.py):
+-- sede del equipo (los que comparten sede no deberían jugar en casa la misma
+-- jornada) y fechas en las que el equipo no puede jugar.
+ALTER TABLE teams ADD COLUMN venue TEXT;
+
+CREATE TABLE IF NOT EXISTS team_blackouts (
+  team_id INTEGER NOT NULL,
+  date TEXT NOT NULL, -- YYYY-MM-DD
+  PRIMARY KEY (team_id, date),
+  FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE
+) WITHOUT ROWID;
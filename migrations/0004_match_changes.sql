@@ -0,0 +1,41 @@
+-- Registro de partidos cambiados para los eventos en vivo (events.py): cada
+-- proceso lee solo los `seq` posteriores al último que vio en lugar de volver
+-- a cargar todos los partidos. Lo rellenan triggers, así que entra en la misma
+-- transacción que la escritura, y se recorta a las últimas 5000 filas (quien se
+-- quede atrás lo detecta por el hueco y hace un resync completo).
+CREATE TABLE IF NOT EXISTS match_changes (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  match_id INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS match_changes_trim AFTER INSERT ON match_changes
+BEGIN
+  DELETE FROM match_changes WHERE seq <= NEW.seq - 5000;
+END;
+
+CREATE TRIGGER IF NOT EXISTS matches_log_insert AFTER INSERT ON matches
+BEGIN
+  INSERT INTO match_changes(match_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS matches_log_update AFTER UPDATE ON matches
+BEGIN
+  INSERT INTO match_changes(match_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS matches_log_delete AFTER DELETE ON matches
+BEGIN
+  INSERT INTO match_changes(match_id) VALUES (OLD.id);
+END;
+
+-- El número/fecha de la jornada y el nombre de los equipos también van en cada partido
+CREATE TRIGGER IF NOT EXISTS jornadas_log_update AFTER UPDATE OF number, date ON jornadas
+BEGIN
+  INSERT INTO match_changes(match_id) SELECT id FROM matches WHERE jornada_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS teams_log_rename AFTER UPDATE OF name ON teams
+BEGIN
+  INSERT INTO match_changes(match_id)
+  SELECT id FROM matches WHERE home_team_id = NEW.id OR away_team_id = NEW.id;
+END;
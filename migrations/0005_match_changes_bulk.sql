@@ -0,0 +1,10 @@
+-- match_changes sin coste por fila en escrituras masivas:
+-- * el recorte ya no es un trigger (un DELETE por cada fila anotada): lo hace
+--   periódicamente el hilo de eventos (events.Broadcaster);
+-- * el calendario, el reinicio y la importación (db.bulk_match_writes) quitan
+--   los triggers matches_log_* dentro de su transacción y los restauran antes
+--   del commit, e incrementan `match_resync` para que los eventos en vivo
+--   manden un resync completo en lugar de un delta.
+DROP TRIGGER IF EXISTS match_changes_trim;
+
+INSERT OR IGNORE INTO league_meta(key, value) VALUES('match_resync', 0);
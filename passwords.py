@@ -0,0 +1,125 @@
+"""Hash y verificación de contraseñas con concurrencia acotada.
+
+Los hashes de Werkzeug (scrypt por defecto) son caros a propósito. Se calculan
+en el propio hilo de la petición (hashlib libera el GIL, así que varios corren en
+paralelo con el resto de peticiones), con dos límites por proceso para no dejar a
+las páginas públicas sin hilos libres:
+
+* como mucho PASSWORD_HASH_CONCURRENCY hashes calculándose a la vez;
+* como mucho PASSWORD_HASH_WAITING peticiones esperando hueco. Si la cola está
+  llena se responde "ocupado" al momento, y quien entra en ella espera como
+  mucho PASSWORD_HASH_TIMEOUT segundos.
+
+Cada usuario tiene además un límite de intentos por ventana de tiempo (en
+memoria del proceso), comprobado antes de calcular ningún hash. Al iniciar
+sesión con un hash generado con otro método/coste se rehace con el actual.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import metrics
+from config import Config
+
+MAX_TRACKED_LOGINS = 10000  # parejas (usuario, dirección) con intentos recientes
+
+metrics.describe("liga_password_hash_seconds", "summary", "Duración de cada hash de contraseña (generar/verificar)")
+metrics.describe("liga_password_hash_busy_total", "counter", "Peticiones rechazadas por no haber hueco para el hash")
+metrics.describe("liga_login_throttled_total", "counter", "Intentos de inicio de sesión bloqueados por exceso de intentos")
+
+
+class PasswordHashBusy(RuntimeError):
+    """No hubo hueco para calcular el hash: cola de espera llena o tiempo agotado."""
+
+
+class LoginThrottled(RuntimeError):
+    """Demasiados intentos para un usuario; `retry_after` en segundos."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"reintentar en {retry_after} s")
+        self.retry_after = retry_after
+
+
+# Semáforos sin hilos propios: con --preload cada worker hereda su copia al hacer fork
+_slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_CONCURRENCY)
+# Hueco para calcular o para esperar: acotar la cola acota los hilos retenidos
+_admitted = threading.BoundedSemaphore(Config.PASSWORD_HASH_CONCURRENCY + Config.PASSWORD_HASH_WAITING)
+_method_prefix = None
+
+
+def _run(op: str, func, *args):
+    if not _admitted.acquire(blocking=False):
+        metrics.inc("liga_password_hash_busy_total", op=op, reason="queue")
+        raise PasswordHashBusy()
+    try:
+        if not _slots.acquire(timeout=Config.PASSWORD_HASH_TIMEOUT):
+            metrics.inc("liga_password_hash_busy_total", op=op, reason="timeout")
+            raise PasswordHashBusy()
+        try:
+            start = time.perf_counter()
+            result = func(*args)
+            metrics.observe("liga_password_hash_seconds", time.perf_counter() - start, op=op)
+            return result
+        finally:
+            _slots.release()
+    finally:
+        _admitted.release()
+
+
+def hash_password(password: str) -> str:
+    return _run("generate", generate_password_hash, password, Config.PASSWORD_HASH_METHOD)
+
+
+def verify_password(stored_hash: str, password: str) -> bool:
+    return _run("verify", check_password_hash, stored_hash, password)
+
+
+def needs_rehash(stored_hash: str) -> bool:
+    """True si el hash no usa el método y parámetros actuales (p. ej. 'scrypt:32768:8:1')."""
+    global _method_prefix
+    if _method_prefix is None:
+        # Werkzeug completa los parámetros por defecto del método: se obtienen una vez
+        _method_prefix = hash_password("").split("$", 1)[0]
+    return stored_hash.split("$", 1)[0] != _method_prefix
+
+
+class LoginThrottle:
+    """
+    Como mucho `max_attempts` intentos por usuario y dirección remota cada
+    `window` segundos: los fallos de otra dirección no bloquean al usuario
+    legítimo (p. ej. al administrador). Un inicio de sesión correcto borra el
+    historial de su dirección. Acotado a MAX_TRACKED_LOGINS.
+    """
+
+    def __init__(self, max_attempts: int, window: float):
+        self.max_attempts = max_attempts
+        self.window = window
+        self._attempts = OrderedDict()  # (usuario, dirección) -> deque de instantes
+        self._lock = threading.Lock()
+
+    def attempt(self, username: str, remote_addr: str | None) -> None:
+        """Registra un intento o lanza LoginThrottled si se superó el límite."""
+        key = (username.casefold(), remote_addr)
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._attempts.pop(key, None) or deque()
+            while attempts and attempts[0] <= now - self.window:
+                attempts.popleft()
+            if len(attempts) >= self.max_attempts:
+                self._attempts[key] = attempts
+                metrics.inc("liga_login_throttled_total")
+                raise LoginThrottled(int(attempts[0] + self.window - now) + 1)
+            attempts.append(now)
+            self._attempts[key] = attempts
+            while len(self._attempts) > MAX_TRACKED_LOGINS:
+                self._attempts.popitem(last=False)
+
+    def reset(self, username: str, remote_addr: str | None) -> None:
+        with self._lock:
+            self._attempts.pop((username.casefold(), remote_addr), None)
+
+
+login_throttle = LoginThrottle(Config.LOGIN_MAX_ATTEMPTS, Config.LOGIN_WINDOW_SECONDS)
@@ -0,0 +1,214 @@
+"""Consultas de lectura compartidas entre la app Flask y el exportador estático."""
+
+from itertools import groupby
+
+_JORNADA_COLUMNS = ("jornada_key", "jornada_number", "jornada_date")
+
+# Partido con fecha/número de jornada y nombres de equipos. CROSS JOIN fija el
+# orden de los bucles (jornadas fuera, partidos dentro) para que las consultas
+# ordenadas por fecha o número recorran los índices de jornadas sin ordenar en
+# un B-tree temporal, tenga o no estadísticas el planificador.
+MATCH_COLUMNS = "m.*, j.number AS jn, j.date, th.name AS home_name, ta.name AS away_name"
+MATCHES_BY_JORNADA = """
+    FROM jornadas j
+    CROSS JOIN matches m ON m.jornada_id=j.id
+    JOIN teams th ON th.id=m.home_team_id
+    JOIN teams ta ON ta.id=m.away_team_id
+"""
+MATCHES_BY_TEAM = """
+    FROM matches m
+    JOIN jornadas j ON j.id=m.jornada_id
+    JOIN teams th ON th.id=m.home_team_id
+    JOIN teams ta ON ta.id=m.away_team_id
+"""
+
+
+def fetch_upcoming(conn, today: str, limit: int = 10):
+    return conn.execute(
+        f"""
+        SELECT {MATCH_COLUMNS}
+        {MATCHES_BY_JORNADA}
+        WHERE m.status='scheduled' AND j.date >= ?
+        ORDER BY j.date ASC
+        LIMIT ?
+        """,
+        (today, limit),
+    ).fetchall()
+
+
+def fetch_recent(conn, limit: int = 10):
+    return conn.execute(
+        f"""
+        SELECT {MATCH_COLUMNS}
+        {MATCHES_BY_JORNADA}
+        WHERE m.status='completed'
+        ORDER BY j.date DESC, m.updated_at DESC
+        LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
+
+
+def iter_matches(
+    conn,
+    after=None,
+    limit=None,
+    team_id=None,
+    jornada=None,
+    status=None,
+    date_from=None,
+    date_to=None,
+):
+    """
+    Partidos ordenados por (número de jornada, id) con filtros opcionales, como
+    cursor: las filas se leen a medida que se recorre (p. ej. al renderizar en
+    streaming) en lugar de cargarlas todas en una lista.
+    `after` es la última clave (jn, id) devuelta: paginación por cursor (keyset),
+    que no recorre las filas anteriores como haría OFFSET.
+    """
+    where, params = [], []
+    if after is not None:
+        where.append("(j.number, m.id) > (?, ?)")
+        params.extend(after)
+    if team_id is not None:
+        where.append("(m.home_team_id=? OR m.away_team_id=?)")
+        params.extend((team_id, team_id))
+    if jornada is not None:
+        where.append("j.number=?")
+        params.append(jornada)
+    if status is not None:
+        where.append("m.status=?")
+        params.append(status)
+    if date_from is not None:
+        where.append("j.date >= ?")
+        params.append(date_from)
+    if date_to is not None:
+        where.append("j.date <= ?")
+        params.append(date_to)
+    sql = f"""
+        SELECT {MATCH_COLUMNS}
+        {MATCHES_BY_JORNADA}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY j.number, m.id
+    """
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params)
+
+
+def fetch_matches(conn, **filters):
+    """Como iter_matches pero en una lista (ver sus filtros)."""
+    return iter_matches(conn, **filters).fetchall()
+
+
+def fetch_all_matches(conn):
+    return fetch_matches(conn)
+
+
+def fetch_match(conn, match_id: int):
+    return conn.execute(
+        f"""
+        SELECT {MATCH_COLUMNS}
+        {MATCHES_BY_TEAM}
+        WHERE m.id=?
+        """,
+        (match_id,),
+    ).fetchone()
+
+
+def fetch_matches_by_ids(conn, match_ids):
+    """Partidos con esos ids (los que ya no existen no aparecen)."""
+    match_ids = list(match_ids)
+    return conn.execute(
+        f"""
+        SELECT {MATCH_COLUMNS}
+        {MATCHES_BY_TEAM}
+        WHERE m.id IN ({",".join("?" * len(match_ids))})
+        """,
+        match_ids,
+    ).fetchall()
+
+
+def fetch_team_upcoming(conn, team_id: int, limit: int = 10):
+    return conn.execute(
+        f"""
+        SELECT {MATCH_COLUMNS}
+        {MATCHES_BY_TEAM}
+        WHERE (m.home_team_id=? OR m.away_team_id=?) AND m.status='scheduled'
+        ORDER BY j.date ASC
+        LIMIT ?
+        """,
+        (team_id, team_id, limit),
+    ).fetchall()
+
+
+def fetch_team_pending(conn, team_id: int):
+    """Partidos sin resultado cuya fecha ya pasó (o es hoy)."""
+    return conn.execute(
+        f"""
+        SELECT {MATCH_COLUMNS}
+        {MATCHES_BY_TEAM}
+        WHERE (m.home_team_id=? OR m.away_team_id=?) AND m.status='scheduled' AND j.date <= date('now')
+        ORDER BY j.date ASC
+        """,
+        (team_id, team_id),
+    ).fetchall()
+
+
+def fetch_team_recent(conn, team_id: int, limit: int = 10):
+    return conn.execute(
+        f"""
+        SELECT {MATCH_COLUMNS}
+        {MATCHES_BY_TEAM}
+        WHERE (m.home_team_id=? OR m.away_team_id=?) AND m.status='completed'
+        ORDER BY j.date DESC, m.updated_at DESC
+        LIMIT ?
+        """,
+        (team_id, team_id, limit),
+    ).fetchall()
+
+
+def fetch_jornadas_with_matches(conn, after=None, limit=None) -> list[dict]:
+    """
+    Todas las jornadas con sus partidos en una sola consulta.
+    Devuelve [{"jornada": {...}, "matches": [{...}, ...]}, ...] ordenado por
+    número de jornada y id de partido; las jornadas sin partidos tienen lista vacía.
+    `after` (número, id) y `limit` paginan por jornadas completas.
+    """
+    where, params = "", []
+    if after is not None:
+        where = "WHERE (number, id) > (?, ?)"
+        params.extend(after)
+    params.append(-1 if limit is None else limit)
+    cursor = conn.execute(
+        f"""
+        SELECT j.id AS jornada_key, j.number AS jornada_number, j.date AS jornada_date,
+               m.*, th.name AS home_name, ta.name AS away_name
+        FROM (SELECT id, number, date FROM jornadas {where} ORDER BY number, id LIMIT ?) j
+        LEFT JOIN matches m ON m.jornada_id=j.id
+        LEFT JOIN teams th ON th.id=m.home_team_id
+        LEFT JOIN teams ta ON ta.id=m.away_team_id
+        ORDER BY j.number, j.id, m.id
+        """,
+        params,
+    )
+    result = []
+    for _, rows in groupby(cursor, key=lambda r: r["jornada_key"]):
+        first = next(rows)
+        jornada = {
+            "id": first["jornada_key"],
+            "number": first["jornada_number"],
+            "date": first["jornada_date"],
+        }
+        matches = []
+        for row in (first, *rows):
+            if row["id"] is None:
+                # LEFT JOIN: jornada sin partidos
+                continue
+            match = dict(row)
+            for col in _JORNADA_COLUMNS:
+                del match[col]
+            matches.append(match)
+        result.append({"jornada": jornada, "matches": matches})
+    return result
@@ -0,0 +1,177 @@
+"""Rating Elo y forma reciente de los equipos.
+
+Cada resultado actualiza el Elo de los dos equipos al guardarse (con un
+multiplicador por diferencia de legs) y añade su resultado a la forma (últimos
+FORM_LENGTH resultados y racha). El cambio aplicado por cada partido queda en
+`rating_events`, de modo que reabrir o borrar un partido resta exactamente lo
+que sumó sin recorrer el histórico. Como el Elo depende del orden, tras
+reaperturas en mitad de la temporada el valor incremental puede diferir
+ligeramente de una repetición completa: `flask --app app replay-ratings` la
+hace de forma determinista (por orden de registro: updated_at, id).
+
+Las incomparecencias cuentan en la forma pero no mueven el Elo: no dicen nada
+del nivel de juego.
+"""
+
+import json
+import math
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+FORM_LENGTH = 5
+
+
+def match_outcome(m):
+    """(ganador, perdedor, diferencia de legs) de un partido completado; None si no cuenta."""
+    if m["status"] != "completed":
+        return None
+    home, away = m["home_team_id"], m["away_team_id"]
+    if m["no_show_team_id"]:
+        loser = m["no_show_team_id"]
+        return (home if loser == away else away), loser, 0
+    hs, as_ = m["home_score"], m["away_score"]
+    if hs is None or as_ is None or hs == as_:
+        return None
+    if hs > as_:
+        return home, away, hs - as_
+    return away, home, as_ - hs
+
+
+def rating_change(winner_rating: float, loser_rating: float, margin: int) -> float:
+    """
+    Puntos Elo que gana el ganador (y pierde el perdedor). Con margin=0
+    (incomparecencia) no hay cambio. El multiplicador crece con el logaritmo de
+    la diferencia de legs y se amortigua cuando ganó el favorito.
+    """
+    if margin <= 0:
+        return 0.0
+    expected = 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400))
+    multiplier = math.log(margin + 1) * 2.2 / ((winner_rating - loser_rating) * 0.001 + 2.2)
+    return K_FACTOR * multiplier * (1 - expected)
+
+
+def _form_and_streak(results):
+    """
+    Forma (los últimos FORM_LENGTH resultados, el más reciente al final) y racha
+    (+n victorias / -n derrotas seguidas). `results`: 'G'/'P' del más reciente
+    al más antiguo; se deja de leer en cuanto ambas están completas.
+    """
+    form = []
+    streak = 0
+    counting = True
+    for result in results:
+        if len(form) < FORM_LENGTH:
+            form.append(result)
+        if counting and result == form[0]:
+            streak += 1
+        else:
+            counting = False
+            if len(form) >= FORM_LENGTH:
+                break
+    if form and form[0] == "P":
+        streak = -streak
+    return "".join(reversed(form)), streak
+
+
+def apply_match_to_ratings(conn, m) -> None:
+    """
+    Aplica un partido completado a `ratings` y guarda sus cambios en
+    `rating_events`. No hace commit: va en la transacción del resultado.
+    """
+    apply_matches_to_ratings(conn, [m])
+
+
+def apply_matches_to_ratings(conn, matches) -> None:
+    """
+    Aplica varios partidos, en el orden dado, leyendo el estado de los equipos
+    una vez y escribiendo eventos y ratings con un executemany cada uno.
+    """
+    outcomes = [(m["id"], outcome) for m in matches if (outcome := match_outcome(m)) is not None]
+    if not outcomes:
+        return
+    teams = {team_id for _, (winner, loser, _) in outcomes for team_id in (winner, loser)}
+    state = {
+        team_id: {"rating": INITIAL_RATING, "games": 0, "form": "", "streak": 0}
+        for team_id in teams
+    }
+    for row in conn.execute(
+        "SELECT team_id, rating, games, form, streak FROM ratings WHERE team_id IN (SELECT value FROM json_each(?))",
+        (json.dumps(sorted(teams)),),
+    ):
+        state[row["team_id"]] = {k: row[k] for k in ("rating", "games", "form", "streak")}
+
+    events = []
+    for match_id, (winner, loser, margin) in outcomes:
+        delta = rating_change(state[winner]["rating"], state[loser]["rating"], margin)
+        for team_id, change, result in ((winner, delta, "G"), (loser, -delta, "P")):
+            st = state[team_id]
+            step = 1 if result == "G" else -1
+            st["rating"] += change
+            st["games"] += 1
+            st["form"] = (st["form"] + result)[-FORM_LENGTH:]
+            st["streak"] = st["streak"] + step if st["streak"] * step > 0 else step
+            events.append((match_id, team_id, change, result))
+
+    conn.executemany(
+        "INSERT INTO rating_events(match_id, team_id, delta, result) VALUES(?, ?, ?, ?)", events
+    )
+    conn.executemany(
+        """
+        INSERT INTO ratings(team_id, rating, games, form, streak) VALUES(?, ?, ?, ?, ?)
+        ON CONFLICT(team_id) DO UPDATE SET
+            rating=excluded.rating, games=excluded.games, form=excluded.form, streak=excluded.streak
+        """,
+        [(team_id, st["rating"], st["games"], st["form"], st["streak"]) for team_id, st in state.items()],
+    )
+
+
+def revert_match_ratings(conn, match_id: int) -> None:
+    """Resta los cambios que aplicó `match_id` y recalcula la forma de sus equipos."""
+    events = conn.execute("SELECT team_id, delta FROM rating_events WHERE match_id=?", (match_id,)).fetchall()
+    if not events:
+        return
+    conn.executemany(
+        "UPDATE ratings SET rating=rating-?, games=games-1 WHERE team_id=?",
+        [(e["delta"], e["team_id"]) for e in events],
+    )
+    conn.execute("DELETE FROM rating_events WHERE match_id=?", (match_id,))
+    for e in events:
+        rows = conn.execute(
+            "SELECT result FROM rating_events WHERE team_id=? ORDER BY seq DESC", (e["team_id"],)
+        )
+        form, streak = _form_and_streak(row["result"] for row in rows)
+        conn.execute("UPDATE ratings SET form=?, streak=? WHERE team_id=?", (form, streak, e["team_id"]))
+
+
+def replay_ratings(conn) -> list:
+    """
+    Recalcula `ratings` y `rating_events` desde cero recorriendo los partidos
+    completados en orden de registro. Devuelve los team_id cuyo Elo almacenado
+    difería del recalculado. No hace commit.
+    """
+    stored = {row["team_id"]: row["rating"] for row in conn.execute("SELECT team_id, rating FROM ratings")}
+    conn.execute("DELETE FROM rating_events")
+    conn.execute("DELETE FROM ratings")
+    apply_matches_to_ratings(
+        conn, conn.execute("SELECT * FROM matches WHERE status='completed' ORDER BY updated_at, id").fetchall()
+    )
+    replayed = {row["team_id"]: row["rating"] for row in conn.execute("SELECT team_id, rating FROM ratings")}
+    return sorted(
+        team_id for team_id in set(stored) | set(replayed)
+        if abs(stored.get(team_id, INITIAL_RATING) - replayed.get(team_id, INITIAL_RATING)) > 1e-6
+    )
+
+
+def fetch_ratings(conn) -> dict:
+    """{team_id: {rating, games, form, streak}} de todos los equipos con partidos."""
+    return {
+        row["team_id"]: dict(row)
+        for row in conn.execute("SELECT team_id, rating, games, form, streak FROM ratings")
+    }
+
+
+def rating_fields(rating) -> dict:
+    """Campos públicos (Elo redondeado, forma y racha) de una fila de fetch_ratings o None."""
+    if rating is None:
+        return {"rating": round(INITIAL_RATING), "form": "", "streak": 0}
+    return {"rating": round(rating["rating"]), "form": rating["form"], "streak": rating["streak"]}
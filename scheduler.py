@@ -0,0 +1,597 @@
+"""Optimizador del calendario: mejora el round-robin con búsqueda local.
+
+Parte de las rondas del método del círculo con la localía canónica
+(utils.round_robin_pairings con balanced=True: n-2 roturas por vuelta) y las
+mejora con recocido simulado sobre estos movimientos:
+
+* intercambiar dos equipos de hueco en el calendario (o dos parejas de huecos
+  complementarios): las roturas no cambian;
+* intercambiar el orden de dos rondas dentro de una vuelta (qué ronda se
+  juega en qué jornada); cada vuelta tiene su propio orden;
+* rotar el orden de una vuelta (con número impar de equipos y varias vueltas):
+  cambia en qué jornada descansa cada equipo casi sin cambiar las roturas;
+* invertir la localía de un partido.
+
+Cada vuelta juega las mismas rondas que la primera, con la localía invertida
+en las vueltas impares como en build_fixtures, pero no en el mismo orden: así,
+con número impar de equipos, la jornada en que descansa cada equipo cambia de
+una vuelta a otra. Nunca se juega la misma ronda al final de una vuelta y al
+principio de la siguiente (el mismo rival dos jornadas seguidas). El coste que
+se minimiza suma:
+
+* roturas: partidos consecutivos de un equipo con la misma condición (casa o
+  fuera); un descanso (BYE) corta la secuencia;
+* choques de sede: equipos con la misma `venue` que juegan en casa la misma
+  jornada (cuenta cada local de más);
+* conflictos de fecha: partidos de un equipo en una fecha de `team_blackouts`;
+* descansos cortos desiguales (número impar de equipos, con fechas de jornada
+  irregulares): diferencia entre el equipo con más descansos cortos y el que
+  menos. Es corto el tiempo entre dos partidos de un equipo menor que la
+  separación mediana entre jornadas; quien descansa una jornada se salta los
+  dos huecos que la rodean.
+
+La puntuación de calidad compara con el calendario sin optimizar de
+build_fixtures: 0 es igual de malo y 100 no tiene roturas, conflictos evitables
+ni descansos desiguales.
+
+Antes de buscar, los equipos que comparten sede se colocan por parejas en
+huecos complementarios (uno juega en casa cuando el otro juega fuera), que el
+patrón canónico tiene para todos los huecos. Sede y fechas pesan mucho más que
+las roturas: se cumplen siempre que el calendario lo permita y las que queden
+se informan. No siempre se puede: con número par de equipos todos juegan cada
+jornada (una fecha bloqueada no se evita) y tres o más equipos con la misma
+sede coinciden en casa muchas jornadas.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import statistics
+import time
+from datetime import date as Date
+
+from utils import round_robin_pairings, select_fixture_jornadas, validate_fixtures
+
+WEIGHT_BREAK = 1
+WEIGHT_VENUE = 1000
+WEIGHT_BLACKOUT = 1000
+WEIGHT_REST = 10
+# penalización de la puntuación por cada conflicto evitable o descanso corto de más (cada rotura pesa 1)
+SCORE_CONFLICT_PENALTY = 10
+START_TEMPERATURE = 2.0
+END_TEMPERATURE = 0.05
+
+
+class FixtureOptimizer:
+    """
+    Estado de la búsqueda. Las rondas se expresan en huecos 0..n-1 y
+    `team_at[s]` es el equipo (índice) que ocupa el hueco s. `order[v][p]` es
+    la ronda que se juega en la posición p de la vuelta v (`pos[v]` la inversa):
+    la jornada `idx` juega la ronda `order[idx // R][idx % R]`, con la localía
+    invertida en las vueltas impares. La última vuelta puede estar incompleta.
+    """
+
+    def __init__(self, team_ids, jornadas, rounds, venues=None, blackouts=None):
+        self.team_ids = list(team_ids)
+        index = {t: i for i, t in enumerate(self.team_ids)}
+        self.n = len(self.team_ids)
+        self.dates = [str(j["date"]) for j in jornadas]
+        self.jornada_ids = [j["id"] for j in jornadas]
+        self.J = len(jornadas)
+        self.R = len(rounds)
+        # partidos de cada ronda como [hueco local, hueco visitante]
+        self.rounds = [[[index[h], index[a]] for h, a in pairs] for pairs in rounds]
+        self.legs = -(-self.J // self.R) if self.R else 0
+        self.order = [list(range(self.R)) for _ in range(self.legs)]
+        self.pos = [list(range(self.R)) for _ in range(self.legs)]
+        self.team_at = list(range(self.n))
+        self._slot_of = list(range(self.n))
+        # side[s][k]: +1 en casa, -1 fuera, 0 descansa (orientación de la primera vuelta)
+        self.side = [[0] * self.R for _ in range(self.n)]
+        for k, pairs in enumerate(self.rounds):
+            for h, a in pairs:
+                self.side[h][k] = 1
+                self.side[a][k] = -1
+
+        # grupos de sede compartida (solo importan los de dos o más equipos)
+        groups = {}
+        for team_id, venue in (venues or {}).items():
+            if venue and venue.strip() and team_id in index:
+                groups.setdefault(venue.strip().casefold(), []).append(index[team_id])
+        self.group_of = [None] * self.n
+        self.groups = [members for members in groups.values() if len(members) > 1]
+        for gid, members in enumerate(self.groups):
+            for t in members:
+                self.group_of[t] = gid
+        # veces que se juega cada posición con la localía normal / invertida
+        self.occurrences = [
+            (sum(1 for idx in range(p, self.J, self.R) if not (idx // self.R) % 2),
+             sum(1 for idx in range(p, self.J, self.R) if (idx // self.R) % 2))
+            for p in range(self.R)
+        ]
+        # con todas las vueltas completas cada ronda se juega igual, sea cual sea el orden
+        self._full_occurrences = ((self.legs + 1) // 2, self.legs // 2) if self.J % max(self.R, 1) == 0 else None
+
+        # jornadas (índices) en las que cada equipo no puede jugar
+        date_index = {}
+        for idx, d in enumerate(self.dates):
+            date_index.setdefault(d[:10], []).append(idx)
+        self.blocked = [[] for _ in range(self.n)]
+        for team_id, days in (blackouts or {}).items():
+            if team_id in index:
+                self.blocked[index[team_id]] = sorted(
+                    idx for day in set(map(str, days)) for idx in date_index.get(day[:10], ())
+                )
+        # equipos que conviene mover entre huecos (los demás son intercambiables)
+        self.constrained = [t for t in range(self.n) if self.group_of[t] is not None or self.blocked[t]]
+
+        # descansos: solo varían con número impar de equipos (cada jornada descansa uno)
+        self.rest_matters = self.n % 2 == 1 and self.J > 2 and self.R > 2
+        if self.rest_matters:
+            days = [Date.fromisoformat(d[:10]).toordinal() for d in self.dates]
+            limit = statistics.median(b - a for a, b in zip(days, days[1:]))
+            short = [1 if b - a < limit else 0 for a, b in zip(days, days[1:])]
+            # descansos cortos si se jugaran todas las jornadas, y los que se
+            # ahorra (o gana) quien descansa en la jornada idx
+            self.short_rests = sum(short)
+            self.bye_adjust = [
+                (short[idx - 1] if idx > 0 else 0) + (short[idx] if idx < self.J - 1 else 0)
+                - (1 if 0 < idx < self.J - 1 and days[idx + 1] - days[idx - 1] < limit else 0)
+                for idx in range(self.J)
+            ]
+            self.bye_round = [next(k for k in range(self.R) if self.side[s][k] == 0) for s in range(self.n)]
+            # el total de la liga no depende del calendario: a cada equipo le
+            # corresponde la media, redondeada hacia abajo o hacia arriba
+            total = self.n * self.short_rests - sum(self.bye_adjust)
+            self.rest_share = (total // self.n, -(-total // self.n))
+
+        self.partner = self._match_partners()
+        self.cost = self.total_cost()
+
+    def _match_partners(self):
+        """Empareja huecos complementarios; partner[s] es None si s no tiene pareja."""
+        candidates = {
+            s: [
+                t for t in range(self.n)
+                if t != s and all(a == -b or not a or not b for a, b in zip(self.side[s], self.side[t]))
+            ]
+            for s in range(self.n)
+        }
+        partner = [None] * self.n
+        for s in sorted(range(self.n), key=lambda s: len(candidates[s])):
+            if partner[s] is None:
+                t = next((t for t in candidates[s] if partner[t] is None), None)
+                if t is not None:
+                    partner[s], partner[t] = t, s
+        return partner
+
+    def seed_venues(self):
+        """Coloca a los equipos de cada sede compartida en parejas de huecos complementarios."""
+        free_pairs = [(s, self.partner[s]) for s in range(self.n) if self.partner[s] is not None and s < self.partner[s]]
+        team_at = [None] * self.n
+        for members in sorted(self.groups, key=len, reverse=True):
+            for a, b in zip(members[0::2], members[1::2]):
+                if not free_pairs:
+                    break
+                s1, s2 = free_pairs.pop(0)
+                team_at[s1], team_at[s2] = a, b
+        placed = set(t for t in team_at if t is not None)
+        rest = iter(t for t in range(self.n) if t not in placed)
+        self.team_at = [t if t is not None else next(rest) for t in team_at]
+        for slot, t in enumerate(self.team_at):
+            self._slot_of[t] = slot
+        self.cost = self.total_cost()
+
+    # --------- Componentes del coste ---------
+
+    def _round_at(self, idx):
+        return self.order[idx // self.R][idx % self.R]
+
+    def _indices(self, k):
+        """Jornadas (índices) en que se juega la ronda k."""
+        return [leg * self.R + self.pos[leg][k] for leg in range(self.legs) if leg * self.R + self.pos[leg][k] < self.J]
+
+    def _sign(self, s, idx):
+        v = self.side[s][self._round_at(idx)]
+        return -v if (idx // self.R) % 2 else v
+
+    def _occurrences(self, k):
+        """Veces que se juega la ronda k con la localía normal / invertida."""
+        if self._full_occurrences is not None:
+            return self._full_occurrences
+        normal = flipped = 0
+        for idx in self._indices(k):
+            if (idx // self.R) % 2:
+                flipped += 1
+            else:
+                normal += 1
+        return normal, flipped
+
+    def _is_break(self, s, idx):
+        """Rotura del hueco s entre las jornadas idx e idx+1."""
+        if idx < 0 or idx + 1 >= self.J:
+            return 0
+        v = self._sign(s, idx)
+        return 1 if v != 0 and v == self._sign(s, idx + 1) else 0
+
+    def _group_clashes(self, g, k):
+        """Locales de más del grupo de sede g en las jornadas de la ronda k."""
+        homes = aways = 0
+        for t in self.groups[g]:
+            v = self.side[self._slot_of[t]][k]
+            if v > 0:
+                homes += 1
+            elif v < 0:
+                aways += 1
+        normal, flipped = self._occurrences(k)
+        # en las vueltas invertidas juegan en casa los visitantes de la primera
+        return normal * max(0, homes - 1) + flipped * max(0, aways - 1)
+
+    def slot_of(self, t):
+        return self._slot_of[t]
+
+    def _team_blackouts(self, t):
+        s = self.slot_of(t)
+        return sum(1 for idx in self.blocked[t] if self.side[s][self._round_at(idx)] != 0)
+
+    def breaks(self):
+        return sum(self._is_break(s, idx) for s in range(self.n) for idx in range(self.J - 1))
+
+    def venue_cost(self, groups=None, rounds=None):
+        groups = range(len(self.groups)) if groups is None else groups
+        rounds = range(self.R) if rounds is None else rounds
+        return sum(self._group_clashes(g, k) for g in groups for k in rounds)
+
+    def blackout_total(self):
+        return sum(self._team_blackouts(t) for t in self.constrained)
+
+    def rest_counts(self):
+        """Descansos cortos de cada hueco."""
+        return [
+            self.short_rests - sum(self.bye_adjust[idx] for idx in self._indices(self.bye_round[s]))
+            for s in range(self.n)
+        ]
+
+    def rest_spread(self):
+        """Descansos cortos del equipo que más tiene menos los del que menos."""
+        if not self.rest_matters:
+            return 0
+        counts = self.rest_counts()
+        return max(counts) - min(counts)
+
+    def rest_excess(self):
+        """
+        Descansos cortos fuera del reparto justo (la media redondeada), sumados
+        por equipo. Es 0 cuando rest_spread es el mínimo posible; a diferencia
+        de este, baja con cada equipo que se corrige y no solo con el último.
+        """
+        if not self.rest_matters:
+            return 0
+        low, high = self.rest_share
+        return sum(max(0, c - high) + max(0, low - c) for c in self.rest_counts())
+
+    def _constraint_cost(self):
+        return (
+            WEIGHT_VENUE * self.venue_cost()
+            + WEIGHT_BLACKOUT * self.blackout_total()
+            + WEIGHT_REST * self.rest_excess()
+        )
+
+    def unavoidable_blackouts(self):
+        """Conflictos de fecha que ningún calendario evita: cada equipo descansa como mucho una vez por vuelta."""
+        rests_per_leg = 1 if self.n % 2 else 0
+        total = 0
+        for t in self.constrained:
+            per_leg = {}
+            for idx in self.blocked[t]:
+                per_leg[idx // self.R] = per_leg.get(idx // self.R, 0) + 1
+            total += sum(max(0, c - rests_per_leg) for c in per_leg.values())
+        return total
+
+    def unavoidable_clashes(self):
+        """
+        Choques de sede que ningún calendario evita: en una ronda que se juega
+        normal e invertida, un grupo de m equipos suma h y m-h locales, así que
+        choca al menos m-2 veces (con dos equipos basta un patrón complementario).
+        Con número impar de equipos se descuenta la ronda en que descansa cada uno.
+        """
+        mirrored = [min(normal, flipped) for normal, flipped in self.occurrences]
+        resting = max(mirrored, default=0) if self.n % 2 else 0
+        return sum(max(0, (len(members) - 2) * sum(mirrored) - len(members) * resting) for members in self.groups)
+
+    def total_cost(self):
+        return WEIGHT_BREAK * self.breaks() + self._constraint_cost()
+
+    # --------- Movimientos (aplican el cambio y devuelven la diferencia de coste) ---------
+
+    def _local_breaks(self, slots, indices):
+        edges = set()
+        for idx in indices:
+            edges.add(idx - 1)
+            edges.add(idx)
+        return sum(self._is_break(s, idx) for s in slots for idx in edges)
+
+    def repeats_opponent(self, leg):
+        """La vuelta `leg` empieza o acaba con la misma ronda que la contigua."""
+        return any(
+            0 < b < self.legs and b * self.R < self.J and self.order[b - 1][self.R - 1] == self.order[b][0]
+            for b in (leg, leg + 1)
+        )
+
+    def swap_teams(self, s1, s2):
+        """Intercambia los equipos de los huecos s1 y s2 (las roturas no cambian)."""
+        t1, t2 = self.team_at[s1], self.team_at[s2]
+        groups = {g for g in (self.group_of[t1], self.group_of[t2]) if g is not None}
+
+        def local():
+            return (
+                WEIGHT_VENUE * self.venue_cost(groups)
+                + WEIGHT_BLACKOUT * (self._team_blackouts(t1) + self._team_blackouts(t2))
+            )
+
+        before = local()
+        self.team_at[s1], self.team_at[s2] = t2, t1
+        self._slot_of[t1], self._slot_of[t2] = s2, s1
+        delta = local() - before
+        self.cost += delta
+        return delta
+
+    def swap_rounds(self, leg, p, q):
+        """Intercambia las rondas de las posiciones p y q de la vuelta `leg`."""
+        order, pos = self.order[leg], self.pos[leg]
+        k, l = order[p], order[q]
+        indices = (leg * self.R + p, leg * self.R + q)
+
+        def local():
+            return (
+                WEIGHT_BREAK * self._local_breaks(range(self.n), indices)
+                + WEIGHT_VENUE * self.venue_cost(rounds=(k, l))
+                + WEIGHT_BLACKOUT * self.blackout_total()
+                + WEIGHT_REST * self.rest_excess()
+            )
+
+        before = local()
+        order[p], order[q] = l, k
+        pos[k], pos[l] = q, p
+        delta = local() - before
+        self.cost += delta
+        return delta
+
+    def rotate_leg(self, leg, shift):
+        """
+        Rota el orden de la vuelta `leg` `shift` posiciones: las rondas siguen
+        en el mismo orden relativo (casi las mismas roturas), pero cambia en qué
+        jornada de la vuelta descansa cada equipo.
+        """
+        order = self.order[leg]
+        order[:] = order[shift:] + order[:shift]
+        for p, k in enumerate(order):
+            self.pos[leg][k] = p
+        delta = self.total_cost() - self.cost
+        self.cost += delta
+        return delta
+
+    def flip(self, k, j):
+        """Invierte la localía del partido j de la ronda k."""
+        h, a = self.rounds[k][j]
+        groups = {g for g in (self.group_of[self.team_at[h]], self.group_of[self.team_at[a]]) if g is not None}
+
+        def local():
+            return (
+                WEIGHT_BREAK * self._local_breaks((h, a), self._indices(k))
+                + WEIGHT_VENUE * self.venue_cost(groups, (k,))
+            )
+
+        before = local()
+        self.rounds[k][j] = [a, h]
+        self.side[h][k], self.side[a][k] = -1, 1
+        delta = local() - before
+        self.cost += delta
+        return delta
+
+    # --------- Búsqueda ---------
+
+    def _state(self):
+        return [[list(m) for m in pairs] for pairs in self.rounds], [list(o) for o in self.order], list(self.team_at)
+
+    def _restore(self, state):
+        rounds, order, team_at = state
+        self.rounds = [[list(m) for m in pairs] for pairs in rounds]
+        self.order = [list(o) for o in order]
+        self.team_at = list(team_at)
+        for s, t in enumerate(self.team_at):
+            self._slot_of[t] = s
+        for leg, leg_order in enumerate(self.order):
+            for p, k in enumerate(leg_order):
+                self.pos[leg][k] = p
+        for k, pairs in enumerate(self.rounds):
+            for h, a in pairs:
+                self.side[h][k] = 1
+                self.side[a][k] = -1
+        self.cost = self.total_cost()
+
+    def _reached(self, target):
+        breaks, clashes, blackouts, rest = target
+        return (
+            self.breaks() <= breaks
+            and self.venue_cost() <= clashes
+            and self.blackout_total() <= blackouts
+            and self.rest_excess() <= rest
+        )
+
+    def rest_target(self):
+        """rest_excess al que se puede aspirar: 0, salvo con una sola vuelta (no cambia)."""
+        return 0 if self.legs > 1 else self.rest_excess()
+
+    def optimize(self, time_limit: float, seed: int = 0, target=(0, 0, 0, 0)) -> int:
+        """
+        Recocido simulado durante `time_limit` segundos o hasta que el mejor
+        estado no pase de `target` (roturas, choques de sede, conflictos de
+        fecha, descansos cortos fuera del reparto justo); lo deja aplicado y
+        devuelve las iteraciones.
+        """
+        if self.R < 1 or self.n < 3:
+            return 0
+        rng = random.Random(seed)
+        best_cost, best = self.cost, self._state()
+        done = self._reached(target)
+        started = time.perf_counter()
+        iterations = 0
+        temperature = START_TEMPERATURE
+        while not done:
+            if iterations % 128 == 0:
+                elapsed = time.perf_counter() - started
+                if elapsed >= time_limit:
+                    break
+                # enfriamiento geométrico según el tiempo consumido
+                temperature = START_TEMPERATURE * (END_TEMPERATURE / START_TEMPERATURE) ** (elapsed / time_limit)
+            iterations += 1
+            move = rng.random()
+            if self.constrained and move < 0.5:
+                t = rng.choice(self.constrained)
+                s1 = self.slot_of(t)
+                if self.blocked[t] and self.n % 2 and move < 0.25:
+                    # hacia el hueco que descansa en una de sus fechas bloqueadas
+                    k = self._round_at(rng.choice(self.blocked[t]))
+                    s2 = next(s for s in range(self.n) if self.side[s][k] == 0)
+                else:
+                    s2 = rng.randrange(self.n)
+                p1, p2 = self.partner[s1], self.partner[s2]
+                if s1 == s2 or s2 == p1:
+                    continue
+                if self.group_of[t] is not None and p1 is not None and p2 is not None:
+                    # la pareja entera, para no romper los patrones complementarios
+                    undo = lambda: self.swap_teams(s1, s2) + self.swap_teams(p1, p2)  # noqa: E731
+                    delta = self.swap_teams(s1, s2) + self.swap_teams(p1, p2)
+                else:
+                    undo = lambda: self.swap_teams(s1, s2)  # noqa: E731
+                    delta = self.swap_teams(s1, s2)
+            elif self.rest_matters and self.legs > 1 and move < 0.55:
+                leg = rng.randrange(self.legs)
+                shift = rng.randrange(1, self.R)
+                undo = lambda: self.rotate_leg(leg, self.R - shift)  # noqa: E731
+                delta = self.rotate_leg(leg, shift)
+                if self.repeats_opponent(leg):
+                    undo()
+                    continue
+            elif self.R > 1 and move < 0.75:
+                leg = rng.randrange(self.legs)
+                p, q = rng.sample(range(self.R), 2)
+                if self.rest_matters and self.legs > 1 and move < 0.6:
+                    # en una vuelta, que uno con descansos cortos de más descanse cuando uno con de menos
+                    counts = self.rest_counts()
+                    low, high = self.rest_share
+                    over = [s for s, c in enumerate(counts) if c > high]
+                    under = [s for s, c in enumerate(counts) if c < low]
+                    if over or under:
+                        a = rng.choice(over) if over else counts.index(max(counts))
+                        b = rng.choice(under) if under else counts.index(min(counts))
+                        p, q = self.pos[leg][self.bye_round[a]], self.pos[leg][self.bye_round[b]]
+                        if p == q:
+                            continue
+                undo = lambda: self.swap_rounds(leg, p, q)  # noqa: E731
+                delta = self.swap_rounds(leg, p, q)
+                if self.repeats_opponent(leg):
+                    undo()
+                    continue
+            else:
+                k = rng.randrange(self.R)
+                j = rng.randrange(len(self.rounds[k]))
+                undo = lambda: self.flip(k, j)  # noqa: E731
+                delta = self.flip(k, j)
+            if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+                undo()
+            elif self.cost < best_cost:
+                best_cost, best = self.cost, self._state()
+                done = self._reached(target)
+        self._restore(best)
+        return iterations
+
+    # --------- Resultado ---------
+
+    def fixtures(self, kickoff: str):
+        fixtures = []
+        for idx in range(self.J):
+            flipped = (idx // self.R) % 2
+            for h, a in self.rounds[self._round_at(idx)]:
+                if flipped:
+                    h, a = a, h
+                fixtures.append((
+                    self.jornada_ids[idx],
+                    self.team_ids[self.team_at[h]],
+                    self.team_ids[self.team_at[a]],
+                    f"{self.dates[idx]} {kickoff}",
+                ))
+        return fixtures
+
+    def quality(self) -> dict:
+        """Métricas del calendario; `penalty` resume las que resta la puntuación (ver score)."""
+        breaks = self.breaks()
+        venue = self.venue_cost()
+        venue_unavoidable = min(venue, self.unavoidable_clashes())
+        blackout = self.blackout_total()
+        unavoidable = self.unavoidable_blackouts()
+        rest = self.rest_spread()
+        avoidable = venue - venue_unavoidable + blackout - unavoidable + self.rest_excess()
+        return {
+            "breaks": breaks,
+            "venue_clashes": venue,
+            "venue_unavoidable": venue_unavoidable,
+            "blackout_conflicts": blackout,
+            "blackout_unavoidable": unavoidable,
+            "short_rest_spread": rest,
+            "penalty": breaks + SCORE_CONFLICT_PENALTY * avoidable,
+        }
+
+
+def score(quality: dict, baseline: dict) -> int:
+    """
+    Puntuación de 0 a 100 frente al calendario sin optimizar (`baseline`):
+    la parte de su penalización (roturas, más SCORE_CONFLICT_PENALTY por cada
+    conflicto evitable o descanso corto de más) que se ha eliminado.
+    """
+    if not baseline["penalty"]:
+        return 100 if not quality["penalty"] else 0
+    return max(0, min(100, round(100 * (1 - quality["penalty"] / baseline["penalty"]))))
+
+
+def optimize_fixtures(
+    team_ids,
+    jornadas,
+    legs=None,
+    venues=None,
+    blackouts=None,
+    kickoff="22:30:00",
+    time_limit: float = 2.0,
+    seed: int = 0,
+):
+    """
+    Como utils.build_fixtures pero optimizado. `venues` es {team_id: sede} y
+    `blackouts` {team_id: fechas 'YYYY-MM-DD'}. Devuelve (fixtures, calidad);
+    `calidad["baseline"]` es la del calendario de build_fixtures, con el que se
+    compara la puntuación.
+    """
+    if len(team_ids) < 2:
+        raise ValueError("Se necesitan al menos dos equipos activos")
+    plain = round_robin_pairings(team_ids)
+    jornadas = select_fixture_jornadas(len(plain), jornadas, legs)
+    optimizer = FixtureOptimizer(team_ids, jornadas, round_robin_pairings(team_ids, balanced=True), venues, blackouts)
+    optimizer.seed_venues()
+    baseline = FixtureOptimizer(team_ids, jornadas, plain, venues, blackouts).quality()
+    baseline["score"] = score(baseline, baseline)
+    started = time.perf_counter()
+    # suficiente: roturas del patrón canónico, solo los conflictos inevitables y
+    # descansos tan parejos como permite el total
+    target = (
+        optimizer.breaks(), optimizer.unavoidable_clashes(), optimizer.unavoidable_blackouts(), optimizer.rest_target(),
+    )
+    iterations = optimizer.optimize(time_limit, seed, target)
+    quality = optimizer.quality()
+    quality.update(
+        score=score(quality, baseline), baseline=baseline,
+        iterations=iterations, seconds=round(time.perf_counter() - started, 3),
+    )
+    fixtures = optimizer.fixtures(kickoff)
+    validate_fixtures(fixtures)
+    return fixtures, quality
@@ -0,0 +1,202 @@
+"""Simulación Monte Carlo del resto de la temporada.
+
+Parte de la clasificación actual (compute_standings) y de los partidos
+`scheduled` entre equipos activos, y juega cada uno miles de veces con las reglas
+de la liga: 3 puntos al ganador (2 si ganó con un solo jugador), 1 al perdedor y
+NO_SHOW_WIN_POINTS por incomparecencia (0 al ausente). La probabilidad de
+victoria sale de log5 sobre el porcentaje de victorias de cada equipo (con
+suavizado de Laplace); la tasa de incomparecencias, la de victorias con un
+jugador y los marcadores (para los desempates por DG y GF) se muestrean del
+histórico de la liga.
+
+Cada lote es un cálculo vectorizado con NumPy (una fila por temporada simulada)
+y los lotes se reparten entre procesos con un ProcessPoolExecutor persistente.
+El resultado es, por equipo, la probabilidad de acabar en cada posición.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils import compute_standings
+
+CHUNK_RUNS = 5000  # temporadas simuladas por lote (acota la memoria: lote x partidos)
+DEFAULT_MARGIN = (6, 3)  # marcador (ganador, perdedor) si aún no hay histórico
+
+_executor = None
+_executor_key = None
+_executor_lock = threading.Lock()
+
+
+def load_inputs(conn, no_show_win_points: int) -> dict:
+    """Clasificación actual, partidos pendientes e histórico, en arrays de NumPy."""
+    table = compute_standings(conn, no_show_win_points)
+    index = {row["team_id"]: i for i, row in enumerate(table)}
+    rows = conn.execute(
+        """
+        SELECT home_team_id, away_team_id, status, home_score, away_score,
+               winner_one_player, no_show_team_id
+        FROM matches
+        """
+    ).fetchall()
+
+    pending = []
+    margins = []
+    completed = no_shows = decided = one_player = 0
+    for m in rows:
+        if m["status"] == "scheduled":
+            if m["home_team_id"] in index and m["away_team_id"] in index:
+                pending.append((index[m["home_team_id"]], index[m["away_team_id"]]))
+            continue
+        if m["status"] != "completed":
+            continue
+        completed += 1
+        if m["no_show_team_id"]:
+            no_shows += 1
+        elif m["home_score"] is not None and m["away_score"] is not None and m["home_score"] != m["away_score"]:
+            decided += 1
+            one_player += bool(m["winner_one_player"])
+            margins.append((max(m["home_score"], m["away_score"]), min(m["home_score"], m["away_score"])))
+
+    wins = np.array([row["wins"] for row in table], dtype=np.float64)
+    played = np.array([row["played"] for row in table], dtype=np.float64)
+    strength = (wins + 1) / (played + 2)
+    home = np.array([h for h, _ in pending], dtype=np.intp)
+    away = np.array([a for _, a in pending], dtype=np.intp)
+    sh, sa = strength[home], strength[away]
+    names = [row["team_name"] for row in table]
+    return {
+        "team_ids": [row["team_id"] for row in table],
+        "names": names,
+        "name_rank": np.argsort(np.argsort(names, kind="stable")),
+        "points": np.array([row["points"] for row in table], dtype=np.float64),
+        "gf": np.array([row["gf"] for row in table], dtype=np.float64),
+        "ga": np.array([row["ga"] for row in table], dtype=np.float64),
+        "home": home,
+        "away": away,
+        # log5: P(local gana) = a(1-b) / (a(1-b) + b(1-a))
+        "p_home": sh * (1 - sa) / (sh * (1 - sa) + sa * (1 - sh)),
+        "no_show_rate": no_shows / completed if completed else 0.0,
+        "one_player_rate": one_player / decided if decided else 0.0,
+        "margins": np.array(margins or [DEFAULT_MARGIN], dtype=np.float64),
+        "no_show_win_points": no_show_win_points,
+    }
+
+
+def simulate_chunk(inputs: dict, runs: int, seed) -> tuple:
+    """
+    Simula `runs` temporadas. Devuelve (counts, points_sum): counts[equipo, pos]
+    es el número de simulaciones en que el equipo acabó en esa posición.
+    """
+    rng = np.random.default_rng(seed)
+    teams = len(inputs["points"])
+    home, away = inputs["home"], inputs["away"]
+    n_matches = len(home)
+    # sumas por equipo con productos matriciales: lo del local entra con +1 en
+    # `diff` y lo del visitante se obtiene como total del partido menos lo del local
+    away_onehot = np.zeros((n_matches, teams), dtype=np.float32)
+    away_onehot[np.arange(n_matches), away] = 1
+    diff = -away_onehot
+    diff[np.arange(n_matches), home] += 1
+
+    shape = (runs, n_matches)
+    # un uniforme decide incomparecencia / victoria con un jugador / normal y otro el ganador
+    no_show_rate, one_player_rate = inputs["no_show_rate"], inputs["one_player_rate"]
+    kind = rng.random(shape, dtype=np.float32)
+    no_show = kind < no_show_rate
+    one_player = ~no_show & (kind < no_show_rate + (1 - no_show_rate) * one_player_rate)
+    # en una incomparecencia gana el que se presenta, cualquiera de los dos
+    p_home = np.where(no_show, np.float32(0.5), inputs["p_home"].astype(np.float32))
+    home_wins = rng.random(shape, dtype=np.float32) < p_home
+
+    win_points = np.where(no_show, np.float32(inputs["no_show_win_points"]), np.float32(3) - one_player)
+    lose_points = (~no_show).astype(np.float32)
+    home_points = np.where(home_wins, win_points, lose_points)
+    points = inputs["points"] + home_points @ diff + (win_points + lose_points) @ away_onehot
+
+    # marcador muestreado del histórico; la última fila (0, 0) es la incomparecencia
+    margins = np.vstack([inputs["margins"], [(0, 0)]]).astype(np.float32)
+    pick = np.where(no_show, len(margins) - 1, rng.integers(len(margins) - 1, size=shape))
+    home_legs = np.where(home_wins, margins[:, 0].take(pick), margins[:, 1].take(pick))
+    total_legs = margins.sum(axis=1).take(pick)
+    gf = inputs["gf"] + home_legs @ diff + total_legs @ away_onehot
+    gd = (inputs["gf"] - inputs["ga"]) + (2 * home_legs - total_legs) @ diff
+
+    # mismo orden que compute_standings: puntos, DG, GF (desc.) y nombre
+    name_rank = np.broadcast_to(inputs["name_rank"], points.shape)
+    order = np.lexsort((name_rank, -gf, -gd, -points), axis=1)  # order[sim, pos] = equipo
+    cells = order.ravel() * teams + np.tile(np.arange(teams), runs)
+    counts = np.bincount(cells, minlength=teams * teams).reshape(teams, teams)
+    return counts, points.sum(axis=0, dtype=np.float64)
+
+
+def _get_executor(workers: int):
+    """Pool de procesos persistente (uno por proceso de la app, recreado tras un fork)."""
+    global _executor, _executor_key
+    key = (os.getpid(), workers)
+    with _executor_lock:
+        if _executor is None or _executor_key != key:
+            # spawn: los procesos hijos no heredan hilos ni conexiones SQLite del padre
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_key = key
+        return _executor
+
+
+def simulate(inputs: dict, runs: int, workers: int = 0, seed=None) -> tuple:
+    """Reparte `runs` simulaciones en lotes; en paralelo si hay más de un lote y de un núcleo."""
+    teams = len(inputs["points"])
+    if len(inputs["home"]) == 0:
+        runs = 1  # sin partidos pendientes el resultado es determinista
+    workers = workers or os.cpu_count() or 1
+    sizes = [CHUNK_RUNS] * (runs // CHUNK_RUNS)
+    if runs % CHUNK_RUNS:
+        sizes.append(runs % CHUNK_RUNS)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers > 1 and len(sizes) > 1:
+        executor = _get_executor(min(workers, len(sizes)))
+        results = executor.map(simulate_chunk, [inputs] * len(sizes), sizes, seeds)
+    else:
+        results = map(simulate_chunk, [inputs] * len(sizes), sizes, seeds)
+
+    counts = np.zeros((teams, teams), dtype=np.int64)
+    points_sum = np.zeros(teams)
+    for chunk_counts, chunk_points in results:
+        counts += chunk_counts
+        points_sum += chunk_points
+    return counts, points_sum, runs
+
+
+def season_probabilities(conn, no_show_win_points: int, runs: int, workers: int = 0,
+                         relegation_spots: int = 0, seed=None) -> dict:
+    """
+    Probabilidades de posición final por equipo, en el orden de la clasificación
+    actual. `seed` fija los números aleatorios (la app usa la versión de datos, de
+    modo que todos los workers muestran el mismo resultado).
+    """
+    inputs = load_inputs(conn, no_show_win_points)
+    teams = len(inputs["team_ids"])
+    if not teams:
+        return {"runs": 0, "pending": 0, "teams": []}
+    counts, points_sum, runs = simulate(inputs, runs, workers, seed)
+    probs = counts / runs
+    relegation = probs[:, teams - relegation_spots:].sum(axis=1) if relegation_spots else np.zeros(teams)
+    return {
+        "runs": runs,
+        "pending": len(inputs["home"]),
+        "teams": [
+            {
+                "team_id": team_id,
+                "team_name": inputs["names"][i],
+                "points": int(inputs["points"][i]),
+                "expected_points": float(points_sum[i] / runs),
+                "positions": probs[i].tolist(),
+                "title": float(probs[i, 0]),
+                "relegation": float(relegation[i]),
+            }
+            for i, team_id in enumerate(inputs["team_ids"])
+        ],
+    }
@@ -4,8 +4,24 @@ const DATE_FORMAT = new Intl.DateTimeFormat('es-ES', {
   year: 'numeric'
 });
 
+let manifestPromise = null;
+
+// manifest.json lleva el SHA-256 de cada fichero: se pide siempre revalidando y
+// los datos se piden con ?v=<hash>, así la caché solo se invalida si cambian.
+function loadManifest() {
+  if (!manifestPromise) {
+    manifestPromise = fetch('data/manifest.json', { cache: 'no-cache' })
+      .then((response) => (response.ok ? response.json() : { files: {} }))
+      .catch(() => ({ files: {} }));
+  }
+  return manifestPromise;
+}
+
 async function fetchJSON(path) {
-  const response = await fetch(path);
+  const manifest = await loadManifest();
+  const entry = (manifest.files || {})[path.split('/').pop()];
+  const url = entry ? `${path}?v=${entry.sha256.slice(0, 16)}` : path;
+  const response = await fetch(url);
   if (!response.ok) {
     throw new Error(`No se pudo cargar ${path}: ${response.status}`);
   }
@@ -23,6 +39,8 @@ function formatDate(dateString) {
 
 function renderStandings(tableElement, data) {
   const tbody = tableElement.querySelector('tbody');
+  // las tablas con data-ratings muestran además el Elo y la forma
+  const withRatings = 'ratings' in tableElement.dataset;
   tbody.innerHTML = '';
   data.forEach((row) => {
     const tr = document.createElement('tr');
@@ -36,11 +54,34 @@ function renderStandings(tableElement, data) {
       <td>${row.ga}</td>
       <td>${row.gd >= 0 ? '+' : ''}${row.gd}</td>
       <td><strong>${row.points}</strong></td>
+      ${withRatings ? `<td>${row.rating ?? ''}</td><td>${row.form ?? ''}</td>` : ''}
     `;
     tbody.appendChild(tr);
   });
 }
 
+function matchItem(match) {
+  const wrapper = document.createElement('div');
+  wrapper.className = 'flex';
+  wrapper.style.justifyContent = 'space-between';
+  if (match.id != null) {
+    wrapper.dataset.matchId = match.id;
+  }
+  return wrapper;
+}
+
+function upcomingItem(match) {
+  const wrapper = matchItem(match);
+  wrapper.innerHTML = `
+    <div>
+      <span class="badge">Jornada ${match.jornada_id}</span>
+      <strong>${match.home_name}</strong> vs <strong>${match.away_name}</strong>
+    </div>
+    <div class="small">${formatDate(match.date)}</div>
+  `;
+  return wrapper;
+}
+
 function renderUpcoming(container, data) {
   container.innerHTML = '';
   if (!data.length) {
@@ -48,22 +89,35 @@ function renderUpcoming(container, data) {
     return;
   }
   data.forEach((match) => {
-    const wrapper = document.createElement('div');
-    wrapper.className = 'flex';
-    wrapper.style.justifyContent = 'space-between';
-    wrapper.innerHTML = `
-      <div>
-        <span class="badge">Jornada ${match.jornada_id}</span>
-        <strong>${match.home_name}</strong> vs <strong>${match.away_name}</strong>
-      </div>
-      <div class="small">${formatDate(match.date)}</div>
-    `;
-    container.appendChild(wrapper);
+    container.appendChild(upcomingItem(match));
     container.appendChild(document.createElement('hr'));
   });
   container.lastChild?.remove();
 }
 
+function recentItem(match) {
+  const wrapper = matchItem(match);
+  const score = match.status === 'completed' && !match.no_show_team_id
+    ? `${match.home_score} - ${match.away_score}`
+    : 'vs';
+  const badges = [];
+  if (match.no_show_team_id) {
+    badges.push('<span class="small">(incomparecencia)</span>');
+  }
+  if (match.winner_one_player) {
+    badges.push('<span class="small">(victoria con 1 jugador)</span>');
+  }
+  wrapper.innerHTML = `
+    <div>
+      <span class="badge">Jornada ${match.jornada_id}</span>
+      <strong>${match.home_name}</strong> ${score} <strong>${match.away_name}</strong>
+      ${badges.join(' ')}
+    </div>
+    <div class="small">${formatDate(match.date)}</div>
+  `;
+  return wrapper;
+}
+
 function renderRecent(container, data) {
   container.innerHTML = '';
   if (!data.length) {
@@ -71,28 +125,7 @@ function renderRecent(container, data) {
     return;
   }
   data.forEach((match) => {
-    const wrapper = document.createElement('div');
-    wrapper.className = 'flex';
-    wrapper.style.justifyContent = 'space-between';
-    const score = match.status === 'completed' && !match.no_show_team_id
-      ? `${match.home_score} - ${match.away_score}`
-      : 'vs';
-    const badges = [];
-    if (match.no_show_team_id) {
-      badges.push('<span class="small">(incomparecencia)</span>');
-    }
-    if (match.winner_one_player) {
-      badges.push('<span class="small">(victoria con 1 jugador)</span>');
-    }
-    wrapper.innerHTML = `
-      <div>
-        <span class="badge">Jornada ${match.jornada_id}</span>
-        <strong>${match.home_name}</strong> ${score} <strong>${match.away_name}</strong>
-        ${badges.join(' ')}
-      </div>
-      <div class="small">${formatDate(match.date)}</div>
-    `;
-    container.appendChild(wrapper);
+    container.appendChild(recentItem(match));
     container.appendChild(document.createElement('hr'));
   });
   container.lastChild?.remove();
@@ -250,3 +283,146 @@ window.renderStandaloneMessage = function renderStandaloneMessage() {
     </div>
   `;
 };
+
+// Páginas pre-renderizadas (export_public_data.py --html): llegan ya rellenas y
+// solo se repintan si los JSON publicados son más recientes que su HTML.
+const STATIC_PAGE_RENDERERS = {
+  landing: () => window.renderLandingPage(),
+  standings: () => window.renderStandingsPage()
+};
+
+window.refreshStaticPage = async function refreshStaticPage() {
+  const { staticPage, sources } = document.body.dataset;
+  const render = STATIC_PAGE_RENDERERS[staticPage];
+  if (!render || !sources) return;
+  const manifest = await loadManifest();
+  const files = manifest.files || {};
+  const stale = Object.entries(JSON.parse(sources))
+    .some(([file, sha256]) => files[file] && files[file].sha256 !== sha256);
+  if (stale) {
+    render();
+  }
+};
+
+if (document.body && document.body.dataset.staticPage) {
+  window.refreshStaticPage();
+}
+
+// --------- Actualizaciones en vivo (/events, app Flask) ---------
+
+const RECENT_LIMIT = 10;
+
+function formatForm(row) {
+  if (!row.form) return '';
+  const streak = Math.abs(row.streak) > 1 ? ` (${row.streak > 0 ? '+' : ''}${row.streak})` : '';
+  return `${row.form}${streak}`;
+}
+
+// Actualiza (o añade) las filas recibidas y reordena por posición. Las columnas
+// se identifican por data-field en la cabecera: sirve para la tabla reducida de
+// la portada y para la completa de /standings.
+function patchStandings(table, rows, full = false) {
+  const fields = [...table.querySelectorAll('thead th')].map((th) => th.dataset.field);
+  const tbody = table.querySelector('tbody');
+  rows.forEach((row) => {
+    let tr = tbody.querySelector(`tr[data-team-id="${row.team_id}"]`);
+    if (!tr) {
+      tr = document.createElement('tr');
+      tr.dataset.teamId = row.team_id;
+      fields.forEach(() => tr.appendChild(document.createElement('td')));
+      tbody.appendChild(tr);
+    }
+    fields.forEach((field, i) => {
+      const cell = tr.cells[i];
+      if (!field || !cell) return;
+      if (field === 'points') {
+        cell.innerHTML = '<strong></strong>';
+        cell.firstChild.textContent = row.points;
+      } else if (field === 'form') {
+        cell.textContent = formatForm(row);
+      } else {
+        cell.textContent = row[field] ?? '';
+      }
+    });
+  });
+  if (full) {
+    const teams = new Set(rows.map((row) => String(row.team_id)));
+    [...tbody.rows].filter((tr) => !teams.has(tr.dataset.teamId)).forEach((tr) => tr.remove());
+  }
+  const posIndex = fields.indexOf('pos');
+  [...tbody.rows]
+    .sort((a, b) => Number(a.cells[posIndex].textContent) - Number(b.cells[posIndex].textContent))
+    .forEach((tr) => tbody.appendChild(tr));
+}
+
+function removeMatchItem(container, matchId) {
+  const item = container.querySelector(`[data-match-id="${matchId}"]`);
+  if (!item) return;
+  const separator = item.nextElementSibling?.tagName === 'HR'
+    ? item.nextElementSibling
+    : item.previousElementSibling?.tagName === 'HR' ? item.previousElementSibling : null;
+  separator?.remove();
+  item.remove();
+}
+
+function patchMatchLists(matches) {
+  const upcoming = document.querySelector('#upcoming');
+  const recent = document.querySelector('#recent');
+  matches.forEach((match) => {
+    [upcoming, recent].forEach((container) => container && removeMatchItem(container, match.id));
+    if (!recent || match.deleted || match.status !== 'completed') return;
+    // quitar el aviso de lista vacía y añadir el resultado arriba
+    [...recent.children].filter((el) => !el.dataset.matchId && el.tagName !== 'HR').forEach((el) => el.remove());
+    recent.prepend(recentItem(match), document.createElement('hr'));
+  });
+  if (recent) {
+    [...recent.querySelectorAll('[data-match-id]')].slice(RECENT_LIMIT)
+      .forEach((item) => removeMatchItem(recent, item.dataset.matchId));
+  }
+}
+
+window.connectLiveUpdates = function connectLiveUpdates(url) {
+  const table = document.querySelector('#standings-table');
+  let since = new URL(url, window.location.href).searchParams.get('since');
+  let failures = 0;
+
+  const handlers = {
+    standings: (rows) => table && patchStandings(table, rows),
+    match: (matches) => patchMatchLists(matches),
+    resync: (data) => {
+      if (table) patchStandings(table, data.standings, true);
+      const upcoming = document.querySelector('#upcoming');
+      const recent = document.querySelector('#recent');
+      if (upcoming) renderUpcoming(upcoming, data.upcoming);
+      if (recent) renderRecent(recent, data.recent);
+    }
+  };
+
+  const open = () => {
+    const streamUrl = new URL(url, window.location.href);
+    if (since !== null) streamUrl.searchParams.set('since', since);
+    const source = new EventSource(streamUrl);
+    Object.entries(handlers).forEach(([event, handle]) => {
+      source.addEventListener(event, (message) => {
+        since = message.lastEventId || since;
+        handle(JSON.parse(message.data));
+      });
+    });
+    source.onopen = () => {
+      failures = 0;
+    };
+    source.onerror = () => {
+      // tras un 503 (límite de conexiones) EventSource no reintenta solo:
+      // se vuelve a intentar con espera creciente y aleatoria
+      if (source.readyState !== EventSource.CLOSED) return;
+      failures += 1;
+      const delay = Math.min(300, 15 * 2 ** Math.min(failures, 4)) * (0.5 + Math.random());
+      window.setTimeout(open, delay * 1000);
+    };
+  };
+  open();
+};
+
+if (document.body && document.body.dataset.events && 'EventSource' in window) {
+  window.connectLiveUpdates(document.body.dataset.events);
+}
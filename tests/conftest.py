@@ -0,0 +1,50 @@
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# los módulos de la app están en la raíz del repositorio
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def pytest_configure(config):
+    # importar app ya ejecuta init_db: que no cree darts.db en el directorio actual
+    import db
+
+    db.DB_PATH = Path(tempfile.mkdtemp(prefix="liga-tests-")) / "darts.db"
+
+
+@pytest.fixture
+def league(tmp_path, monkeypatch):
+    """Base temporal con la liga de check_query_plans.seed (la primera vuelta jugada)."""
+    import db
+    from app import app, fragment_cache, page_cache, standings_cache
+    from check_query_plans import seed
+    from ratings import replay_ratings
+    from utils import rebuild_standings
+
+    db.close_connection()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "liga.db")
+    monkeypatch.setitem(app.config, "SNAPSHOT_ENABLED", False)
+    monkeypatch.setitem(app.config, "EXPORT_ON_WRITE", False)
+    for cache in (page_cache, fragment_cache, standings_cache):
+        cache.clear()
+    db.init_db()
+    conn = db.get_connection()
+    seed(conn, 6)
+    rebuild_standings(conn, app.config["NO_SHOW_WIN_POINTS"])
+    replay_ratings(conn)
+    conn.commit()
+    yield conn
+    db.close_connection()
+
+
+@pytest.fixture
+def admin_client(league):
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["role"] = "admin"
+    return client
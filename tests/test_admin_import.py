@@ -0,0 +1,47 @@
+import io
+import sqlite3
+
+import db
+
+
+def scheduled_csv(conn):
+    m = conn.execute(
+        """
+        SELECT m.id, j.number, h.name AS home, a.name AS away
+        FROM matches m
+        JOIN jornadas j ON j.id = m.jornada_id
+        JOIN teams h ON h.id = m.home_team_id
+        JOIN teams a ON a.id = m.away_team_id
+        WHERE m.status='scheduled' ORDER BY m.id LIMIT 1
+        """
+    ).fetchone()
+    data = f"jornada,home,away,home_score,away_score\n{m['number']},{m['home']},{m['away']},6,2\n"
+    return m["id"], {"file": (io.BytesIO(data.encode()), "resultados.csv")}
+
+
+def status(conn, match_id):
+    return conn.execute("SELECT status FROM matches WHERE id=?", (match_id,)).fetchone()["status"]
+
+
+def test_import_applies_results(league, admin_client):
+    match_id, form = scheduled_csv(league)
+    response = admin_client.post("/admin/import", data=form)
+    assert response.status_code == 302
+    assert status(league, match_id) == "completed"
+
+
+def test_import_busy_database_flashes_and_writes_nothing(league, admin_client, monkeypatch):
+    match_id, form = scheduled_csv(league)
+    monkeypatch.setattr(db.Config, "WRITE_RETRY_ATTEMPTS", 2)
+    monkeypatch.setattr(db.Config, "WRITE_RETRY_BASE_MS", 1)
+    league.execute("PRAGMA busy_timeout = 10")
+    blocker = sqlite3.connect(db.DB_PATH)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        response = admin_client.post("/admin/import", data=form, follow_redirects=True)
+    finally:
+        blocker.rollback()
+        blocker.close()
+    assert "ocupada" in response.get_data(as_text=True)
+    assert status(league, match_id) == "scheduled"
+    assert not league.in_transaction
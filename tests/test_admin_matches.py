@@ -0,0 +1,44 @@
+from app import app
+from utils import rebuild_standings
+
+
+def first_completed(conn):
+    return conn.execute("SELECT id FROM matches WHERE status='completed' ORDER BY id LIMIT 1").fetchone()["id"]
+
+
+def snapshot(conn):
+    return (
+        [tuple(r) for r in conn.execute("SELECT * FROM standings ORDER BY team_id")],
+        [tuple(r) for r in conn.execute("SELECT team_id, rating, games FROM ratings ORDER BY team_id")],
+    )
+
+
+def test_reset_twice_reverts_once(league, admin_client):
+    match_id = first_completed(league)
+    admin_client.post(f"/admin/matches/{match_id}/reset")
+    after_first = snapshot(league)
+    admin_client.post(f"/admin/matches/{match_id}/reset")  # p. ej. doble clic o dos pestañas
+    assert snapshot(league) == after_first
+    assert league.execute("SELECT status FROM matches WHERE id=?", (match_id,)).fetchone()["status"] == "scheduled"
+    # la clasificación que queda coincide con recalcularla desde cero
+    assert rebuild_standings(league, app.config["NO_SHOW_WIN_POINTS"]) == []
+
+
+def test_delete_after_reset_reverts_once(league, admin_client):
+    match_id = first_completed(league)
+    admin_client.post(f"/admin/matches/{match_id}/reset")
+    after_reset = snapshot(league)
+    admin_client.post(f"/admin/matches/{match_id}/delete")
+    admin_client.post(f"/admin/matches/{match_id}/delete")
+    assert snapshot(league) == after_reset
+    assert league.execute("SELECT 1 FROM matches WHERE id=?", (match_id,)).fetchone() is None
+
+
+def test_delete_completed_reverts_result(league, admin_client):
+    match_id = first_completed(league)
+    admin_client.post(f"/admin/matches/{match_id}/delete")
+    assert league.execute("SELECT 1 FROM matches WHERE id=?", (match_id,)).fetchone() is None
+    assert league.execute("SELECT SUM(games) FROM ratings").fetchone()[0] == 2 * (
+        league.execute("SELECT COUNT(*) FROM matches WHERE status='completed'").fetchone()[0]
+    )
+    assert rebuild_standings(league, app.config["NO_SHOW_WIN_POINTS"]) == []
@@ -0,0 +1,28 @@
+import json
+
+import export_public_data
+
+
+def test_unchanged_files_are_not_recompressed(league, tmp_path, monkeypatch):
+    monkeypatch.setattr(export_public_data, "DATA_DIR", tmp_path / "data")
+    first = export_public_data.export_all(league)
+
+    compressed = []
+    real = export_public_data.compressed_variants
+    monkeypatch.setattr(
+        export_public_data, "compressed_variants", lambda data: compressed.append(data) or real(data)
+    )
+    second = export_public_data.export_all(league)
+    assert second["files"] == first["files"]
+    # solo el propio manifest, que no tiene entrada anterior de la que tomar los tamaños
+    assert [json.loads(data).keys() for data in compressed] == [{"compression", "files"}]
+
+
+def test_missing_variant_is_regenerated(league, tmp_path, monkeypatch):
+    monkeypatch.setattr(export_public_data, "DATA_DIR", tmp_path / "data")
+    first = export_public_data.export_all(league)
+    filename = next(iter(first["files"]))
+    (tmp_path / "data" / f"{filename}.gz").unlink()
+    second = export_public_data.export_all(league)
+    assert (tmp_path / "data" / f"{filename}.gz").exists()
+    assert second["files"] == first["files"]
@@ -0,0 +1,44 @@
+import pytest
+
+from passwords import LoginThrottle, LoginThrottled
+
+
+def test_throttle_is_per_username_and_address():
+    throttle = LoginThrottle(max_attempts=2, window=60)
+    for _ in range(2):
+        throttle.attempt("Admin", "203.0.113.9")
+    with pytest.raises(LoginThrottled):
+        throttle.attempt("admin", "203.0.113.9")
+    # el mismo usuario desde otra dirección sigue pudiendo entrar
+    throttle.attempt("admin", "198.51.100.7")
+
+
+def test_reset_only_clears_its_address():
+    throttle = LoginThrottle(max_attempts=1, window=60)
+    throttle.attempt("admin", "203.0.113.9")
+    throttle.attempt("admin", "198.51.100.7")
+    throttle.reset("admin", "198.51.100.7")
+    throttle.attempt("admin", "198.51.100.7")
+    with pytest.raises(LoginThrottled):
+        throttle.attempt("admin", "203.0.113.9")
+
+
+def test_failed_attempts_elsewhere_do_not_lock_out_admin(monkeypatch):
+    from app import app
+
+    monkeypatch.setattr("app.login_throttle", LoginThrottle(max_attempts=3, window=60))
+    admin = app.config["ADMIN_USERNAME"]
+    attacker = app.test_client()
+    for _ in range(3):
+        attacker.post("/login", data={"username": admin, "password": "x"},
+                      environ_base={"REMOTE_ADDR": "203.0.113.9"})
+    blocked = attacker.post("/login", data={"username": admin, "password": app.config["ADMIN_PASSWORD"]},
+                            environ_base={"REMOTE_ADDR": "203.0.113.9"})
+    assert blocked.status_code == 429
+
+    response = app.test_client().post(
+        "/login", data={"username": admin, "password": app.config["ADMIN_PASSWORD"]},
+        environ_base={"REMOTE_ADDR": "198.51.100.7"},
+    )
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("/admin")
@@ -0,0 +1,25 @@
+import db
+from check_query_plans import check_plan, check_query_counts, collect_statements, seed
+
+
+def test_hot_queries_use_indexes(tmp_path, monkeypatch):
+    db.close_connection()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "plans.db")
+    db.init_db()
+    conn = db.get_connection()
+    seed(conn)
+    statements = collect_statements()
+    assert statements
+    problems = {}
+    for sql in statements:
+        _, found = check_plan(conn, sql, strict=False)
+        if found:
+            problems[" ".join(sql.split())] = found
+    db.close_connection()
+    assert problems == {}
+
+
+def test_jornadas_read_with_one_select(tmp_path, monkeypatch):
+    db.close_connection()
+    monkeypatch.setattr(db, "DB_PATH", db.DB_PATH)  # check_query_counts la cambia
+    assert check_query_counts(tmp_path) == 0
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from scheduler import optimize_fixtures
+
+
+def league(teams: int, legs: int = 2):
+    """Equipos y jornadas semanales con una entre semana cada cinco (descansos cortos desiguales)."""
+    team_ids = list(range(1, teams + 1))
+    rounds = teams if teams % 2 else teams - 1
+    start = date(2025, 1, 4)
+    jornadas = [
+        {"id": i + 1, "date": (start + timedelta(days=7 * i + (3 if i % 5 == 0 else 0))).isoformat()}
+        for i in range(rounds * legs)
+    ]
+    return team_ids, jornadas
+
+
+def test_rest_spread_improves_over_baseline():
+    for teams in (9, 21, 41):
+        team_ids, jornadas = league(teams)
+        _, quality = optimize_fixtures(team_ids, jornadas, legs=2, time_limit=2, seed=1)
+        assert quality["baseline"]["short_rest_spread"] > 1
+        assert quality["short_rest_spread"] < quality["baseline"]["short_rest_spread"]
+
+
+def test_no_opponent_twice_in_a_row():
+    team_ids, jornadas = league(9, legs=3)
+    fixtures, _ = optimize_fixtures(team_ids, jornadas, legs=3, time_limit=1, seed=1)
+    pairs = {}
+    for jornada_id, home, away, _ in fixtures:
+        pairs.setdefault(jornada_id, set()).add(frozenset((home, away)))
+    ids = sorted(pairs)
+    assert not any(pairs[a] & pairs[b] for a, b in zip(ids, ids[1:]))
+
+
+def test_score_is_relative_to_unoptimized_fixtures():
+    team_ids, jornadas = league(20)
+    venues = {t: f"Bar {t // 2}" for t in team_ids[:8]}
+    _, quality = optimize_fixtures(team_ids, jornadas, legs=2, venues=venues, time_limit=1, seed=1)
+    baseline = quality["baseline"]
+    assert baseline["score"] == 0
+    assert quality["penalty"] < baseline["penalty"]
+    assert quality["score"] == round(100 * (1 - quality["penalty"] / baseline["penalty"]))
+    assert quality["score"] < 100  # las roturas nunca llegan a 0
@@ -1,4 +1,5 @@
 from datetime import datetime, date
+from itertools import groupby
 from zoneinfo import ZoneInfo
 from config import Config
 
@@ -17,64 +18,118 @@ def parse_date(s: str):
     return date.fromisoformat(s)
 
 
-def compute_standings(conn, no_show_win_points: int):
+STANDINGS_FIELDS = ("played", "wins", "losses", "no_shows", "points", "gf", "ga")
+
+
+def match_standings_deltas(m, no_show_win_points: int):
+    """
+    Aportación de un partido completado a la clasificación.
+    Devuelve {team_id: {campo: incremento}} para los dos equipos implicados.
+    """
+    home = m["home_team_id"]; away = m["away_team_id"]
+    hs = m["home_score"]; as_ = m["away_score"]
+    winner_one = bool(m["winner_one_player"])  # si el ganador jugó con uno
+    no_show = m["no_show_team_id"]
+
+    deltas = {t: dict.fromkeys(STANDINGS_FIELDS, 0) for t in (home, away)}
+    for t in (home, away):
+        deltas[t]["played"] += 1
+
+    if no_show:
+        loser = no_show
+        winner = home if away == loser else away
+        deltas[loser]["no_shows"] += 1
+        deltas[winner]["wins"] += 1
+        deltas[loser]["losses"] += 1
+        deltas[winner]["points"] += no_show_win_points
+        # goles a favor/contra no cuentan en incomparecencia; dejar 0
+        return deltas
+
+    # Validación suave: si faltan marcadores, saltar
+    if hs is None or as_ is None or hs == as_:
+        # empates no válidos; ignorar en el cómputo de puntos
+        return deltas
+
+    # goles / legs a favor/contra
+    deltas[home]["gf"] += hs; deltas[home]["ga"] += as_
+    deltas[away]["gf"] += as_; deltas[away]["ga"] += hs
+
+    if hs > as_:
+        winner = home; loser = away
+    else:
+        winner = away; loser = home
+
+    deltas[winner]["wins"] += 1
+    deltas[loser]["losses"] += 1
+    deltas[winner]["points"] += (2 if winner_one else 3)
+    deltas[loser]["points"] += 1
+    return deltas
+
+
+def apply_match_to_standings(conn, m, no_show_win_points: int, sign: int = 1):
+    """
+    Suma (sign=1) o resta (sign=-1) un partido completado en las tablas
+    `standings` y `standings_by_jornada` (la de su jornada).
+    No hace commit: se ejecuta dentro de la transacción que modifica el partido.
+    """
+    apply_matches_to_standings(conn, [m], no_show_win_points, sign)
+
+
+def apply_matches_to_standings(conn, matches, no_show_win_points: int, sign: int = 1):
+    """
+    Versión por lotes de apply_match_to_standings: agrega en memoria los deltas
+    de todos los partidos y los escribe con un executemany por tabla.
+    """
+    totals = {}
+    by_jornada = {}
+    for m in matches:
+        for team_id, d in match_standings_deltas(m, no_show_win_points).items():
+            acc = totals.setdefault(team_id, dict.fromkeys(STANDINGS_FIELDS, 0))
+            acc_j = by_jornada.setdefault((m["jornada_id"], team_id), dict.fromkeys(STANDINGS_FIELDS, 0))
+            for f in STANDINGS_FIELDS:
+                acc[f] += d[f]
+                acc_j[f] += d[f]
+
+    cols = ", ".join(STANDINGS_FIELDS)
+    marks = ", ".join("?" for _ in STANDINGS_FIELDS)
+    updates = ", ".join(f"{f}={f}+excluded.{f}" for f in STANDINGS_FIELDS)
+    conn.executemany(
+        f"""
+        INSERT INTO standings(team_id, {cols}) VALUES(?, {marks})
+        ON CONFLICT(team_id) DO UPDATE SET {updates}
+        """,
+        [(team_id, *(sign * d[f] for f in STANDINGS_FIELDS)) for team_id, d in totals.items()],
+    )
+    conn.executemany(
+        f"""
+        INSERT INTO standings_by_jornada(jornada_id, team_id, {cols}) VALUES(?, ?, {marks})
+        ON CONFLICT(jornada_id, team_id) DO UPDATE SET {updates}
+        """,
+        [(*key, *(sign * d[f] for f in STANDINGS_FIELDS)) for key, d in by_jornada.items()],
+    )
+
+
+def compute_standings_from_matches(conn, no_show_win_points: int):
+    """Recalcula la clasificación completa recorriendo todos los partidos completados."""
     teams = {row["id"]: {
         "team_id": row["id"],
         "team_name": row["name"],
-        "played": 0,
-        "wins": 0,
-        "losses": 0,
-        "no_shows": 0,
-        "points": 0,
-        "gf": 0,
-        "ga": 0,
+        **dict.fromkeys(STANDINGS_FIELDS, 0),
         "gd": 0,
     } for row in conn.execute("SELECT id, name FROM teams WHERE is_active=1 ORDER BY name").fetchall()}
 
     matches = conn.execute("SELECT * FROM matches WHERE status='completed'").fetchall()
 
     for m in matches:
-        home = m["home_team_id"]; away = m["away_team_id"]
-        hs = m["home_score"]; as_ = m["away_score"]
-        winner_one = bool(m["winner_one_player"])  # si el ganador jugó con uno
-        no_show = m["no_show_team_id"]
-
-        for t in (home, away):
-            teams[t]["played"] += 1
-
-        if no_show:
-            loser = no_show
-            winner = home if away == loser else away
-            teams[loser]["no_shows"] += 1
-            teams[winner]["wins"] += 1
-            teams[loser]["losses"] += 1
-            teams[winner]["points"] += no_show_win_points
-            # goles a favor/contra no cuentan en incomparecencia; dejar 0
-            continue
-
-        # Validación suave: si faltan marcadores, saltar
-        if hs is None or as_ is None or hs == as_:
-            # empates no válidos; ignorar en el cómputo de puntos
-            continue
-
-        # goles / legs a favor/contra
-        teams[home]["gf"] += hs; teams[home]["ga"] += as_
-        teams[away]["gf"] += as_; teams[away]["ga"] += hs
-        teams[home]["gd"] = teams[home]["gf"] - teams[home]["ga"]
-        teams[away]["gd"] = teams[away]["gf"] - teams[away]["ga"]
-
-        if hs > as_:
-            winner = home; loser = away
-        else:
-            winner = away; loser = home
-
-        teams[winner]["wins"] += 1
-        teams[loser]["losses"] += 1
-        teams[winner]["points"] += (2 if winner_one else 3)
-        teams[loser]["points"] += 1
+        for team_id, d in match_standings_deltas(m, no_show_win_points).items():
+            row = teams[team_id]
+            for f in STANDINGS_FIELDS:
+                row[f] += d[f]
 
-    # Ordenar por puntos, luego diferencia y GF
     table = list(teams.values())
+    for row in table:
+        row["gd"] = row["gf"] - row["ga"]
+    # Ordenar por puntos, luego diferencia y GF
     table.sort(key=lambda r: (r["points"], r["gd"], r["gf"]), reverse=True)
     # Añadir posición
     for i, row in enumerate(table, start=1):
@@ -82,29 +137,237 @@ def compute_standings(conn, no_show_win_points: int):
     return table
 
 
-def round_robin_pairings(team_ids):
+def compute_standings(conn, no_show_win_points: int):
+    """
+    Lee la clasificación precalculada de la tabla `standings` (O(equipos)).
+    `no_show_win_points` ya está aplicado al guardar cada resultado; se mantiene
+    el parámetro por compatibilidad con las llamadas existentes.
+    """
+    rows = conn.execute(
+        """
+        SELECT t.id AS team_id, t.name AS team_name,
+               COALESCE(s.played, 0) AS played, COALESCE(s.wins, 0) AS wins,
+               COALESCE(s.losses, 0) AS losses, COALESCE(s.no_shows, 0) AS no_shows,
+               COALESCE(s.points, 0) AS points, COALESCE(s.gf, 0) AS gf,
+               COALESCE(s.ga, 0) AS ga, COALESCE(s.gf, 0) - COALESCE(s.ga, 0) AS gd
+        FROM teams t
+        LEFT JOIN standings s ON s.team_id=t.id
+        WHERE t.is_active=1
+        ORDER BY points DESC, gd DESC, gf DESC, t.name
+        """
+    ).fetchall()
+    table = [dict(row) for row in rows]
+    for i, row in enumerate(table, start=1):
+        row["pos"] = i
+    return table
+
+
+def standings_after(conn, number: int):
+    """
+    Clasificación tal como estaba tras la jornada `number`: suma de los deltas
+    de `standings_by_jornada` de las jornadas con número <= `number`
+    (O(equipos x jornadas), sin recorrer los partidos).
+    """
+    sums = ", ".join(f"COALESCE(SUM(d.{f}), 0) AS {f}" for f in STANDINGS_FIELDS)
+    rows = conn.execute(
+        f"""
+        SELECT t.id AS team_id, t.name AS team_name, {sums},
+               COALESCE(SUM(d.gf), 0) - COALESCE(SUM(d.ga), 0) AS gd
+        FROM teams t
+        LEFT JOIN (
+            SELECT d.* FROM jornadas j
+            JOIN standings_by_jornada d ON d.jornada_id=j.id
+            WHERE j.number <= ?
+        ) d ON d.team_id=t.id
+        WHERE t.is_active=1
+        GROUP BY t.id
+        ORDER BY points DESC, gd DESC, gf DESC, t.name
+        """,
+        (number,),
+    ).fetchall()
+    table = [dict(row) for row in rows]
+    for i, row in enumerate(table, start=1):
+        row["pos"] = i
+    return table
+
+
+def standings_timeline(conn):
+    """
+    Evolución de la clasificación en una sola pasada: recorre los deltas por
+    jornada en orden de número acumulando sumas prefijas por equipo y ordena
+    la tabla tras cada jornada jugada.
+    Devuelve {"jornadas": [número, ...], "teams": [{team_id, team_name,
+    positions: [...], points: [...]}]} en el orden de la clasificación actual.
+    """
+    teams = conn.execute("SELECT id, name FROM teams WHERE is_active=1").fetchall()
+    totals = {t["id"]: {"team_id": t["id"], "team_name": t["name"], "points": 0, "gf": 0, "ga": 0} for t in teams}
+    history = {team_id: {"positions": [], "points": []} for team_id in totals}
+
+    def rank_key(t):  # mismo orden que compute_standings: puntos, DG, GF y nombre
+        return (-t["points"], -(t["gf"] - t["ga"]), -t["gf"], t["team_name"])
+
+    numbers = []
+    rows = conn.execute(
+        """
+        SELECT j.number, d.team_id, d.points, d.gf, d.ga
+        FROM jornadas j
+        JOIN standings_by_jornada d ON d.jornada_id=j.id
+        WHERE d.played <> 0
+        ORDER BY j.number
+        """
+    )
+    for number, group in groupby(rows, key=lambda r: r["number"]):
+        for r in group:
+            acc = totals.get(r["team_id"])
+            if acc is not None:  # equipos desactivados no aparecen en la tabla
+                acc["points"] += r["points"]; acc["gf"] += r["gf"]; acc["ga"] += r["ga"]
+        ranked = sorted(totals.values(), key=rank_key)
+        for pos, t in enumerate(ranked, start=1):
+            history[t["team_id"]]["positions"].append(pos)
+            history[t["team_id"]]["points"].append(t["points"])
+        numbers.append(number)
+
+    return {
+        "jornadas": numbers,
+        "teams": [
+            {"team_id": t["team_id"], "team_name": t["team_name"], **history[t["team_id"]]}
+            for t in sorted(totals.values(), key=rank_key)
+        ],
+    }
+
+
+def rebuild_standings(conn, no_show_win_points: int):
+    """
+    Reconstruye las tablas `standings` y `standings_by_jornada` desde cero y
+    devuelve la lista de team_id cuyos valores almacenados no coincidían con el
+    recálculo completo (deriva).
+    """
+    stored = {row["team_id"]: row for row in conn.execute("SELECT * FROM standings").fetchall()}
+    stored_by_jornada = {
+        (row["jornada_id"], row["team_id"]): row
+        for row in conn.execute("SELECT * FROM standings_by_jornada").fetchall()
+    }
+    deltas = {}
+    deltas_by_jornada = {}
+    for m in conn.execute("SELECT * FROM matches WHERE status='completed'").fetchall():
+        for team_id, d in match_standings_deltas(m, no_show_win_points).items():
+            acc = deltas.setdefault(team_id, dict.fromkeys(STANDINGS_FIELDS, 0))
+            acc_j = deltas_by_jornada.setdefault((m["jornada_id"], team_id), dict.fromkeys(STANDINGS_FIELDS, 0))
+            for f in STANDINGS_FIELDS:
+                acc[f] += d[f]
+                acc_j[f] += d[f]
+
+    def differs(expected, row):
+        expected = expected or dict.fromkeys(STANDINGS_FIELDS, 0)
+        return any((row[f] if row else 0) != expected[f] for f in STANDINGS_FIELDS)
+
+    drift = {team_id for team_id in set(stored) | set(deltas) if differs(deltas.get(team_id), stored.get(team_id))}
+    drift.update(
+        key[1] for key in set(stored_by_jornada) | set(deltas_by_jornada)
+        if differs(deltas_by_jornada.get(key), stored_by_jornada.get(key))
+    )
+
+    cols = ", ".join(STANDINGS_FIELDS)
+    marks = ", ".join("?" for _ in STANDINGS_FIELDS)
+    conn.execute("DELETE FROM standings")
+    conn.executemany(
+        f"INSERT INTO standings(team_id, {cols}) VALUES(?, {marks})",
+        [(team_id, *(d[f] for f in STANDINGS_FIELDS)) for team_id, d in deltas.items()],
+    )
+    conn.execute("DELETE FROM standings_by_jornada")
+    conn.executemany(
+        f"INSERT INTO standings_by_jornada(jornada_id, team_id, {cols}) VALUES(?, ?, {marks})",
+        [(*key, *(d[f] for f in STANDINGS_FIELDS)) for key, d in deltas_by_jornada.items()],
+    )
+    return sorted(drift)
+
+
+def round_robin_pairings(team_ids, balanced=False):
     """
     Algoritmo círculo. Devuelve lista de rondas; cada ronda es lista de (home, away).
     Si número impar, inserta BYE (None); los emparejamientos con BYE se omiten.
+    La rotación se calcula por índice, sin reconstruir la lista en cada ronda.
+    Con `balanced` la localía sigue el patrón canónico (de Werra): alterna por
+    posición en la ronda y solo el equipo fijo por ronda, con n-2 roturas
+    (partidos seguidos en casa o fuera) en vez de alternar toda la ronda.
     """
     teams = list(team_ids)
     bye = None
     if len(teams) % 2 == 1:
         teams.append(bye)
     n = len(teams)
+    if n < 2:
+        return []
+    fixed, rest = teams[0], teams[1:]
+    m = n - 1
     rounds = []
-    for r in range(n - 1):
+    for r in range(m):
+        # posición k (k >= 1) de la ronda r: rest desplazado r posiciones
+        slots = [fixed] + [rest[(k - r) % m] for k in range(m)]
         pairs = []
         for i in range(n // 2):
-            a = teams[i]
-            b = teams[n - 1 - i]
+            a = slots[i]
+            b = slots[n - 1 - i]
             if a is not None and b is not None:
-                # alternar local/visitante por ronda
-                if r % 2 == 0:
+                # alternar local/visitante por ronda (o por posición con balanced)
+                first_home = i % 2 == 1 if balanced and i else r % 2 == 0
+                if first_home:
                     pairs.append((a, b))
                 else:
                     pairs.append((b, a))
-        # rotación
-        teams = [teams[0]] + [teams[-1]] + teams[1:-1]
         rounds.append(pairs)
     return rounds
+
+
+def select_fixture_jornadas(round_count: int, jornadas, legs=None):
+    """
+    Jornadas que ocupará el calendario: todas con `legs=None`; con un número de
+    vueltas, las primeras legs * rondas (ValueError si no hay suficientes).
+    """
+    if legs is None:
+        return jornadas
+    if legs < 1:
+        raise ValueError("El número de vueltas debe ser al menos 1")
+    needed = legs * round_count
+    if needed > len(jornadas):
+        raise ValueError(
+            f"{legs} vuelta(s) necesitan {needed} jornadas y solo hay {len(jornadas)}"
+        )
+    return jornadas[:needed]
+
+
+def build_fixtures(team_ids, jornadas, legs=None, kickoff="22:30:00"):
+    """
+    Calendario completo en memoria: lista de (jornada_id, home, away, scheduled_at).
+    Cada vuelta repite las rondas del round-robin; las vueltas impares invierten
+    la localía. Con `legs=None` se llenan todas las jornadas (como antes); con un
+    número de vueltas se exige que haya jornadas suficientes y sobran las demás.
+    """
+    if len(team_ids) < 2:
+        raise ValueError("Se necesitan al menos dos equipos activos")
+    rounds = round_robin_pairings(team_ids)  # (n-1) rondas
+    jornadas = select_fixture_jornadas(len(rounds), jornadas, legs)
+
+    fixtures = []
+    for idx, j in enumerate(jornadas):
+        leg, rnd = divmod(idx, len(rounds))
+        for (home, away) in rounds[rnd]:
+            if leg % 2:
+                # segunda vuelta: invertimos localía
+                home, away = away, home
+            fixtures.append((j["id"], home, away, f"{j['date']} {kickoff}"))
+    validate_fixtures(fixtures)
+    return fixtures
+
+
+def validate_fixtures(fixtures):
+    """Comprueba que ningún equipo juega dos veces la misma jornada ni contra sí mismo."""
+    seen = set()
+    for jornada_id, home, away, _ in fixtures:
+        if home == away:
+            raise ValueError(f"Partido de un equipo contra sí mismo en la jornada {jornada_id}")
+        for team in (home, away):
+            key = (jornada_id, team)
+            if key in seen:
+                raise ValueError(f"El equipo {team} juega dos veces en la jornada {jornada_id}")
+            seen.add(key)